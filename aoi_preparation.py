@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      aoi_preparation
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Preparation of the AOI for a fast import and clipping:
+#              simplification, regions per part and grid tessellation
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import math
+import os
+import threading
+
+import grass.script as grass
+
+# approximate number of grid cells covering the area of the AOI
+GRID_CELLS = 256
+# maximal number of import regions, more parts are grouped
+MAX_REGIONS = 16
+# the parts are imported with their own regions if their bounding boxes
+# cover less than this share of the bounding box of the AOI
+REGION_SHARE = 0.5
+
+
+def read_area_values(vector_map, option):
+    """Read values of v.to.db option (e.g. area, bbox) per area category"""
+    values = {}
+    lines = grass.read_command(
+        "v.to.db",
+        map=vector_map,
+        type="centroid",
+        option=option,
+        flags="p",
+        separator="pipe",
+        quiet=True,
+    ).splitlines()
+    # first line is the header
+    for line in lines[1:]:
+        vals = line.split("|")
+        if vals[0] in ("", "-1"):
+            continue
+        values[vals[0]] = [float(val) for val in vals[1:]]
+    return values
+
+
+def bbox_area(bbox):
+    """Get area of a bounding box given as dict with n, s, e, w"""
+    return (bbox["n"] - bbox["s"]) * (bbox["e"] - bbox["w"])
+
+
+def union_bbox(bboxes):
+    """Get bounding box of several bounding boxes"""
+    return {
+        "n": max(bbox["n"] for bbox in bboxes),
+        "s": min(bbox["s"] for bbox in bboxes),
+        "e": max(bbox["e"] for bbox in bboxes),
+        "w": min(bbox["w"] for bbox in bboxes),
+    }
+
+
+def group_regions(bboxes, max_regions=MAX_REGIONS):
+    """Group the bounding boxes of the AOI parts into import regions
+
+    Neighbouring parts (sorted from west to east) are grouped, so that at
+    most max_regions regions are left. If the regions cover most of the
+    bounding box of the AOI anyway, only the bounding box of the AOI is
+    returned.
+
+    Args:
+        bboxes (list): bounding boxes of the parts (dicts with n, s, e, w)
+        max_regions (int): maximal number of regions
+
+    Returns:
+        regions (list): bounding boxes of the import regions
+    """
+    aoi_bbox = union_bbox(bboxes)
+    bboxes = sorted(bboxes, key=lambda bbox: (bbox["w"], bbox["s"]))
+    group_size = math.ceil(len(bboxes) / max_regions)
+    regions = [
+        union_bbox(bboxes[i : i + group_size])
+        for i in range(0, len(bboxes), group_size)
+    ]
+    if len(regions) < 2 or sum(
+        bbox_area(region) for region in regions
+    ) >= REGION_SHARE * bbox_area(aoi_bbox):
+        return [aoi_bbox]
+    return regions
+
+
+class PreparedAoi:
+    """AOI prepared for the import and the clipping of the buildings
+
+    The AOI is simplified with the given tolerance (v.generalize). Each
+    part of a multipart AOI gets its own bounding box, so that spread-out
+    parts are imported with small regions instead of one huge one. When the
+    buildings are clipped the first time (see clip), large parts are
+    tessellated into grid cells; the buildings in cells which are
+    completely inside the AOI need no clipping, so only the buildings at the
+    AOI boundary are clipped. Imports which do not clip (e.g.
+    aoi_mode=intersect) do not tessellate the AOI.
+
+    Args:
+        aoi_map (str): name of vector map defining AOI
+        prefix (str): prefix of the temporary vector maps
+        tolerance (float): simplification threshold in map units, 0 to keep
+                           the AOI as it is
+        grid_cells (int): approximate number of grid cells covering the
+                          area of the AOI, 0 to not tessellate the AOI
+    """
+
+    def __init__(self, aoi_map, prefix, tolerance=0, grid_cells=GRID_CELLS):
+        self.prefix = prefix
+        self.tmp_maps = []
+        self.aoi_map = aoi_map
+        if tolerance > 0:
+            self.aoi_map = self.tmp_map("simplified")
+            grass.run_command(
+                "v.generalize",
+                input=aoi_map,
+                output=self.aoi_map,
+                type="area",
+                method="douglas",
+                threshold=tolerance,
+                quiet=True,
+            )
+        parts_map = self.split_parts()
+        parts = read_area_values(parts_map, "bbox")
+        # v.to.db prints the bounding box as north, south, east, west
+        bboxes = {
+            cat: dict(zip(("n", "s", "e", "w"), values))
+            for cat, values in parts.items()
+        }
+        self.regions = group_regions(list(bboxes.values()))
+        self.parts_map = parts_map
+        self.bboxes = bboxes
+        self.grid_cells = grid_cells
+        self.interior = None
+        self.tessellated = False
+        self.lock = threading.Lock()
+
+    def tmp_map(self, name):
+        """Get name of a temporary vector map"""
+        tmp_map = f"{self.prefix}_{name}"
+        self.tmp_maps.append(tmp_map)
+        return tmp_map
+
+    def split_parts(self):
+        """Give each area of the AOI its own category
+
+        Returns:
+            parts_map (str): name of the vector map with the parts
+        """
+        no_cats = self.tmp_map("nocats")
+        grass.run_command(
+            "v.category",
+            input=self.aoi_map,
+            output=no_cats,
+            layer=1,
+            option="del",
+            cat=-1,
+            quiet=True,
+        )
+        parts_map = self.tmp_map("parts")
+        grass.run_command(
+            "v.category",
+            input=no_cats,
+            output=parts_map,
+            layer=1,
+            type="centroid",
+            option="add",
+            quiet=True,
+        )
+        return parts_map
+
+    def tessellate(self, parts_map, bboxes, grid_cells):
+        """Create the grid cells lying completely inside the AOI
+
+        Args:
+            parts_map (str): name of the vector map with the parts
+            bboxes (dict): bounding box of each part
+            grid_cells (int): approximate number of grid cells
+
+        Returns:
+            interior (str): name of the vector map with the interior cells,
+                            None if there are none
+        """
+        area = sum(
+            values[0]
+            for values in read_area_values(parts_map, "area").values()
+        )
+        cell_size = math.sqrt(area / grid_cells)
+        grids = []
+        for cat, bbox in bboxes.items():
+            cols = math.floor((bbox["e"] - bbox["w"]) / cell_size)
+            rows = math.floor((bbox["n"] - bbox["s"]) / cell_size)
+            if cols < 2 or rows < 2:
+                # small part, its buildings are clipped directly
+                continue
+            grid = self.tmp_map(f"grid_{cat}")
+            grass.run_command(
+                "v.mkgrid",
+                map=grid,
+                grid=f"{rows},{cols}",
+                position="coor",
+                coordinates=f"{bbox['w']},{bbox['s']}",
+                box=f"{cell_size},{cell_size}",
+                quiet=True,
+            )
+            grids.append(grid)
+        if not grids:
+            return None
+        grid = grids[0]
+        if len(grids) > 1:
+            grid = self.tmp_map("grid")
+            grass.run_command("v.patch", input=grids, output=grid, quiet=True)
+        interior = self.tmp_map("interior")
+        grass.run_command(
+            "v.select",
+            ainput=grid,
+            atype="area",
+            binput=self.aoi_map,
+            btype="area",
+            operator="within",
+            output=interior,
+            flags="t",
+            quiet=True,
+        )
+        if int(grass.vector_info_topo(interior)["areas"]) == 0:
+            return None
+        return interior
+
+    def get_interior(self):
+        """Get the interior grid cells, the AOI is tessellated on first use
+
+        Returns:
+            interior (str): name of the vector map with the interior cells,
+                            None if there are none
+        """
+        with self.lock:
+            if not self.tessellated:
+                if self.grid_cells > 0:
+                    self.interior = self.tessellate(
+                        self.parts_map, self.bboxes, self.grid_cells
+                    )
+                self.tessellated = True
+        return self.interior
+
+    def clip(self, input_map, output, clip_func):
+        """Clip buildings to the AOI, cutting only the buildings at the AOI
+        boundary
+
+        The buildings completely inside the interior cells are kept as they
+        are, only the other buildings are clipped with clip_func.
+
+        Args:
+            input_map (str): name of the buildings
+            output (str): name of the output vector map
+            clip_func (function): clips a vector map (input, clip, output)
+        """
+        interior = self.get_interior()
+        if not interior:
+            clip_func(input_map, self.aoi_map, output)
+            return
+        inner = f"{input_map}_inner_{os.getpid()}"
+        outer = f"{input_map}_outer_{os.getpid()}"
+        clipped = f"{input_map}_clipped_{os.getpid()}"
+        self.tmp_maps.extend([inner, outer, clipped])
+        for name, flags in ((inner, ""), (outer, "r")):
+            grass.run_command(
+                "v.select",
+                ainput=input_map,
+                atype="area",
+                binput=interior,
+                btype="area",
+                operator="within",
+                output=name,
+                flags=flags,
+                quiet=True,
+            )
+        clip_func(outer, self.aoi_map, clipped)
+        grass.run_command(
+            "v.patch",
+            input=[inner, clipped],
+            output=output,
+            flags="e",
+            quiet=True,
+        )
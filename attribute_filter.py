@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      attribute_filter
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Attribute filter (SQL WHERE) applied when the sources are
+#              read, mapped to the column names of each federal state
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import hashlib
+import os
+import re
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
+
+# string literals, quoted identifiers and identifiers of an SQL expression
+SQL_TOKENS = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|\b[A-Za-z_]\w*\b")
+
+
+def map_where(where, schema):
+    """Map the output columns of a WHERE clause to the source columns
+
+    Identifiers naming an output column (e.g. GFK) are replaced by the
+    source column of the schema; other identifiers, string literals and
+    quoted identifiers are kept, so source columns can be used directly.
+
+    Args:
+        where (str): WHERE conditions without the where keyword
+        schema (dict): source column per output column
+
+    Returns:
+        where (str): WHERE conditions using the source columns
+    """
+    upper_schema = {
+        col.upper(): source_col
+        for col, source_col in schema.items()
+        if source_col
+    }
+
+    def map_token(match):
+        token = match.group(0)
+        if token[0] in "'\"":
+            return token
+        return upper_schema.get(token.upper(), token)
+
+    return SQL_TOKENS.sub(map_token, where)
+
+
+def get_source_where(where, schema, min_area=0):
+    """Get the WHERE conditions filtering the buildings of a source
+
+    Args:
+        where (str): WHERE conditions of the where option
+        schema (dict): source column per column usable in where
+        min_area (float): minimal area of the buildings in square units of
+                          the source CRS, 0 to keep all buildings
+
+    Returns:
+        where (str): WHERE conditions using the source columns, empty if
+                     all buildings are read
+    """
+    conditions = []
+    if where:
+        conditions.append(f"({map_where(where, schema)})")
+    if min_area > 0:
+        # area of the source geometries, computed by GDAL while reading
+        conditions.append(f"OGR_GEOM_AREA >= {min_area}")
+    return " AND ".join(conditions)
+
+
+def get_referenced_columns(where, columns):
+    """Get the columns referenced by WHERE conditions
+
+    Args:
+        where (str): WHERE conditions without the where keyword
+        columns (list): column names of the source
+
+    Returns:
+        referenced (list): columns used in where; string literals are
+                           ignored
+    """
+    identifiers = {
+        token.strip('"').upper()
+        for token in SQL_TOKENS.findall(where)
+        if not token.startswith("'")
+    }
+    return [col for col in columns if col.upper() in identifiers]
+
+
+def get_unmapped_columns(where, schema, columns):
+    """Get the columns of WHERE conditions without a source column
+
+    Args:
+        where (str): WHERE conditions without the where keyword
+        schema (dict): source column per column usable in where
+        columns (list): columns mapped for the sources, e.g. the output
+                        columns
+
+    Returns:
+        unmapped (list): columns used in where, which the source does not
+                         contain
+    """
+    mapped = {col.upper() for col, source_col in schema.items() if source_col}
+    return [
+        col
+        for col in get_referenced_columns(where, columns)
+        if col.upper() not in mapped
+    ]
+
+
+def get_layer_name(source):
+    """Get name of the first layer with geometries of a vector file"""
+    if source.lower().endswith(".vrt"):
+        # OGR VRT file of this module with one layer
+        return (
+            ElementTree.parse(source).getroot().find("OGRVRTLayer").get("name")
+        )
+    try:
+        from osgeo import ogr
+    except ImportError:
+        # e.g. shapefile, the layer is named like the file
+        return os.path.splitext(os.path.basename(source))[0]
+    data_source = ogr.Open(source)
+    if data_source is None:
+        raise RuntimeError(f"Could not open {source}")
+    for i in range(data_source.GetLayerCount()):
+        layer = data_source.GetLayerByIndex(i)
+        if layer.GetGeomType() != ogr.wkbNone:
+            return layer.GetName()
+    raise RuntimeError(f"{source} has no layer with geometries")
+
+
+def create_filtered_source(source, where, target_dir):
+    """Create an OGR VRT file reading only the features matching where
+
+    The filter is evaluated by GDAL while the source is read, so the
+    filtered-out features are never imported; the spatial filter of the
+    import (e.g. extent=region) is still applied to the source layer.
+
+    Args:
+        source (str): path to the vector file
+        where (str): WHERE conditions using the source columns
+        target_dir (str): directory for the VRT file
+
+    Returns:
+        vrt_file (str): path to the VRT file
+    """
+    source = os.path.abspath(source)
+    key = hashlib.sha256(f"{source}\n{where}".encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(source))[0]
+    vrt_file = os.path.join(target_dir, f"{stem}_{key}.vrt")
+    if os.path.isfile(vrt_file):
+        return vrt_file
+    layer = get_layer_name(source)
+    sql = f'SELECT * FROM "{layer}" WHERE {where}'
+    vrt = (
+        "<OGRVRTDataSource>\n"
+        f"  <OGRVRTLayer name={quoteattr(layer)}>\n"
+        f'    <SrcDataSource relativeToVRT="0">{escape(source)}'
+        "</SrcDataSource>\n"
+        '    <SrcSQL dialect="OGRSQL">'
+        f"{escape(sql)}"
+        "</SrcSQL>\n"
+        "  </OGRVRTLayer>\n"
+        "</OGRVRTDataSource>\n"
+    )
+    os.makedirs(target_dir, exist_ok=True)
+    tmp_file = f"{vrt_file}.tmp{os.getpid()}"
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        file.write(vrt)
+    os.replace(tmp_file, vrt_file)
+    return vrt_file
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      cache_lock
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     File locks and atomic publishing for a download directory
+#              shared by several jobs
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # no advisory locks (e.g. on Windows), only the atomic renames remain
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path, on_wait=None):
+    """Hold an exclusive lock for path, shared between processes and threads
+
+    The lock is an advisory lock of the file <path>.lock. The lock files are
+    not removed, removing them could let two jobs hold the lock at once.
+
+    Args:
+        path (str): path of the file or directory to lock
+        on_wait (function): called once if the lock is held by another job
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_path = f"{path.rstrip(os.sep)}.lock"
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    with open(lock_path, "a", encoding="utf-8") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if on_wait:
+                on_wait()
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def single_flight(target, create, is_ready=os.path.exists, on_wait=None):
+    """Create target only once, even if several jobs need it at the same time
+
+    The first job creates the target while holding the lock of the target;
+    all other jobs wait for the lock and then reuse the result.
+
+    Args:
+        target (str): path of the file or directory to create
+        create (function): creates target, it has to be ready (see is_ready)
+                           only when it is complete
+        is_ready (function): checks if target is complete
+        on_wait (function): called once if another job creates the target
+
+    Returns:
+        created (bool): True if target was created by this job
+    """
+    with file_lock(target, on_wait):
+        if is_ready(target):
+            return False
+        create()
+        return True
+
+
+@contextmanager
+def staging_dir(target_dir):
+    """Temporary directory in target_dir for files published with
+    publish_files, removed afterwards
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".staging_", dir=target_dir)
+    try:
+        yield tmp_dir
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def publish_files(tmp_dir, target_dir, is_last=None):
+    """Move the files of tmp_dir into target_dir with atomic renames
+
+    The files for which is_last returns True are moved last, so that their
+    existence shows that all files (e.g. .dbf and .shx of a shapefile) are
+    complete.
+
+    Args:
+        tmp_dir (str): directory with the new files, on the file system of
+                       target_dir
+        target_dir (str): directory to publish the files in
+        is_last (function): returns True for the paths to move last
+
+    Returns:
+        paths (list): paths of the published files
+    """
+    files = []
+    for root, _dirs, names in os.walk(tmp_dir):
+        files.extend(
+            os.path.relpath(os.path.join(root, name), tmp_dir)
+            for name in names
+        )
+    files.sort(key=lambda path: bool(is_last and is_last(path)))
+    paths = []
+    for rel_path in files:
+        path = os.path.join(target_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(os.path.join(tmp_dir, rel_path), path)
+        paths.append(path)
+    return paths
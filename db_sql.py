@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      db_sql
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Execution of SQL statements in one transaction with
+#              db.execute
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import grass.script as grass
+
+
+def sql_value(value):
+    """Quote a value as SQL string literal"""
+    if value is None:
+        return "NULL"
+    return "'" + value.replace("'", "''") + "'"
+
+
+def execute_sql(sql, dblink=None):
+    """Execute SQL statements in one transaction
+
+    Args:
+        sql (list): SQL statements
+        dblink (dict): database link (e.g. of a vector map) with driver and
+                       database, None for the default database of the
+                       mapset
+    """
+    kwargs = {}
+    if dblink:
+        kwargs = {"driver": dblink["driver"], "database": dblink["database"]}
+    grass.write_command(
+        "db.execute",
+        input="-",
+        stdin="BEGIN;\n" + ";\n".join(sql) + ";\nCOMMIT;\n",
+        quiet=True,
+        **kwargs,
+    )
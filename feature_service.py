@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      feature_service
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Paged bounding box requests to WFS and OGC API Features
+#              endpoints
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import json
+import os
+import re
+from urllib.parse import urlencode
+
+from pipeline import run_pipeline
+
+# number of features requested per page
+PAGE_SIZE = 1000
+# maximal AOI area in km² for which the service is used instead of the
+# download of the complete archive
+MAX_AREA = 50
+
+
+def use_feature_service(service, aoi_area):
+    """Check if a feature service should be used for an AOI
+
+    Args:
+        service (dict): feature service configuration, e.g.
+                        {"type": "ogcapi", "url": "https://.../ogcapi",
+                         "collection": "buildings", "max_area_km2": 50}
+        aoi_area (float): area of the AOI/region in km², None for the
+                          complete federal state
+
+    Returns:
+        (bool): True if the AOI is small enough for the service
+    """
+    if not service or aoi_area is None:
+        return False
+    return aoi_area <= service.get("max_area_km2", MAX_AREA)
+
+
+def get_ogcapi_crs_uri(crs):
+    """Get OGC URI of a CRS given as EPSG:<code>"""
+    code = crs.split(":")[-1]
+    return f"http://www.opengis.net/def/crs/EPSG/0/{code}"
+
+
+def get_request_url(service, bbox, crs, start=0, count=PAGE_SIZE, hits=False):
+    """Get URL of a page of features in bbox
+
+    Args:
+        service (dict): feature service configuration
+        bbox (list): west, south, east, north in crs
+        crs (str): CRS of bbox and of the requested features, EPSG:<code>
+        start (int): index of the first feature of the page
+        count (int): number of features of the page
+        hits (bool): only request the number of features
+
+    Returns:
+        url (str): request URL
+    """
+    if service.get("type", "wfs") == "ogcapi":
+        params = {
+            "bbox": ",".join(str(val) for val in bbox),
+            "bbox-crs": get_ogcapi_crs_uri(crs),
+            "crs": get_ogcapi_crs_uri(crs),
+            "limit": 1 if hits else count,
+            "offset": start,
+            "f": "json",
+        }
+        url = service["url"].rstrip("/")
+        return (
+            f"{url}/collections/{service['collection']}/items?"
+            f"{urlencode(params)}"
+        )
+    west, south, east, north = bbox
+    if crs == "EPSG:4326":
+        # WFS 2.0 uses the axis order of the CRS (latitude first)
+        west, south, east, north = south, west, north, east
+    params = {
+        "service": "WFS",
+        "version": "2.0.0",
+        "request": "GetFeature",
+        "typeNames": service["typename"],
+        "bbox": f"{west},{south},{east},{north},{crs}",
+        "srsName": crs,
+    }
+    if hits:
+        params["resultType"] = "hits"
+    else:
+        params["outputFormat"] = service.get(
+            "output_format", "application/json"
+        )
+        params["count"] = count
+        params["startIndex"] = start
+    separator = "&" if "?" in service["url"] else "?"
+    return f"{service['url']}{separator}{urlencode(params)}"
+
+
+def get_number_matched(service, bbox, crs, session, timeout=60):
+    """Get number of features in bbox
+
+    Returns:
+        number (int): number of features, None if the service does not
+                      report it
+    """
+    response = session.get(
+        get_request_url(service, bbox, crs, hits=True), timeout=timeout
+    )
+    response.raise_for_status()
+    if service.get("type", "wfs") == "ogcapi":
+        number = response.json().get("numberMatched")
+        return int(number) if number is not None else None
+    match = re.search(r'numberMatched="(\d+)"', response.text)
+    return int(match.group(1)) if match else None
+
+
+def fetch_page(args):
+    """Fetch a page of features into a GeoJSON file
+
+    Args:
+        args (tuple): service, bbox, crs, start index, count, target
+                      directory and requests session
+
+    Returns:
+        filename (str): path of the page, None if the page is empty
+    """
+    service, bbox, crs, start, count, target_dir, session = args
+    response = session.get(
+        get_request_url(service, bbox, crs, start, count),
+        timeout=service.get("timeout", 300),
+    )
+    response.raise_for_status()
+    if not json.loads(response.content).get("features"):
+        return None
+    filename = os.path.join(target_dir, f"page_{start:09d}.geojson")
+    tmp_filename = f"{filename}.tmp{os.getpid()}"
+    with open(tmp_filename, "wb") as file:
+        file.write(response.content)
+    os.replace(tmp_filename, filename)
+    return filename
+
+
+def fetch_features(service, bbox, crs, target_dir, import_func=None, nprocs=4):
+    """Fetch the features in bbox page by page
+
+    If the service reports the number of features, the pages are fetched in
+    parallel and each page is passed on to import_func as soon as it is
+    complete. Otherwise the pages are fetched one after the other until a
+    page is not full.
+
+    Args:
+        service (dict): feature service configuration
+        bbox (list): west, south, east, north in crs
+        crs (str): CRS of bbox and of the requested features, EPSG:<code>
+        target_dir (str): directory for the pages (GeoJSON files)
+        import_func (function): optional function importing a page
+        nprocs (int): number of parallel requests
+
+    Returns:
+        results (list): paths of the pages or, if import_func is given,
+                        its results
+    """
+    import requests
+
+    os.makedirs(target_dir, exist_ok=True)
+    count = service.get("page_size", PAGE_SIZE)
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=nprocs)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        number = get_number_matched(service, bbox, crs, session)
+        stages = [(fetch_page, nprocs)]
+        if import_func:
+            stages.append((import_func, 1))
+        if number is not None:
+            pages = [
+                (service, bbox, crs, start, count, target_dir, session)
+                for start in range(0, number, count)
+            ]
+            return run_pipeline(pages, stages)
+        results = []
+        start = 0
+        while True:
+            page = (service, bbox, crs, start, count, target_dir, session)
+            filename = fetch_page(page)
+            if filename is None:
+                break
+            results.append(import_func(filename) if import_func else filename)
+            with open(filename, "rb") as file:
+                if len(json.load(file)["features"]) < count:
+                    break
+            start += count
+        return results
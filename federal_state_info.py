@@ -55,3 +55,23 @@ FS_ABBREVIATION = {
     "Thüringen": "TH",
     "TH": "TH",
 }
+
+# area of the federal states in km²
+FS_AREA = {
+    "BW": 35748,
+    "BY": 70542,
+    "BE": 891,
+    "BB": 29654,
+    "HB": 419,
+    "HH": 755,
+    "HE": 21116,
+    "MV": 23295,
+    "NI": 47710,
+    "NW": 34112,
+    "RP": 19858,
+    "SL": 2571,
+    "SN": 18450,
+    "ST": 20459,
+    "SH": 15804,
+    "TH": 16202,
+}
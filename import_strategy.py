@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      import_strategy
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Choice of the cheapest import strategy of a job from the
+#              feature estimates of the plan report
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import math
+
+# The costs are relative to the import of one building (v.import with
+# topology) and only used to compare the strategies.
+IMPORT_COST = 1.0
+# reading a building of a source without spatial index, which is read
+# completely also if only the region is imported (e.g. downloads)
+SCAN_COST = 0.2
+# writing a building into the prepared GPKG (-p)
+PREPARE_COST = 0.3
+# share of the import cost left for a prepared source, which has only the
+# needed columns and is already in the CRS of the location
+PREPARED_IMPORT_SHARE = 0.5
+# export and merge of a building of a shard
+MERGE_COST = 0.2
+# start of a shard (module, AOI and region of the shard)
+SHARD_COST = 5000.0
+# number of buildings per shard of the tiled import
+SHARD_FEATURES = 250000
+# clipping of a building with v.clip
+CLIP_COST = 1.0
+# selection of a building in the interior cells of the AOI
+SELECT_COST = 0.05
+# share of the buildings at the AOI boundary, which are clipped anyway
+BOUNDARY_SHARE = 0.2
+# tessellation of the AOI into grid cells (see aoi_preparation.py)
+TESSELLATE_COST = 2000.0
+
+STRATEGIES = ("region", "prefiltered", "tiled")
+
+
+def estimate_costs(sources, nprocs, prefilter=True, tiles=True):
+    """Estimate the costs of the import strategies of a job
+
+    Strategies:
+        region: one job importing only the region of the AOI from the
+                sources, local files and partitions in parallel
+        prefiltered: the sources are prepared first (-p: GPKG with spatial
+                     index, the needed columns and the CRS of the location),
+                     the import then reads the AOI from the prepared copy
+        tiled: the AOI is split into shards imported by nprocs workers
+               (shard_mode), which are merged afterwards
+
+    Args:
+        sources (list): dicts per federal state with "source" (local,
+                        download or feature_service), "features" (estimated
+                        buildings in the AOI), "source_features" (buildings
+                        read without spatial index, 0 if the source has
+                        one) and "parallel" (number of files or partitions
+                        imported in parallel)
+        nprocs (int): number of processes
+        prefilter (bool): whether the prepared copy can be kept (dldir)
+        tiles (bool): whether the shards can be shared (manifest or dldir)
+
+    Returns:
+        costs (dict): cost per strategy, None if not applicable
+        num_tiles (int): number of shards of the tiled strategy
+    """
+    features = sum(source["features"] for source in sources)
+    num_tiles = max(1, math.ceil(features / SHARD_FEATURES))
+    workers = max(1, min(nprocs, num_tiles))
+    costs = {"region": 0.0, "prefiltered": 0.0, "tiled": 0.0}
+    for source in sources:
+        parallel = max(1, min(nprocs, source.get("parallel", 1)))
+        scan = source["source_features"] * SCAN_COST
+        region = scan + source["features"] * IMPORT_COST / parallel
+        costs["region"] += region
+        if source["source"] == "download":
+            costs["prefiltered"] += (
+                source["source_features"] * PREPARE_COST
+                + source["features"]
+                * IMPORT_COST
+                * PREPARED_IMPORT_SHARE
+                / parallel
+            )
+        else:
+            # local files and feature services are read as they are
+            costs["prefiltered"] += region
+        # each shard reads the source
+        costs["tiled"] += (
+            num_tiles * scan + source["features"] * IMPORT_COST
+        ) / workers + source["features"] * MERGE_COST
+    costs["tiled"] += num_tiles * SHARD_COST
+    if not prefilter or not any(
+        source["source"] == "download" for source in sources
+    ):
+        costs["prefiltered"] = None
+    if not tiles or num_tiles < 2:
+        costs["tiled"] = None
+    return costs, num_tiles
+
+
+def choose_clip_method(features):
+    """Choose how the buildings are clipped with aoi_mode=clip
+
+    Returns:
+        method (str): select (select the buildings inside the AOI and clip
+                      only the buildings at its boundary) or clip (clip all
+                      buildings)
+    """
+    select = (
+        TESSELLATE_COST
+        + features * SELECT_COST
+        + features * BOUNDARY_SHARE * CLIP_COST
+    )
+    if select < features * CLIP_COST:
+        return "select"
+    return "clip"
+
+
+def choose_strategy(sources, nprocs, aoi_mode=None, **kwargs):
+    """Choose the cheapest import strategy of a job
+
+    Args:
+        sources (list): estimates per federal state, see estimate_costs
+        nprocs (int): number of processes
+        aoi_mode (str): aoi_mode of the job, None without AOI
+        kwargs: prefilter and tiles of estimate_costs
+
+    Returns:
+        strategy (dict): chosen "strategy", "clip_method" (aoi_mode=clip
+                         without tiles), "tiles" and "workers" of the tiled
+                         strategy and the estimated "costs" of all
+                         strategies
+    """
+    costs, num_tiles = estimate_costs(sources, nprocs, **kwargs)
+    chosen = min(
+        (name for name in STRATEGIES if costs[name] is not None),
+        key=lambda name: costs[name],
+    )
+    strategy = {
+        "strategy": chosen,
+        "costs": {
+            name: None if cost is None else round(cost)
+            for name, cost in costs.items()
+        },
+    }
+    if chosen == "tiled":
+        strategy["tiles"] = num_tiles
+        strategy["workers"] = max(1, min(nprocs, num_tiles))
+    elif aoi_mode == "clip":
+        # the workers of the tiled strategy clip the buildings of each
+        # shard with v.clip
+        strategy["clip_method"] = choose_clip_method(
+            sum(source["features"] for source in sources)
+        )
+    return strategy
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      local_data_catalog
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Extent catalog of local ALKIS building files
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import json
+import os
+
+CATALOG_FILENAME = ".alkis_extent_catalog.json"
+CATALOG_VERSION = 1
+
+
+def read_file_info(path):
+    """Read bounding box, CRS and number of features of a vector file
+
+    Args:
+        path (str): path to GPKG or SHP file
+
+    Returns:
+        info (dict): bounding box (west, south, east, north), CRS as WKT
+                     and number of features of all layers of the file
+    """
+    from osgeo import ogr
+
+    data_source = ogr.Open(path)
+    if data_source is None:
+        raise RuntimeError(f"Could not open {path}")
+    bbox = None
+    crs = None
+    features = 0
+    for i in range(data_source.GetLayerCount()):
+        layer = data_source.GetLayerByIndex(i)
+        if layer.GetGeomType() == ogr.wkbNone:
+            continue
+        features += layer.GetFeatureCount()
+        srs = layer.GetSpatialRef()
+        if crs is None and srs is not None:
+            crs = srs.ExportToWkt()
+        # GetExtent returns (minx, maxx, miny, maxy)
+        minx, maxx, miny, maxy = layer.GetExtent()
+        if bbox is None:
+            bbox = [minx, miny, maxx, maxy]
+        else:
+            bbox = [
+                min(bbox[0], minx),
+                min(bbox[1], miny),
+                max(bbox[2], maxx),
+                max(bbox[3], maxy),
+            ]
+    return {"bbox": bbox, "crs": crs, "features": features}
+
+
+def get_field_names(path):
+    """Get attribute column names of the first layer of a vector file"""
+    from osgeo import ogr
+
+    data_source = ogr.Open(path)
+    if data_source is None:
+        raise RuntimeError(f"Could not open {path}")
+    layer_defn = data_source.GetLayerByIndex(0).GetLayerDefn()
+    return [
+        layer_defn.GetFieldDefn(i).GetName()
+        for i in range(layer_defn.GetFieldCount())
+    ]
+
+
+def load_catalog(catalog_file):
+    """Load catalog from JSON file, return empty catalog if not usable"""
+    if os.path.isfile(catalog_file):
+        try:
+            with open(catalog_file, encoding="utf-8") as file:
+                catalog = json.load(file)
+            if catalog.get("version") == CATALOG_VERSION:
+                return catalog
+        except (OSError, ValueError):
+            pass
+    return {"version": CATALOG_VERSION, "files": {}}
+
+
+def update_catalog(data_dir, files):
+    """Build or incrementally refresh the extent catalog of a directory
+
+    Only files which are new or whose modification time or size changed are
+    read again; entries of deleted files are removed. The catalog is written
+    to <data_dir>/.alkis_extent_catalog.json if the directory is writable.
+
+    Args:
+        data_dir (str): directory with local data of one federal state
+        files (list): paths of all GPKG and SHP files in data_dir
+
+    Returns:
+        catalog (dict): catalog with an entry for each file in files
+        changed (bool): True if the catalog had to be refreshed
+    """
+    catalog_file = os.path.join(data_dir, CATALOG_FILENAME)
+    catalog = load_catalog(catalog_file)
+    entries = catalog["files"]
+    changed = False
+    rel_paths = set()
+    for path in files:
+        rel_path = os.path.relpath(path, data_dir)
+        rel_paths.add(rel_path)
+        stat = os.stat(path)
+        entry = entries.get(rel_path)
+        if (
+            entry
+            and entry["mtime"] == stat.st_mtime
+            and entry["size"] == stat.st_size
+        ):
+            continue
+        entry = read_file_info(path)
+        entry["mtime"] = stat.st_mtime
+        entry["size"] = stat.st_size
+        entries[rel_path] = entry
+        changed = True
+    for rel_path in set(entries) - rel_paths:
+        del entries[rel_path]
+        changed = True
+    if changed:
+        try:
+            tmp_file = f"{catalog_file}.{os.getpid()}"
+            with open(tmp_file, "w", encoding="utf-8") as file:
+                json.dump(catalog, file)
+            os.replace(tmp_file, catalog_file)
+        except OSError:
+            # read-only data directory: use the catalog without caching it
+            pass
+    return catalog, changed
+
+
+def transform_bbox(bbox, src_wkt, dst_wkt, densify=21):
+    """Transform bounding box between two CRS (densified along the edges)
+
+    Args:
+        bbox (list): west, south, east, north in source CRS
+        src_wkt (str): WKT of the source CRS
+        dst_wkt (str): WKT of the target CRS
+        densify (int): number of points per edge
+
+    Returns:
+        bbox (list): west, south, east, north in target CRS
+    """
+    from osgeo import osr
+
+    src_srs = osr.SpatialReference()
+    src_srs.ImportFromWkt(src_wkt)
+    dst_srs = osr.SpatialReference()
+    dst_srs.ImportFromWkt(dst_wkt)
+    if src_srs.IsSame(dst_srs):
+        return bbox
+    for srs in (src_srs, dst_srs):
+        srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    transform = osr.CoordinateTransformation(src_srs, dst_srs)
+    west, south, east, north = bbox
+    points = []
+    for i in range(densify):
+        frac = i / (densify - 1)
+        x_val = west + frac * (east - west)
+        y_val = south + frac * (north - south)
+        points.extend(
+            [(x_val, south), (x_val, north), (west, y_val), (east, y_val)]
+        )
+    transformed = [transform.TransformPoint(x, y)[:2] for x, y in points]
+    x_vals = [pnt[0] for pnt in transformed]
+    y_vals = [pnt[1] for pnt in transformed]
+    return [min(x_vals), min(y_vals), max(x_vals), max(y_vals)]
+
+
+def bbox_intersects(bbox1, bbox2):
+    """Check if two bounding boxes (west, south, east, north) intersect"""
+    return not (
+        bbox1[2] < bbox2[0]
+        or bbox2[2] < bbox1[0]
+        or bbox1[3] < bbox2[1]
+        or bbox2[3] < bbox1[1]
+    )
+
+
+def get_intersecting_pairs(bboxes):
+    """Get the pairs of intersecting bounding boxes
+
+    The bounding boxes are swept from west to east, so that each one is
+    only compared with the boxes still open at its western edge instead
+    of with all others.
+
+    Args:
+        bboxes (list): bounding boxes (west, south, east, north)
+
+    Returns:
+        pairs (list): sorted index pairs (i, j) with i < j
+    """
+    pairs = []
+    open_boxes = []
+    for idx in sorted(range(len(bboxes)), key=lambda i: bboxes[i][0]):
+        west = bboxes[idx][0]
+        open_boxes = [i for i in open_boxes if bboxes[i][2] >= west]
+        for other in open_boxes:
+            if bbox_intersects(bboxes[idx], bboxes[other]):
+                pairs.append((min(idx, other), max(idx, other)))
+        open_boxes.append(idx)
+    return sorted(pairs)
+
+
+def select_overlapping_files(data_dir, catalog, aoi_bbox, aoi_wkt):
+    """Select catalog files whose extent overlaps the AOI bounding box
+
+    Args:
+        data_dir (str): directory the catalog belongs to
+        catalog (dict): catalog created by update_catalog
+        aoi_bbox (list): west, south, east, north of the AOI
+        aoi_wkt (str): WKT of the CRS of aoi_bbox
+
+    Returns:
+        files (list): paths of the overlapping files
+    """
+    files = []
+    for rel_path, entry in sorted(catalog["files"].items()):
+        if entry["bbox"] is None or entry["features"] == 0:
+            continue
+        if entry["crs"]:
+            bbox = transform_bbox(aoi_bbox, aoi_wkt, entry["crs"])
+        else:
+            bbox = aoi_bbox
+        if bbox_intersects(bbox, entry["bbox"]):
+            files.append(os.path.join(data_dir, rel_path))
+    return files
+
+
+def estimate_features(data_dir, catalog, files, aoi_bbox, aoi_wkt):
+    """Estimate number of features of files inside the AOI bounding box
+
+    The feature count of each file is scaled by the share of its extent
+    covered by the AOI bounding box.
+
+    Args:
+        data_dir (str): directory the catalog belongs to
+        catalog (dict): catalog created by update_catalog
+        files (list): paths of the files to take into account
+        aoi_bbox (list): west, south, east, north of the AOI
+        aoi_wkt (str): WKT of the CRS of aoi_bbox
+
+    Returns:
+        features (float): estimated number of features
+    """
+    features = 0.0
+    for path in files:
+        entry = catalog["files"].get(os.path.relpath(path, data_dir))
+        if not entry or entry["bbox"] is None:
+            continue
+        bbox = entry["bbox"]
+        if entry["crs"]:
+            aoi_file_bbox = transform_bbox(aoi_bbox, aoi_wkt, entry["crs"])
+        else:
+            aoi_file_bbox = aoi_bbox
+        overlap_x = min(bbox[2], aoi_file_bbox[2]) - max(
+            bbox[0], aoi_file_bbox[0]
+        )
+        overlap_y = min(bbox[3], aoi_file_bbox[3]) - max(
+            bbox[1], aoi_file_bbox[1]
+        )
+        file_area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
+        if file_area <= 0:
+            features += entry["features"]
+        else:
+            overlap = max(0, overlap_x) * max(0, overlap_y)
+            features += entry["features"] * min(1.0, overlap / file_area)
+    return features
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      mirrors
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Mirror selection and download with failover between mirrors
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import json
+import os
+import shutil
+import time
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+# number of bytes downloaded to probe the throughput of a mirror
+PROBE_BYTES = 256 * 1024
+CHUNK_SIZE = 8192
+
+
+def load_source_config(config_file):
+    """Load source configuration (e.g. mirrors per source) from JSON file
+
+    Example:
+        {"mirrors": {"NW": ["/data/alkis_mirror/NW",
+                            "http://mirror.internal/alkis/NW"]}}
+    """
+    if not config_file:
+        return {}
+    with open(config_file, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def get_download_filename(url):
+    """Get file name of a download URL, also for URLs like
+    .../download?path=%2F&files=hu_sn_shape.zip
+    """
+    parsed_url = urlparse(url)
+    query = parse_qs(parsed_url.query)
+    if "files" in query:
+        return query["files"][0]
+    return unquote(os.path.basename(parsed_url.path))
+
+
+def is_local(location):
+    """Check if a mirror is a local directory or file"""
+    return urlparse(location).scheme in ("", "file")
+
+
+def local_path(location):
+    """Get path of a local mirror"""
+    return (
+        urlparse(location).path if location.startswith("file:") else location
+    )
+
+
+def get_candidate_urls(config, source_key, url):
+    """Get the mirror URLs of a download followed by the original URL
+
+    Args:
+        config (dict): source configuration
+        source_key (str): key of the source, e.g. federal state abbreviation
+        url (str): original download URL
+
+    Returns:
+        urls (list): URLs or paths of the file on all mirrors
+    """
+    filename = get_download_filename(url)
+    candidates = []
+    for mirror in config.get("mirrors", {}).get(source_key, []):
+        if is_local(mirror):
+            candidates.append(os.path.join(local_path(mirror), filename))
+        else:
+            candidates.append(f"{mirror.rstrip('/')}/{quote(filename)}")
+    candidates.append(url)
+    return candidates
+
+
+def probe_mirror(url, timeout=30):
+    """Probe latency and throughput of a mirror
+
+    Returns:
+        estimate (float): seconds to fetch PROBE_BYTES, None if unhealthy
+    """
+    if is_local(url):
+        return 0.0 if os.path.isfile(local_path(url)) else None
+    import requests
+
+    start = time.perf_counter()
+    try:
+        with requests.get(
+            url,
+            headers={"Range": f"bytes=0-{PROBE_BYTES - 1}"},
+            stream=True,
+            timeout=timeout,
+        ) as response:
+            if response.status_code not in (200, 206):
+                return None
+            size = 0
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                size += len(chunk)
+                if size >= PROBE_BYTES:
+                    break
+    except requests.exceptions.RequestException:
+        return None
+    return time.perf_counter() - start
+
+
+def rank_mirrors(urls):
+    """Sort healthy mirrors by their probed speed, fastest first"""
+    if len(urls) < 2:
+        return urls
+    probes = [(probe_mirror(url), i, url) for i, url in enumerate(urls)]
+    return [
+        url for est, _i, url in sorted(p for p in probes if p[0] is not None)
+    ]
+
+
+def copy_local(path, filename, offset):
+    """Copy a file from a local mirror, starting at offset"""
+    with open(path, "rb") as src, open(filename, "ab") as dst:
+        src.seek(offset)
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def download_http(url, filename, offset, timeout=800):
+    """Download a file via HTTP, resuming at offset if supported"""
+    import requests
+
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with requests.get(
+        url, headers=headers, stream=True, timeout=timeout
+    ) as response:
+        response.raise_for_status()
+        mode = "ab"
+        if offset and response.status_code != 206:
+            # range not supported: start again from the beginning
+            mode = "wb"
+        with open(filename, mode) as file:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                file.write(chunk)
+
+
+def download_with_failover(urls, filename):
+    """Download a file from the fastest healthy mirror
+
+    If a download fails, it is continued with the next mirror, resuming
+    at the bytes already downloaded if the mirror supports range requests.
+
+    Args:
+        urls (list): URLs or paths of the file on all mirrors
+        filename (str): path of the downloaded file
+
+    Returns:
+        url (str): mirror the download was finished from
+    """
+    part_file = f"{filename}.part"
+    if os.path.isfile(part_file):
+        os.remove(part_file)
+    errors = []
+    for url in rank_mirrors(urls):
+        offset = os.path.getsize(part_file) if os.path.isfile(part_file) else 0
+        try:
+            if is_local(url):
+                copy_local(local_path(url), part_file, offset)
+            else:
+                download_http(url, part_file, offset)
+        except Exception as err:  # pylint: disable=broad-except
+            errors.append(f"{url}: {err}")
+            continue
+        os.replace(part_file, filename)
+        return url
+    if not errors:
+        errors.append("no healthy mirror")
+    raise RuntimeError(
+        f"Download of {os.path.basename(filename)} failed: {'; '.join(errors)}"
+    )
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      output_partitions
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Output partitioned by municipality (AGS prefix) or grid tile
+#              with an index table
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import math
+import os
+import re
+import shutil
+from multiprocessing.pool import ThreadPool
+
+import grass.script as grass
+
+from aoi_preparation import read_area_values
+from db_sql import execute_sql, sql_value
+
+# default number of leading AGS digits (8: municipality, 5: district)
+AGS_DIGITS = 8
+# default tile size in map units
+TILE_SIZE = 10000
+# maximal number of parallel imports of the partitions, more of them only
+# compete for the disk and the database of the mapset
+MAX_IMPORTS = 4
+# layer of the exported output
+EXPORT_LAYER = "buildings"
+
+
+def get_ags_partitions(vector_map, digits=AGS_DIGITS):
+    """Get categories of the buildings per AGS prefix
+
+    Returns:
+        partitions (dict): list of categories per partition key
+    """
+    ags_values = grass.parse_command(
+        "v.db.select",
+        map=vector_map,
+        columns='cat,"AGS"',
+        separator="pipe",
+        flags="c",
+        delimiter="|",
+    )
+    partitions = {}
+    for cat, ags in ags_values.items():
+        key = ags[:digits] if ags else "unknown"
+        partitions.setdefault(key, []).append(cat)
+    return partitions
+
+
+def get_tile_partitions(vector_map, size=TILE_SIZE):
+    """Get categories of the buildings per grid tile containing their
+    centroid; the tiles are named by their lower left corner
+
+    Returns:
+        partitions (dict): list of categories per partition key
+    """
+    partitions = {}
+    for cat, coords in read_area_values(vector_map, "coor").items():
+        west = math.floor(coords[0] / size) * size
+        south = math.floor(coords[1] / size) * size
+        key = f"{west:.0f}_{south:.0f}".replace("-", "m")
+        partitions.setdefault(key, []).append(cat)
+    return partitions
+
+
+def get_partition_map(vector_map, key):
+    """Get name of the vector map of a partition, characters of the key
+    which are not allowed in map names (e.g. in AGS values) are replaced
+    """
+    return f"{vector_map}_{re.sub(r'[^A-Za-z0-9_]', '_', key)}"
+
+
+def split_partitions(source, partition_keys, target):
+    """Write the features of a GPKG layer into one layer per partition in
+    one pass over the features
+
+    Args:
+        source (str): GPKG file with the layer EXPORT_LAYER
+        partition_keys (dict): layer name of the partition per category,
+                               features of other categories are skipped
+        target (str): GPKG file to create with the partition layers
+    """
+    from osgeo import ogr
+
+    data_source = ogr.Open(source)
+    if data_source is None:
+        raise RuntimeError(f"Could not open {source}")
+    layer = data_source.GetLayerByName(EXPORT_LAYER)
+    layer_defn = layer.GetLayerDefn()
+    # v.out.ogr may store the categories as FID of the GPKG
+    cat_field = layer_defn.GetFieldIndex("cat")
+    fid_column = layer.GetFIDColumn()
+    target_source = ogr.GetDriverByName("GPKG").CreateDataSource(target)
+    target_layers = {}
+    # one transaction, GPKG commits each feature otherwise
+    target_source.StartTransaction()
+    for feature in layer:
+        if cat_field >= 0:
+            cat = feature.GetField(cat_field)
+        else:
+            cat = feature.GetFID()
+        name = partition_keys.get(str(cat))
+        if name is None:
+            continue
+        if name not in target_layers:
+            target_layer = target_source.CreateLayer(
+                name,
+                layer.GetSpatialRef(),
+                layer.GetGeomType(),
+                [f"FID={fid_column}"] if fid_column else [],
+            )
+            for i in range(layer_defn.GetFieldCount()):
+                target_layer.CreateField(layer_defn.GetFieldDefn(i))
+            target_layers[name] = target_layer
+        target_layer = target_layers[name]
+        out_feature = ogr.Feature(target_layer.GetLayerDefn())
+        out_feature.SetFrom(feature)
+        out_feature.SetFID(feature.GetFID())
+        target_layer.CreateFeature(out_feature)
+    target_source.CommitTransaction()
+    target_source = None
+    data_source = None
+
+
+def import_partition(args):
+    """Import the layer of a partition into a vector map"""
+    source, output = args
+    grass.run_command(
+        "v.in.ogr",
+        input=source,
+        layer=output,
+        output=output,
+        key="cat",
+        quiet=True,
+    )
+    return output
+
+
+def write_partition_index(index_table, rows):
+    """Write the index table of the partitions (partition key, vector map
+    and number of buildings) into the default database of the mapset; an
+    existing table is only replaced with overwrite
+    """
+    sql = []
+    if grass.overwrite():
+        sql.append(f"DROP TABLE IF EXISTS {index_table}")
+    sql.append(
+        f"CREATE TABLE {index_table} "
+        "(partition TEXT, map TEXT, buildings INTEGER)"
+    )
+    sql.extend(
+        f"INSERT INTO {index_table} VALUES "
+        f"({sql_value(key)}, {sql_value(name)}, {count})"
+        for key, name, count in rows
+    )
+    execute_sql(sql)
+
+
+def partition_output(vector_map, partition_by, size=None, nprocs=1):
+    """Split the buildings into one vector map per partition
+
+    The partition of each building is determined in one pass over the
+    attributes (AGS) or the centroids (tile). The output is exported once
+    and its features are written into one layer per partition in a single
+    pass (see split_partitions), so each partition is imported from its
+    own layer into <vector_map>_<key> instead of reading the complete
+    output once per partition. The index table <vector_map>_partitions
+    lists the partitions and their maps.
+
+    The partitions are split from the finished output instead of being
+    written during the import, because the deduplication, the merge of the
+    federal states and the column cleanup change the buildings until the
+    output is complete.
+
+    Args:
+        vector_map (str): name of the buildings
+        partition_by (str): ags or tile
+        size (float): number of leading AGS digits or tile size in map
+                      units, None for the default
+        nprocs (int): number of parallel imports, at most MAX_IMPORTS
+
+    Returns:
+        rows (list): partition key, vector map and number of buildings
+    """
+    if partition_by == "ags":
+        partitions = get_ags_partitions(vector_map, int(size or AGS_DIGITS))
+    else:
+        partitions = get_tile_partitions(vector_map, size or TILE_SIZE)
+    rows = [
+        (key, get_partition_map(vector_map, key), len(cats))
+        for key, cats in sorted(partitions.items())
+    ]
+    partition_keys = {}
+    for key, name, _count in rows:
+        partition_keys.update((cat, name) for cat in partitions[key])
+    tmp_dir = grass.tempdir()
+    try:
+        export_file = os.path.join(tmp_dir, "output.gpkg")
+        split_file = os.path.join(tmp_dir, "partitions.gpkg")
+        grass.run_command(
+            "v.out.ogr",
+            input=vector_map,
+            output=export_file,
+            output_layer=EXPORT_LAYER,
+            format="GPKG",
+            type="area",
+            quiet=True,
+        )
+        split_partitions(export_file, partition_keys, split_file)
+        pool = ThreadPool(max(1, min(nprocs, MAX_IMPORTS, len(rows))))
+        pool.map(
+            import_partition, [(split_file, name) for _k, name, _c in rows]
+        )
+        pool.close()
+        pool.join()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    write_partition_index(f"{vector_map}_partitions", rows)
+    return rows
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      pg_attributes
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Set-based harmonization of attribute tables for mapsets
+#              using the PostgreSQL attribute driver
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import grass.script as grass
+
+from db_sql import execute_sql
+
+
+def get_pg_dblink(vector_map):
+    """Get layer 1 database link of a vector map if its table is stored
+    with the PostgreSQL driver
+
+    Returns:
+        dblink (dict): database link, None for other drivers
+    """
+    dblink = grass.vector_db(vector_map).get(1)
+    if dblink and dblink["driver"] == "pg":
+        return dblink
+    return None
+
+
+def alter_text_columns(vector_map, dblink):
+    """Change the type of all CHARACTER columns to TEXT with one statement
+
+    Args:
+        vector_map (str): name of the vector map
+        dblink (dict): database link of the vector map
+    """
+    columns = [
+        name
+        for name, col in grass.vector_columns(vector_map).items()
+        if col["type"].upper() == "CHARACTER"
+    ]
+    if not columns:
+        return
+    alter = ", ".join(f'ALTER COLUMN "{col}" TYPE TEXT' for col in columns)
+    execute_sql([f"ALTER TABLE {dblink['table']} {alter}"], dblink)
+
+
+def harmonize_table(vector_map, dblink, schema, columns):
+    """Rewrite the attribute table with only the harmonized output columns
+
+    The table is rebuilt with one CREATE TABLE ... AS SELECT, which copies
+    the rows in bulk inside the database, instead of renaming, adding and
+    updating the columns one by one (each a full-table update). The key
+    index is created after the rows are loaded. The output columns are
+    quoted, so that PostgreSQL keeps their upper case names.
+
+    Args:
+        vector_map (str): name of the vector map
+        dblink (dict): database link of the vector map
+        schema (dict): source column per output column
+        columns (list): output columns (text columns)
+    """
+    source_columns = {
+        name.lower(): name for name in grass.vector_columns(vector_map)
+    }
+    selects = ["cat"]
+    for column in columns:
+        source_col = source_columns.get((schema.get(column) or "").lower())
+        if source_col:
+            selects.append(f'CAST("{source_col}" AS TEXT) AS "{column}"')
+        else:
+            selects.append(f'CAST(NULL AS TEXT) AS "{column}"')
+    table = dblink["table"]
+    # the table keeps its name, so the vector map stays connected to it
+    table_name = table.split(".")[-1]
+    new_table = f"{table}_harmonized"
+    execute_sql(
+        [
+            f"CREATE TABLE {new_table} AS SELECT {', '.join(selects)} "
+            f"FROM {table}",
+            f"DROP TABLE {table}",
+            f"ALTER TABLE {new_table} RENAME TO {table_name}",
+            f"CREATE UNIQUE INDEX {table_name}_cat ON {table} (cat)",
+            f"ANALYZE {table}",
+        ],
+        dblink,
+    )
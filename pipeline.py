@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      pipeline
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Producer/consumer pipeline with bounded queues between stages
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import queue
+import threading
+
+# marks the end of the items in a queue
+_END = object()
+
+
+def run_pipeline(items, stages, queue_size=2):
+    """Run items through a pipeline of stages
+
+    Each stage is a function with the number of threads running it. An item
+    is passed on to the next stage as soon as the previous stage finished
+    it, so that e.g. downloading, extracting and importing of different
+    items overlap. The queues between the stages are bounded by queue_size,
+    so that a fast stage can not run ahead of a slow one without limit.
+    Items for which a stage returns None are not passed on.
+
+    Args:
+        items (list): input items of the first stage
+        stages (list): tuples of function and number of threads
+        queue_size (int): maximal number of items waiting between stages
+
+    Returns:
+        results (list): results of the last stage in order of completion
+    """
+    queues = [queue.Queue()]
+    queues.extend(queue.Queue(maxsize=queue_size) for _ in stages)
+    errors = []
+    threads = []
+
+    def worker(func, in_queue, out_queue):
+        while True:
+            item = in_queue.get()
+            if item is _END:
+                # let the other threads of this stage finish too
+                in_queue.put(_END)
+                return
+            if errors:
+                continue
+            try:
+                result = func(item)
+            # grass.fatal raises SystemExit which would end the thread silently
+            except BaseException as err:  # pylint: disable=broad-except
+                errors.append(err)
+                continue
+            if result is not None:
+                out_queue.put(result)
+
+    def stage_runner(func, nprocs, in_queue, out_queue):
+        stage_threads = [
+            threading.Thread(target=worker, args=(func, in_queue, out_queue))
+            for _ in range(nprocs)
+        ]
+        for thread in stage_threads:
+            thread.start()
+        for thread in stage_threads:
+            thread.join()
+        out_queue.put(_END)
+
+    for i, (func, nprocs) in enumerate(stages):
+        thread = threading.Thread(
+            target=stage_runner,
+            args=(func, max(1, nprocs), queues[i], queues[i + 1]),
+        )
+        thread.start()
+        threads.append(thread)
+
+    for item in items:
+        queues[0].put(item)
+    queues[0].put(_END)
+
+    results = []
+    while True:
+        result = queues[-1].get()
+        if result is _END:
+            break
+        results.append(result)
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      providers
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Description of the ALKIS building sources of the federal
+#              states (URLs, partitions, CRS, snapping and schema)
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+from datetime import datetime, timedelta
+from fnmatch import fnmatch
+
+from download_urls import (
+    BB_districts,
+    BUILDINGS_FILENAMES,
+    URLS,
+    download_dict,
+)
+
+# columns of the output and their names in the Hausumringe sources
+HU_SCHEMA = {"AGS": "AGS", "OI": "OI", "GFK": "GFK"}
+# columns usable in the where option and their names in the Hausumringe
+# sources
+HU_FILTER_SCHEMA = dict(HU_SCHEMA, AKTUALITAE="AKTUALITAE")
+# file extensions of building sources in partition archives
+SOURCE_EXTENSIONS = (".shp", ".gpkg")
+# district boundaries of Germany, used to locate district partitions
+VG5000_KRS = (
+    "/vsizip/vsicurl/https://daten.gdz.bkg.bund.de/produkte/vg/vg5000_0101/"
+    "aktuell/vg5000_01-01.utm32s.shape.ebenen.zip/"
+    "vg5000_01-01.utm32s.shape.ebenen/vg5000_ebenen_0101/VG5000_KRS.shp"
+)
+
+
+class Provider:
+    """ALKIS building source of a federal state
+
+    A source is either a single archive (url and buildings_filename) or is
+    offered in partitions, e.g. per district or tile. For partitioned
+    sources only the partitions overlapping with the AOI are downloaded;
+    they are located with the partition_index, a vector source with an
+    attribute naming the partitions.
+
+    Args:
+        key (str): federal state abbreviation, also used for mirrors
+        url (str): download URL of a single archive
+        buildings_filename (str): path of the buildings file in the archive
+        partitions (dict): download URL per partition key
+        partition_index (dict): "source" (GDAL path of the index),
+                                "field" (attribute naming the partition) and
+                                optionally "values" (attribute value per
+                                partition key, if they differ)
+        member_pattern (str): pattern of the building files in partition
+                              archives
+        buildings_share (float): share of the buildings in the archive
+                                 size (for cost estimates)
+        crs (str): CRS assigned to sources without (valid) CRS
+        snap (float): snapping threshold for the import, -1 for none
+        schema (dict): source column per output column
+        filter_schema (dict): source column per column usable in the where
+                              option, by default the schema
+        feature_service (dict): WFS or OGC API Features endpoint used
+                                instead of the download for small AOIs,
+                                see feature_service.use_feature_service
+    """
+
+    def __init__(
+        self,
+        key,
+        url=None,
+        buildings_filename=None,
+        partitions=None,
+        partition_index=None,
+        member_pattern="*",
+        buildings_share=1.0,
+        crs=None,
+        snap=-1,
+        schema=None,
+        filter_schema=None,
+        feature_service=None,
+    ):
+        self.key = key
+        self.url = url
+        self.buildings_filename = buildings_filename
+        self.partitions = partitions or {}
+        self.partition_index = partition_index
+        self.member_pattern = member_pattern
+        self.buildings_share = buildings_share
+        self.crs = crs
+        self.snap = snap
+        self.schema = HU_SCHEMA if schema is None else schema
+        if filter_schema is None:
+            filter_schema = HU_FILTER_SCHEMA if schema is None else schema
+        self.filter_schema = filter_schema
+        self.feature_service = feature_service
+
+    @property
+    def partitioned(self):
+        """Check if the source is downloaded in partitions"""
+        return bool(self.partitions)
+
+    def resolve_url(self):
+        """Get the download URL of a single archive source"""
+        return self.url
+
+    def is_building_file(self, name):
+        """Check if a member of a partition archive is a building file"""
+        return fnmatch(os.path.basename(name), self.member_pattern)
+
+    def is_building_source(self, name):
+        """Check if a file of a partition is a readable building source"""
+        return self.is_building_file(name) and name.lower().endswith(
+            SOURCE_EXTENSIONS
+        )
+
+    def get_partition_keys(self, index_values):
+        """Get the keys of the partitions with the given index values"""
+        values = self.partition_index.get("values") or {
+            key: key for key in self.partitions
+        }
+        return [
+            key
+            for key, val in values.items()
+            if val in index_values and key in self.partitions
+        ]
+
+
+class DatedProvider(Provider):
+    """Provider with the date of the publication in its URL (e.g. Hessen),
+    the placeholder DATE is replaced by the date of today, yesterday or
+    tomorrow, depending on which is available
+    """
+
+    def resolve_url(self):
+        import requests
+
+        for delta in [0, -1, 1]:
+            date = (datetime.now() + timedelta(days=delta)).strftime("%Y%m%d")
+            date_url = self.url.replace("DATE", date)
+            response = requests.get(date_url, stream=True)
+            response.close()
+            if response.status_code == 200:
+                return date_url
+        return date_url
+
+
+def get_bb_partitions():
+    """Get the download URLs of the Brandenburg districts"""
+    return {
+        os.path.basename(url)[len("ALKIS_Shape_") : -len(".zip")]: url
+        for url in download_dict["Brandenburg"]
+    }
+
+
+PROVIDERS = {
+    "BE": Provider(
+        "BE", url=URLS["BE"], buildings_filename=BUILDINGS_FILENAMES["BE"]
+    ),
+    "BB": Provider(
+        "BB",
+        partitions=get_bb_partitions(),
+        partition_index={
+            "source": VG5000_KRS,
+            "field": "GEN",
+            "values": BB_districts,
+        },
+        member_pattern="*gebauedeBauwerk*",
+        # district archives contain all ALKIS layers
+        buildings_share=0.1,
+        # the output columns are not contained in the district data
+        schema={},
+        filter_schema={
+            "AKTUALITAE": "aktualit",
+            "FUNKTION": "funktion",
+            "GEBNUTZBEZ": "gebnutzbez",
+        },
+    ),
+    "HE": DatedProvider(
+        "HE",
+        url=URLS["HE"],
+        buildings_filename=BUILDINGS_FILENAMES["HE"],
+        # shapefile with missing .prj file
+        crs="EPSG:25832",
+    ),
+    "NW": Provider(
+        "NW", url=URLS["NW"], buildings_filename=BUILDINGS_FILENAMES["NW"]
+    ),
+    "SN": Provider(
+        "SN", url=URLS["SN"], buildings_filename=BUILDINGS_FILENAMES["SN"]
+    ),
+    "TH": Provider(
+        "TH",
+        url=URLS["TH"],
+        buildings_filename=BUILDINGS_FILENAMES["TH"],
+        # remove overlapping areas in the source data
+        snap=0.1,
+    ),
+}
+
+
+def get_provider(fs, config=None):
+    """Get the provider of a federal state
+
+    Providers can be added or changed in the source configuration, e.g. to
+    use the county or tile downloads of a portal:
+        {"providers": {"NI": {
+            "partitions": {"03241": "https://.../hu_03241.zip", ...},
+            "partition_index": {"source": "/data/ni_counties.gpkg",
+                                "field": "AGS"},
+            "member_pattern": "*gebaeude*",
+            "crs": "EPSG:25832",
+            "snap": 0.1,
+            "schema": {"AGS": "ags", "OI": "oid", "GFK": "gfk"},
+            "filter_schema": {"AGS": "ags", "OI": "oid", "GFK": "gfk",
+                              "AKTUALITAE": "datum"}},
+         "NW": {
+            "feature_service": {"type": "wfs", "url": "https://.../wfs",
+                                "typename": "buildings",
+                                "max_area_km2": 50}}}}
+
+    Args:
+        fs (str): federal state abbreviation
+        config (dict): source configuration
+
+    Returns:
+        provider (Provider): provider, None if the federal state is not
+                             supported
+    """
+    provider = PROVIDERS.get(fs)
+    provider_config = (config or {}).get("providers", {}).get(fs)
+    if provider_config:
+        settings = dict(vars(provider)) if provider else {"key": fs}
+        if "schema" in provider_config:
+            # the filter schema of another schema does not apply
+            settings.pop("filter_schema", None)
+        settings.update(provider_config)
+        provider = type(provider or Provider(fs))(**settings)
+    if not provider or not (
+        provider.url or provider.partitioned or provider.feature_service
+    ):
+        return None
+    return provider
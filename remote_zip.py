@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      remote_zip
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Extraction of single members of remote zip files using HTTP
+#              range requests
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import io
+import os
+import shutil
+from zipfile import BadZipFile, ZipFile
+
+from zip_extraction import BUFFER_SIZE, get_target_path
+
+# number of bytes requested at once, reads of zipfile are much smaller
+READ_AHEAD = 8 * 1024 * 1024
+
+
+class HttpRangeFile(io.RawIOBase):
+    """Seekable read-only file object of a remote file using HTTP range
+    requests, so that zipfile only fetches the central directory and the
+    byte ranges of the members it reads.
+    """
+
+    def __init__(self, url, size, session, timeout=800):
+        super().__init__()
+        self.url = url
+        self.size = size
+        self.session = session
+        self.timeout = timeout
+        self.pos = 0
+        self.buffer = b""
+        self.buffer_start = 0
+        self.bytes_fetched = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.pos = offset
+        elif whence == io.SEEK_CUR:
+            self.pos += offset
+        elif whence == io.SEEK_END:
+            self.pos = self.size + offset
+        return self.pos
+
+    def _fetch(self, start, end):
+        """Fetch bytes start to end (inclusive) into the buffer"""
+        response = self.session.get(
+            self.url,
+            headers={"Range": f"bytes={start}-{end}"},
+            timeout=self.timeout,
+        )
+        if response.status_code != 206:
+            raise OSError(f"Range request to {self.url} not supported")
+        self.buffer = response.content
+        self.buffer_start = start
+        self.bytes_fetched += len(self.buffer)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self.pos
+        size = min(size, self.size - self.pos)
+        if size <= 0:
+            return b""
+        buffer_end = self.buffer_start + len(self.buffer)
+        if self.pos < self.buffer_start or self.pos + size > buffer_end:
+            end = min(self.size, self.pos + max(size, READ_AHEAD)) - 1
+            self._fetch(self.pos, end)
+        offset = self.pos - self.buffer_start
+        data = self.buffer[offset : offset + size]
+        self.pos += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def get_range_size(url, session, timeout=60):
+    """Get size of a remote file if the server supports range requests
+
+    Returns:
+        size (int): size of the file in bytes, None if ranges are unsupported
+    """
+    with session.get(
+        url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout
+    ) as response:
+        content_range = response.headers.get("Content-Range", "")
+        if response.status_code != 206 or "/" not in content_range:
+            return None
+        total = content_range.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+def extract_zip_members(zip_file, target_dir, member_filter):
+    """Extract the members of an opened zip file matching member_filter"""
+    paths = []
+    members = [
+        info
+        for info in zip_file.infolist()
+        if not info.is_dir() and member_filter(info.filename)
+    ]
+    # read the members in the order of the archive to avoid extra requests
+    members.sort(key=lambda info: info.header_offset)
+    for info in members:
+        path = get_target_path(target_dir, info.filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with zip_file.open(info) as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, BUFFER_SIZE)
+        os.replace(tmp_path, path)
+        paths.append(path)
+    return paths
+
+
+def fetch_zip_members(url, target_dir, member_filter):
+    """Fetch only the members of a remote (or local) zip file matching
+    member_filter, reading the central directory and member data with HTTP
+    range requests
+
+    Args:
+        url (str): URL or local path of the zip file
+        target_dir (str): directory to extract the members to
+        member_filter (function): returns True for member names to extract
+
+    Returns:
+        paths (list): paths of the extracted files, None if the server does
+                      not support range requests or the file is no zip
+        bytes_fetched (int): number of transferred bytes
+    """
+    if "://" not in url or url.startswith("file:"):
+        path = url[len("file://") :] if url.startswith("file://") else url
+        try:
+            with ZipFile(path) as zip_file:
+                return (
+                    extract_zip_members(zip_file, target_dir, member_filter),
+                    0,
+                )
+        except (OSError, BadZipFile):
+            return None, 0
+
+    import requests
+
+    with requests.Session() as session:
+        try:
+            size = get_range_size(url, session)
+            if not size:
+                return None, 0
+            remote_file = HttpRangeFile(url, size, session)
+            with ZipFile(remote_file) as zip_file:
+                paths = extract_zip_members(
+                    zip_file, target_dir, member_filter
+                )
+        except (OSError, BadZipFile, requests.exceptions.RequestException):
+            return None, 0
+    return paths, remote_file.bytes_fetched
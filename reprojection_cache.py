@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      reprojection_cache
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Cache of ALKIS building sources reprojected to a target CRS
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import glob
+import hashlib
+import os
+import shutil
+import subprocess
+from functools import partial
+from multiprocessing.pool import ThreadPool
+from xml.sax.saxutils import escape, quoteattr
+
+from attribute_filter import get_layer_name
+from cache_lock import single_flight
+
+# minimal number of features per chunk for parallel reprojection
+MIN_CHUNK_SIZE = 50000
+
+
+def get_crs_key(wkt):
+    """Get directory name for a CRS, e.g. EPSG_25832
+
+    Args:
+        wkt (str): WKT of the CRS
+
+    Returns:
+        crs_key (str): EPSG code if identifiable, otherwise hash of the WKT
+    """
+    from osgeo import osr
+
+    srs = osr.SpatialReference()
+    srs.ImportFromWkt(wkt)
+    srs.AutoIdentifyEPSG()
+    code = srs.GetAuthorityCode(None)
+    name = srs.GetAuthorityName(None)
+    if code and name:
+        return f"{name}_{code}"
+    return f"CRS_{hashlib.sha1(wkt.encode('utf-8')).hexdigest()[:12]}"
+
+
+def is_same_crs(wkt1, wkt2):
+    """Check if two WKT describe the same CRS"""
+    from osgeo import osr
+
+    srs1 = osr.SpatialReference()
+    srs1.ImportFromWkt(wkt1)
+    srs2 = osr.SpatialReference()
+    srs2.ImportFromWkt(wkt2)
+    return bool(srs1.IsSame(srs2))
+
+
+def get_source_version(source):
+    """Get version of a source from path, modification time and size
+
+    For shapefiles the attribute file (.dbf) is taken into account too.
+    """
+    stats = []
+    for path in [source, os.path.splitext(source)[0] + ".dbf"]:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            stats.append(f"{stat.st_mtime}:{stat.st_size}")
+    version_str = f"{os.path.abspath(source)}|{'|'.join(stats)}"
+    return hashlib.sha1(version_str.encode("utf-8")).hexdigest()[:12]
+
+
+def create_srs_source(source, srs, target_dir):
+    """Create an OGR VRT file assigning a CRS to a source
+
+    Used for sources without (valid) CRS, e.g. shapefiles without .prj
+    file: the CRS is assigned while the source is read instead of writing a
+    copy of it. The VRT file is named by the version of the source, so a
+    new version of the source gets a new VRT file (and reprojection).
+
+    Args:
+        source (str): path to vector file
+        srs (str): CRS to assign, e.g. EPSG:25832
+        target_dir (str): directory for the VRT file
+
+    Returns:
+        vrt_file (str): path to the VRT file
+    """
+    source = os.path.abspath(source)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    vrt_file = os.path.join(
+        target_dir, f"{stem}_srs_{get_source_version(source)}.vrt"
+    )
+    if os.path.isfile(vrt_file):
+        return vrt_file
+    layer = get_layer_name(source)
+    vrt = (
+        "<OGRVRTDataSource>\n"
+        f"  <OGRVRTLayer name={quoteattr(layer)}>\n"
+        f'    <SrcDataSource relativeToVRT="0">{escape(source)}'
+        "</SrcDataSource>\n"
+        f"    <SrcLayer>{escape(layer)}</SrcLayer>\n"
+        f"    <LayerSRS>{escape(srs)}</LayerSRS>\n"
+        "  </OGRVRTLayer>\n"
+        "</OGRVRTDataSource>\n"
+    )
+    os.makedirs(target_dir, exist_ok=True)
+    tmp_file = f"{vrt_file}.tmp{os.getpid()}"
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        file.write(vrt)
+    os.replace(tmp_file, vrt_file)
+    return vrt_file
+
+
+def create_region_source(source, bbox, target_dir):
+    """Create an OGR VRT file reading only the features of a source which
+    intersect with a bounding box
+
+    Used to restrict the import of a source in another CRS than the
+    location to the import region, transformed into the CRS of the source.
+    The features are not cut at the bounding box.
+
+    Args:
+        source (str): path to vector file
+        bbox (list): west, south, east, north in the CRS of the source
+        target_dir (str): directory for the VRT file
+
+    Returns:
+        vrt_file (str): path to the VRT file
+    """
+    if not source.startswith("/vsi"):
+        source = os.path.abspath(source)
+    west, south, east, north = bbox
+    region = (
+        f"POLYGON(({west} {south},{east} {south},{east} {north},"
+        f"{west} {north},{west} {south}))"
+    )
+    key = hashlib.sha256(f"{source}\n{region}".encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(source))[0]
+    vrt_file = os.path.join(target_dir, f"{stem}_region_{key}.vrt")
+    if os.path.isfile(vrt_file):
+        return vrt_file
+    layer = get_layer_name(source)
+    vrt = (
+        "<OGRVRTDataSource>\n"
+        f"  <OGRVRTLayer name={quoteattr(layer)}>\n"
+        f'    <SrcDataSource relativeToVRT="0">{escape(source)}'
+        "</SrcDataSource>\n"
+        f"    <SrcLayer>{escape(layer)}</SrcLayer>\n"
+        f"    <SrcRegion>{region}</SrcRegion>\n"
+        "  </OGRVRTLayer>\n"
+        "</OGRVRTDataSource>\n"
+    )
+    os.makedirs(target_dir, exist_ok=True)
+    tmp_file = f"{vrt_file}.tmp{os.getpid()}"
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        file.write(vrt)
+    os.replace(tmp_file, vrt_file)
+    return vrt_file
+
+
+def get_layer_info(source):
+    """Get layer name, CRS, feature count and FID range of a source
+
+    Returns:
+        info (dict): layer name, CRS as WKT, number of features, first and
+                     last FID and the name of the FID column to filter on
+    """
+    from osgeo import ogr
+
+    data_source = ogr.Open(source)
+    if data_source is None:
+        raise RuntimeError(f"Could not open {source}")
+    layer = data_source.GetLayerByIndex(0)
+    srs = layer.GetSpatialRef()
+    info = {
+        "layer": layer.GetName(),
+        "crs": srs.ExportToWkt() if srs else None,
+        "features": layer.GetFeatureCount(),
+        "fid_column": layer.GetFIDColumn() or "FID",
+        "fid_min": None,
+        "fid_max": None,
+    }
+    if data_source.GetDriver().GetName() == "ESRI Shapefile":
+        info["fid_min"] = 0
+        info["fid_max"] = info["features"] - 1
+    elif data_source.GetDriver().GetName() == "GPKG" and layer.GetFIDColumn():
+        result = data_source.ExecuteSQL(
+            f'SELECT MIN("{info["fid_column"]}"), '
+            f'MAX("{info["fid_column"]}") FROM "{info["layer"]}"',
+            dialect="SQLite",
+        )
+        feature = result.GetNextFeature()
+        if feature is not None:
+            info["fid_min"] = feature.GetField(0)
+            info["fid_max"] = feature.GetField(1)
+        data_source.ReleaseResultSet(result)
+    return info
+
+
+def get_chunks(info, nprocs):
+    """Split the FID range of a layer into chunks for parallel processing
+
+    Returns:
+        chunks (list): OGR where clauses, [None] if the layer can not be split
+    """
+    if info["fid_min"] is None or info["fid_max"] is None:
+        return [None]
+    num_chunks = min(nprocs, max(1, info["features"] // MIN_CHUNK_SIZE))
+    if num_chunks < 2:
+        return [None]
+    fid_col = info["fid_column"]
+    step = (info["fid_max"] - info["fid_min"]) // num_chunks + 1
+    chunks = []
+    for start in range(info["fid_min"], info["fid_max"] + 1, step):
+        chunks.append(f"{fid_col} >= {start} AND {fid_col} < {start + step}")
+    return chunks
+
+
+def run_ogr2ogr(args):
+    """Run ogr2ogr with the given arguments"""
+    proc = subprocess.run(
+        ["ogr2ogr", *args], capture_output=True, text=True, check=False
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ogr2ogr {' '.join(args)} failed: {proc.stderr}")
+
+
+def create_reprojected_copy(source, target_wkt, cached_source, nprocs=1):
+    """Create reprojected copy of a source in parallel chunks of FID ranges
+    which are merged afterwards
+
+    Args:
+        source (str): path to vector file
+        target_wkt (str): WKT of the target CRS
+        cached_source (str): path of the reprojected GPKG
+        nprocs (int): number of parallel ogr2ogr processes
+    """
+    info = get_layer_info(source)
+    if info["crs"] is None:
+        raise RuntimeError(f"CRS of {source} is unknown")
+    tmp_dir = f"{cached_source}.tmp{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    srs_file = os.path.join(tmp_dir, "target_srs.wkt")
+    with open(srs_file, "w", encoding="utf-8") as file:
+        file.write(target_wkt)
+    base_args = ["-f", "GPKG", "-t_srs", srs_file, "-nlt", "PROMOTE_TO_MULTI"]
+
+    chunks = get_chunks(info, nprocs)
+    chunk_files = []
+    chunk_args = []
+    for i, where in enumerate(chunks):
+        chunk_file = os.path.join(tmp_dir, f"chunk_{i}.gpkg")
+        chunk_files.append(chunk_file)
+        args = [*base_args, "-nln", info["layer"], chunk_file, source]
+        if where:
+            args.extend(["-where", where])
+        args.append(info["layer"])
+        chunk_args.append(args)
+    try:
+        pool = ThreadPool(len(chunk_args))
+        pool.map(run_ogr2ogr, chunk_args)
+        pool.close()
+        pool.join()
+        for chunk_file in chunk_files[1:]:
+            run_ogr2ogr(
+                [
+                    "-append",
+                    "-update",
+                    "-nln",
+                    info["layer"],
+                    chunk_files[0],
+                    chunk_file,
+                ]
+            )
+        # atomic rename, so that an incomplete copy is never used
+        os.replace(chunk_files[0], cached_source)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def reproject_source(source, target_wkt, cache_dir, nprocs=1):
+    """Get reprojected copy of a source, create it if not cached yet
+
+    The reprojected copy is stored as GPKG in
+    <cache_dir>/<crs_key>/<source name>_<source version>.gpkg. It is created
+    by only one job at a time, other jobs needing the same copy wait for it.
+    Older versions of the same source in the cache are removed.
+
+    Args:
+        source (str): path to vector file
+        target_wkt (str): WKT of the target CRS
+        cache_dir (str): directory for the cached copies
+        nprocs (int): number of parallel ogr2ogr processes
+
+    Returns:
+        cached_source (str): path to the reprojected GPKG
+        created (bool): True if the copy was created, False if cached
+    """
+    crs_dir = os.path.join(cache_dir, get_crs_key(target_wkt))
+    os.makedirs(crs_dir, exist_ok=True)
+    source_name = os.path.splitext(os.path.basename(source))[0]
+    cached_source = os.path.join(
+        crs_dir, f"{source_name}_{get_source_version(source)}.gpkg"
+    )
+    if os.path.isfile(cached_source):
+        return cached_source, False
+    created = single_flight(
+        cached_source,
+        partial(
+            create_reprojected_copy, source, target_wkt, cached_source, nprocs
+        ),
+    )
+    if not created:
+        return cached_source, False
+
+    # remove older versions of the source
+    version_pattern = "[0-9a-f]" * 12
+    for old_file in glob.glob(
+        os.path.join(crs_dir, f"{source_name}_{version_pattern}.gpkg")
+    ):
+        if old_file != cached_source:
+            os.remove(old_file)
+    return cached_source, True
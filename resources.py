@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      resources
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     CPU and memory budget of the import, auto-detected from the
+#              cgroup limits of the container
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import math
+import os
+import threading
+from contextlib import contextmanager
+
+CGROUP_DIR = "/sys/fs/cgroup"
+# share of the detected memory used for the budget
+MEMORY_SHARE = 0.75
+# minimal memory of a GRASS module in MB
+MIN_MODULE_MEMORY = 300
+# maximal number of parallel downloads, more do not speed up the transfer
+MAX_DOWNLOADS = 4
+# share of the processes per stage; stages running at the same time (e.g.
+# extraction and import in a pipeline) share the budget
+STAGE_SHARES = {
+    "download": 1.0,
+    "extract": 0.5,
+    "import": 1.0,
+    "reproject": 1.0,
+}
+
+
+def read_cgroup_file(*paths):
+    """Read the first existing cgroup file"""
+    for path in paths:
+        try:
+            with open(
+                os.path.join(CGROUP_DIR, path), encoding="utf-8"
+            ) as file:
+                return file.read().strip()
+        except OSError:
+            continue
+    return None
+
+
+def get_cgroup_cpus():
+    """Get CPU limit of the cgroup (v2 or v1)
+
+    Returns:
+        cpus (float): number of CPUs, None if not limited
+    """
+    cpu_max = read_cgroup_file("cpu.max")
+    if cpu_max:
+        quota, period = (cpu_max.split() + ["100000"])[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    quota = read_cgroup_file(
+        "cpu/cpu.cfs_quota_us", "cpu,cpuacct/cpu.cfs_quota_us"
+    )
+    period = read_cgroup_file(
+        "cpu/cpu.cfs_period_us", "cpu,cpuacct/cpu.cfs_period_us"
+    )
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def get_cgroup_memory():
+    """Get memory limit of the cgroup (v2 or v1)
+
+    Returns:
+        memory (int): memory in MB, None if not limited
+    """
+    limit = read_cgroup_file("memory.max", "memory/memory.limit_in_bytes")
+    if not limit or not limit.isdigit():
+        return None
+    memory = int(limit) // 1024**2
+    # cgroup v1 reports a huge number if not limited
+    if memory >= get_system_memory():
+        return None
+    return memory
+
+
+def get_system_memory():
+    """Get available memory of the system in MB"""
+    try:
+        with open("/proc/meminfo", encoding="utf-8") as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 1024**2
+
+
+def get_available_cpus():
+    """Get number of CPUs available to the process, respecting the CPU
+    affinity and the cgroup limit
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    cgroup_cpus = get_cgroup_cpus()
+    if cgroup_cpus:
+        cpus = min(cpus, max(1, math.floor(cgroup_cpus)))
+    return cpus
+
+
+def get_available_memory():
+    """Get memory available to the process in MB"""
+    memory = get_system_memory()
+    cgroup_memory = get_cgroup_memory()
+    if cgroup_memory:
+        memory = min(memory, cgroup_memory)
+    return memory
+
+
+class ResourceManager:
+    """Budget of processes and memory shared by the stages of the import
+
+    Args:
+        nprocs (int): number of processes, 0 to use all available CPUs,
+                      negative to leave CPUs free
+        memory (int): memory in MB, 0 to use a share of the available
+                      memory
+    """
+
+    def __init__(self, nprocs=0, memory=0):
+        self.lock = threading.Lock()
+        # number of stages running at the same time, see pipeline()
+        self.stages = 1
+        available_cpus = get_available_cpus()
+        nprocs = int(nprocs or 0)
+        if nprocs <= 0:
+            nprocs = available_cpus + nprocs
+        self.nprocs = max(1, nprocs)
+        memory = int(memory or 0)
+        if memory <= 0:
+            memory = int(get_available_memory() * MEMORY_SHARE)
+        self.memory = max(MIN_MODULE_MEMORY, memory)
+
+    def workers(self, stage, items=None):
+        """Get number of parallel workers of a stage
+
+        Imports are limited by the memory as well, so that every module
+        gets at least MIN_MODULE_MEMORY.
+
+        Args:
+            stage (str): download, extract, import or reproject
+            items (int): number of items to process, if known
+
+        Returns:
+            workers (int): number of workers
+        """
+        workers = max(1, int(self.nprocs * STAGE_SHARES[stage]))
+        if stage == "download":
+            workers = min(max(2, workers), MAX_DOWNLOADS)
+        elif stage == "import":
+            workers = min(workers, self.memory // MIN_MODULE_MEMORY)
+        if items is not None:
+            workers = min(workers, items)
+        return max(1, workers)
+
+    @contextmanager
+    def pipeline(self, stages):
+        """Share the memory budget with the other stages of a pipeline while
+        it runs; nested pipelines (e.g. the partitions of a federal state
+        imported in the import stage) add their stages
+
+        Args:
+            stages (int): number of stages running at the same time
+        """
+        with self.lock:
+            self.stages += stages - 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.stages -= stages - 1
+
+    def module_memory(self, workers=1):
+        """Get memory in MB of one of workers modules running in parallel,
+        the budget is split between the stages running at the same time
+        """
+        with self.lock:
+            stages = max(1, self.stages)
+        return max(
+            MIN_MODULE_MEMORY, self.memory // (max(1, workers) * stages)
+        )
+
+    def get_gdal_env(self):
+        """Get environment variables limiting the caches and threads of
+        GDAL/OGR, used by v.import, v.in.ogr and ogr2ogr
+
+        The processes and the memory are divided between the imports running
+        in parallel, so that they do not oversubscribe the CPUs.
+        """
+        workers = self.workers("import")
+        cache = self.module_memory(workers)
+        return {
+            "GDAL_CACHEMAX": str(cache),
+            "OGR_SQLITE_CACHE": str(max(1, cache // 4)),
+            "GDAL_NUM_THREADS": str(max(1, self.nprocs // workers)),
+        }
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      result_cache
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Cache of imported ALKIS building maps in a cache mapset,
+#              keyed by AOI, federal states, options and source versions
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import hashlib
+import json
+import os
+import time
+
+import grass.script as grass
+from grass.grassdb.create import create_mapset
+
+from cache_lock import file_lock
+
+# maximal number of cached results, the least recently used are removed
+MAX_ENTRIES = 20
+INDEX_FILENAME = "result_cache.json"
+
+
+def get_geometry_hash(vector_map):
+    """Get hash of the geometries of a vector map"""
+    ascii_map = grass.read_command(
+        "v.out.ascii", input=vector_map, format="standard", quiet=True
+    )
+    return hashlib.sha256(ascii_map.encode()).hexdigest()
+
+
+def get_cache_key(key_parts):
+    """Get cache key of a result
+
+    Args:
+        key_parts (dict): everything the result depends on, e.g. the AOI
+                          hash, the federal states, options and the source
+                          versions (JSON serializable)
+
+    Returns:
+        key (str): cache key
+    """
+    key_json = json.dumps(key_parts, sort_keys=True)
+    return hashlib.sha256(key_json.encode()).hexdigest()[:16]
+
+
+class ResultCache:
+    """Imported vector maps cached in a mapset of the current location
+
+    The cache mapset is created if it does not exist. GRASS modules can only
+    write to the current mapset, so the maps are copied into the cache
+    mapset by modules running with a temporary GISRC file pointing to it.
+    An index file in the cache mapset records the last use of each entry;
+    the least recently used entries are removed if there are more than
+    max_entries. The index is locked, so that several jobs can share the
+    cache.
+
+    Args:
+        mapset (str): name of the cache mapset
+        max_entries (int): maximal number of cached results
+    """
+
+    def __init__(self, mapset, max_entries=MAX_ENTRIES):
+        gisenv = grass.gisenv()
+        self.mapset = mapset
+        self.max_entries = max_entries
+        self.current_mapset = gisenv["MAPSET"]
+        location_dir = os.path.join(
+            gisenv["GISDBASE"], gisenv["LOCATION_NAME"]
+        )
+        self.mapset_dir = os.path.join(location_dir, mapset)
+        self.index_file = os.path.join(self.mapset_dir, INDEX_FILENAME)
+        self.gisrc = grass.tempfile()
+        with open(self.gisrc, "w", encoding="utf-8") as file:
+            file.write(
+                f"GISDBASE: {gisenv['GISDBASE']}\n"
+                f"LOCATION_NAME: {gisenv['LOCATION_NAME']}\n"
+                f"MAPSET: {mapset}\n"
+            )
+        self.env = os.environ.copy()
+        self.env["GISRC"] = self.gisrc
+        with file_lock(self.mapset_dir):
+            if not os.path.isdir(self.mapset_dir):
+                # the mapset is created like g.mapset -c does, g.mapset
+                # itself would move the lock of the current session
+                create_mapset(
+                    gisenv["GISDBASE"], gisenv["LOCATION_NAME"], mapset
+                )
+            if not os.path.isfile(os.path.join(self.mapset_dir, "VAR")):
+                # VAR with the default SQLite connection and its directory
+                grass.run_command(
+                    "db.connect", flags="c", env=self.env, quiet=True
+                )
+                os.makedirs(
+                    os.path.join(self.mapset_dir, "sqlite"), exist_ok=True
+                )
+
+    def read_index(self):
+        """Read the index of the cache entries"""
+        if not os.path.isfile(self.index_file):
+            return {}
+        with open(self.index_file, encoding="utf-8") as file:
+            return json.load(file)
+
+    def write_index(self, index):
+        """Write the index of the cache entries atomically"""
+        tmp_file = f"{self.index_file}.tmp{os.getpid()}"
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            json.dump(index, file, indent=2)
+        os.replace(tmp_file, self.index_file)
+
+    def get(self, key, output):
+        """Copy a cached result into the current mapset
+
+        Args:
+            key (str): cache key
+            output (str): name of the output vector map
+
+        Returns:
+            hit (bool): True if the result was cached
+        """
+        with file_lock(self.index_file):
+            index = self.read_index()
+            entry = index.get(key)
+            if (
+                not entry
+                or not grass.find_file(
+                    entry["map"], element="vector", mapset=self.mapset
+                )["file"]
+            ):
+                return False
+            grass.run_command(
+                "g.copy",
+                vector=f"{entry['map']}@{self.mapset},{output}",
+                quiet=True,
+            )
+            entry["last_used"] = time.time()
+            self.write_index(index)
+        return True
+
+    def put(self, key, vector_map):
+        """Copy a result into the cache mapset and remove the least recently
+        used entries
+
+        Args:
+            key (str): cache key
+            vector_map (str): name of the vector map in the current mapset
+        """
+        cache_map = f"alkis_buildings_{key}"
+        with file_lock(self.index_file):
+            grass.run_command(
+                "g.copy",
+                vector=f"{vector_map}@{self.current_mapset},{cache_map}",
+                overwrite=True,
+                env=self.env,
+                quiet=True,
+            )
+            index = self.read_index()
+            now = time.time()
+            index[key] = {"map": cache_map, "created": now, "last_used": now}
+            lru_keys = sorted(index, key=lambda k: index[k]["last_used"])
+            evict_keys = lru_keys[: max(0, len(index) - self.max_entries)]
+            if evict_keys:
+                grass.run_command(
+                    "g.remove",
+                    type="vector",
+                    name=[index[k]["map"] for k in evict_keys],
+                    flags="f",
+                    env=self.env,
+                    quiet=True,
+                )
+                for evict_key in evict_keys:
+                    del index[evict_key]
+            self.write_index(index)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      shards
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Job manifest of shards (federal states x partitions x tiles)
+#              processed by independent workers sharing a directory
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import json
+import math
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+MANIFEST_VERSION = 1
+# map units the import region of a tile is extended by, so that the whole
+# buildings with their centroid in the tile are imported
+SHARD_MARGIN = 500
+# seconds after which the claim of a shard is stale if its worker does not
+# renew it, e.g. because the worker was killed
+CLAIM_LEASE = 600
+
+
+def get_tiles(bbox, size):
+    """Split a bounding box into tiles
+
+    Args:
+        bbox (dict): n, s, e, w of the bounding box
+        size (float): tile size in map units, 0 for a single tile
+
+    Returns:
+        tiles (list): bounding boxes of the tiles (dicts with n, s, e, w)
+    """
+    if not size:
+        return [dict(bbox)]
+    tiles = []
+    west = math.floor(bbox["w"] / size) * size
+    south = math.floor(bbox["s"] / size) * size
+    y = south
+    while y < bbox["n"]:
+        x = west
+        while x < bbox["e"]:
+            tiles.append({"n": y + size, "s": y, "e": x + size, "w": x})
+            x += size
+        y += size
+    return tiles
+
+
+def grow_region(region, margin):
+    """Get region extended by margin on all sides"""
+    return {
+        "n": region["n"] + margin,
+        "s": region["s"] - margin,
+        "e": region["e"] + margin,
+        "w": region["w"] - margin,
+    }
+
+
+def is_in_tile(tile, x, y):
+    """Check if a point is in a tile; points on the east or north border
+    belong to the neighbouring tile, so each point is in exactly one tile
+    of a grid
+    """
+    return tile["w"] <= x < tile["e"] and tile["s"] <= y < tile["n"]
+
+
+def create_shards(federal_states, bbox=None, tile_size=0):
+    """Create the shards of a job
+
+    Federal states with partitions (e.g. the districts of Brandenburg) are
+    split by their partitions, the other federal states by tiles of the
+    bounding box of the AOI/region. The buildings of tiled shards are
+    assigned to the tile containing their centroid (see is_in_tile), so
+    buildings at the tile borders are neither cut nor duplicated.
+
+    Args:
+        federal_states (list): tuples of the name of the federal state and
+                               its partition keys (None if not partitioned)
+        bbox (dict): n, s, e, w of the AOI/region, None to import the
+                     complete federal states
+        tile_size (float): tile size in map units, 0 for no tiles
+
+    Returns:
+        shards (list): shards with id, federal state, partitions, region
+                       and whether the region is a tile
+    """
+    shards = []
+    for federal_state, partitions in federal_states:
+        tiled = False
+        if partitions:
+            units = [([key], bbox) for key in sorted(partitions)]
+        elif bbox and tile_size:
+            # tiles limited to the bounding box
+            units = [
+                (
+                    None,
+                    {
+                        "n": min(tile["n"], bbox["n"]),
+                        "s": max(tile["s"], bbox["s"]),
+                        "e": min(tile["e"], bbox["e"]),
+                        "w": max(tile["w"], bbox["w"]),
+                    },
+                )
+                for tile in get_tiles(bbox, tile_size)
+            ]
+            tiled = True
+        else:
+            units = [(None, bbox)]
+        for shard_partitions, region in units:
+            shards.append(
+                {
+                    "id": f"{len(shards):05d}",
+                    "federal_state": federal_state,
+                    "partitions": shard_partitions,
+                    "region": region,
+                    "tiled": tiled,
+                }
+            )
+    return shards
+
+
+def get_shard_dir(manifest_file):
+    """Get directory of the claims and outputs of the shards of a manifest"""
+    return f"{manifest_file}.d"
+
+
+def write_manifest(manifest_file, job, shards):
+    """Write the job manifest
+
+    Args:
+        manifest_file (str): path of the manifest (JSON)
+        job (dict): settings shared by all shards (e.g. options and flags)
+        shards (list): shards, see create_shards
+    """
+    manifest = {"version": MANIFEST_VERSION, "job": job, "shards": shards}
+    os.makedirs(get_shard_dir(manifest_file), exist_ok=True)
+    tmp_file = f"{manifest_file}.tmp{os.getpid()}"
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(tmp_file, manifest_file)
+
+
+def read_manifest(manifest_file):
+    """Read the job manifest"""
+    with open(manifest_file, encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise RuntimeError(f"Unsupported manifest version in {manifest_file}")
+    return manifest
+
+
+def get_marker(manifest_file, shard_id, state):
+    """Get path of the claim, done or failed marker of a shard"""
+    return os.path.join(get_shard_dir(manifest_file), f"{shard_id}.{state}")
+
+
+def get_stale_claim_time(manifest_file, shard_id, lease=CLAIM_LEASE):
+    """Get time of the last renewal of a stale claim
+
+    A claim is stale if the shard is not done or failed and its claim was
+    not renewed within the lease.
+
+    Returns:
+        mtime (float): modification time of the claim, None if the shard
+                       has no stale claim
+    """
+    if any(
+        os.path.isfile(get_marker(manifest_file, shard_id, state))
+        for state in ("done", "failed")
+    ):
+        return None
+    try:
+        mtime = os.path.getmtime(get_marker(manifest_file, shard_id, "claim"))
+    except FileNotFoundError:
+        return None
+    return mtime if mtime < time.time() - lease else None
+
+
+def claim_shard(manifest_file, shard_id, lease=CLAIM_LEASE):
+    """Claim a shard; only one worker can claim a shard
+
+    The claim file is created exclusively, which is atomic on local and
+    NFS file systems. A stale claim (see get_stale_claim_time) is taken over
+    by the one worker which exclusively creates the reclaim marker named by
+    the time of the last renewal of the claim.
+
+    Returns:
+        claimed (bool): True if the shard was claimed by this worker
+    """
+    claim = get_marker(manifest_file, shard_id, "claim")
+    try:
+        fd = os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        mtime = get_stale_claim_time(manifest_file, shard_id, lease)
+        if mtime is None:
+            return False
+        try:
+            os.close(
+                os.open(
+                    f"{claim}.{mtime:.6f}.reclaim",
+                    os.O_CREAT | os.O_EXCL | os.O_WRONLY,
+                )
+            )
+        except FileExistsError:
+            return False
+        fd = os.open(claim, os.O_TRUNC | os.O_WRONLY)
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        file.write(f"{socket.gethostname()} {os.getpid()}\n")
+    return True
+
+
+@contextmanager
+def claim_heartbeat(manifest_file, shard_id, lease=CLAIM_LEASE):
+    """Renew the claim of a shard while it is processed, so that it only
+    becomes stale if the worker stops
+    """
+    claim = get_marker(manifest_file, shard_id, "claim")
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(lease / 4):
+            os.utime(claim)
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def claim_next_shard(manifest_file, manifest, lease=CLAIM_LEASE):
+    """Claim the next shard which is not claimed yet or whose claim is
+    stale
+
+    Returns:
+        shard (dict): claimed shard, None if all shards are claimed
+    """
+    for shard in manifest["shards"]:
+        if claim_shard(manifest_file, shard["id"], lease):
+            return shard
+    return None
+
+
+def mark_shard(manifest_file, shard_id, state, result=None):
+    """Mark a shard as done or failed
+
+    Args:
+        manifest_file (str): path of the manifest
+        shard_id (str): id of the shard
+        state (str): done or failed
+        result (dict): e.g. the output file or the error
+    """
+    marker = get_marker(manifest_file, shard_id, state)
+    tmp_file = f"{marker}.tmp{os.getpid()}"
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump(result or {}, file)
+    os.replace(tmp_file, marker)
+
+
+def get_shard_results(manifest_file, manifest):
+    """Get the results of the shards in the order of the manifest
+
+    Returns:
+        results (list): result of each done shard (None if not done)
+        failed (list): ids of the failed shards
+    """
+    results = []
+    failed = []
+    for shard in manifest["shards"]:
+        done_marker = get_marker(manifest_file, shard["id"], "done")
+        if os.path.isfile(done_marker):
+            with open(done_marker, encoding="utf-8") as file:
+                results.append(json.load(file))
+            continue
+        results.append(None)
+        if os.path.isfile(get_marker(manifest_file, shard["id"], "failed")):
+            failed.append(shard["id"])
+    return results, failed
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import startup benchmark
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Benchmark of the startup time of v.alkis.buildings.import
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+"""Measures the startup time of v.alkis.buildings.import for
+--interface-description (as used by GRASS, GUI and batch drivers) and checks
+that no heavy dependency is imported before the parser runs.
+
+Run inside a GRASS session:
+    python3 testsuite/benchmark/benchmark_startup.py [number of runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODULE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "..",
+    "v.alkis.buildings.import.py",
+)
+# modules which must only be imported on the code paths using them
+LAZY_MODULES = ["py7zr", "requests", "grass_gis_helpers"]
+# maximal mean startup time in seconds
+MAX_STARTUP_TIME = 1.0
+
+
+def measure_startup(runs):
+    """Measure wall time of --interface-description calls"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, MODULE, "--interface-description"],
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def eagerly_imported_modules():
+    """Get lazy modules which are imported before the parser runs"""
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            MODULE,
+            "--interface-description",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        name = line.rsplit("|", 1)[-1].strip()
+        imported.add(name.split(".")[0])
+    return sorted(set(LAZY_MODULES) & imported)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    times = measure_startup(runs)
+    mean = statistics.mean(times)
+    print(
+        f"--interface-description: mean {mean:.3f}s, "
+        f"min {min(times):.3f}s, max {max(times):.3f}s ({runs} runs)"
+    )
+    failed = False
+    eager = eagerly_imported_modules()
+    if eager:
+        print(f"Imported before the parser runs: {', '.join(eager)}")
+        failed = True
+    if mean > MAX_STARTUP_TIME:
+        print(f"Mean startup time exceeds {MAX_STARTUP_TIME}s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
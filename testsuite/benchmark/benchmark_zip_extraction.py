@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import zip extraction benchmark
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Benchmark of parallel against single-threaded zip extraction
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+"""Compares ZipFile.extractall() with the parallel extract_members() on a
+synthetic shapefile-like archive (.shp, .dbf, .shx, .prj, .cpg members).
+
+Run:
+    python3 testsuite/benchmark/benchmark_zip_extraction.py [MB per member]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from zipfile import ZIP_DEFLATED, ZipFile
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."),
+)
+# pylint: disable=wrong-import-position
+from zip_extraction import extract_members  # noqa: E402
+
+MEMBERS = {
+    "hu_shp.shp": 1.0,
+    "hu_shp.dbf": 0.8,
+    "hu_shp.shx": 0.1,
+    "hu_shp.prj": 0.0,
+    "hu_shp.cpg": 0.0,
+}
+
+
+def create_zip(zip_path, size_mb):
+    """Create a zip file with compressible random members"""
+    rand = random.Random(42)
+    words = [bytes(rand.choices(range(65, 91), k=8)) for _ in range(1000)]
+    with ZipFile(zip_path, "w", ZIP_DEFLATED) as zip_obj:
+        for member, share in MEMBERS.items():
+            size = max(100, int(size_mb * share * 1024 * 1024))
+            data = b" ".join(rand.choices(words, k=size // 9))
+            zip_obj.writestr(member, data)
+
+
+def timed(func, *args):
+    """Get wall time of a function call"""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def extract_all(zip_path, target_dir):
+    """Current single-threaded extraction"""
+    with ZipFile(zip_path, "r") as zip_obj:
+        zip_obj.extractall(target_dir)
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 100
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        zip_path = os.path.join(tmp_dir, "test.zip")
+        create_zip(zip_path, size_mb)
+        single = timed(extract_all, zip_path, os.path.join(tmp_dir, "a"))
+        parallel = timed(
+            extract_members, zip_path, os.path.join(tmp_dir, "b"), None, 4
+        )
+        print(f"ZipFile.extractall:   {single:.3f}s")
+        print(f"extract_members (4):  {parallel:.3f}s")
+        print(f"speedup:              {single / parallel:.2f}")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
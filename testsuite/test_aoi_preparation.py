@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the AOI preparation
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the import regions of the AOI parts and the clipping
+#              of only the buildings at the AOI boundary
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import sys
+
+from grass.gunittest.main import test
+import grass.script as grass
+
+from v_alkis_buildings_import_base import VAlkisBuildingsImportTestBase
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from aoi_preparation import PreparedAoi, group_regions  # noqa: E402
+
+
+def clip_vector(input_map, clip_map, output):
+    """Clip a vector map with v.clip"""
+    grass.run_command(
+        "v.clip", input=input_map, clip=clip_map, output=output, quiet=True
+    )
+
+
+class VAlkisBuildingsImportTestAoiPreparation(VAlkisBuildingsImportTestBase):
+    """Prepares AOIs for a grid of 20 x 20 buildings of 40 m x 40 m with
+    10 m between them
+    """
+
+    prefix = f"test_aoi_prep_{os.getpid()}"
+    buildings = f"{prefix}_buildings"
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def setUpClass(cls):
+        super().setUpClass()
+        grass.run_command("g.region", n=1000, s=0, w=0, e=1000, res=50)
+        grid = f"{cls.prefix}_grid"
+        grass.run_command("v.mkgrid", map=grid, grid=[20, 20], quiet=True)
+        # buildings shrunk by 5 m, so that they do not share boundaries
+        grass.run_command(
+            "v.buffer",
+            input=grid,
+            output=cls.buildings,
+            distance=-5,
+            flags="s",
+            quiet=True,
+        )
+        grass.run_command("g.remove", type="vector", name=grid, flags="f")
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def tearDownClass(cls):
+        grass.run_command(
+            "g.remove", type="vector", pattern=f"{cls.prefix}*", flags="f"
+        )
+        super().tearDownClass()
+
+    def tearDown(self):
+        super().tearDown()
+        grass.run_command(
+            "g.remove",
+            type="vector",
+            pattern=f"{self.prefix}_[ac]*",
+            flags="f",
+        )
+
+    def create_aoi(self, name, regions):
+        """Create an AOI with one square area per region"""
+        parts = []
+        for i, region in enumerate(regions):
+            part = f"{self.prefix}_aoi_part_{i}"
+            grass.run_command(
+                "v.in.region",
+                output=part,
+                env=grass.region_env(**region),
+                quiet=True,
+            )
+            parts.append(part)
+        grass.run_command("v.patch", input=parts, output=name, quiet=True)
+        return name
+
+    def count_centroids(self, vector_map):
+        """Get number of centroids of a vector map"""
+        return int(grass.vector_info_topo(vector_map)["centroids"])
+
+    def get_area(self, vector_map):
+        """Get total area of a vector map"""
+        return sum(
+            float(line.split("|")[1])
+            for line in grass.read_command(
+                "v.to.db",
+                map=vector_map,
+                type="centroid",
+                option="area",
+                flags="p",
+                separator="pipe",
+                quiet=True,
+            ).splitlines()[1:]
+        )
+
+    def test_no_tessellation_without_clip(self):
+        """Tests that the AOI is only tessellated when buildings are
+        clipped
+        """
+        aoi = self.create_aoi(
+            f"{self.prefix}_aoi", [{"n": 880, "s": 120, "w": 120, "e": 880}]
+        )
+        prepared = PreparedAoi(aoi, f"{self.prefix}_a1")
+        self.assertEqual(len(prepared.regions), 1)
+        self.assertFalse(prepared.tessellated)
+        self.assertFalse(
+            [name for name in prepared.tmp_maps if "grid" in name]
+        )
+        output = f"{self.prefix}_clipped"
+        prepared.clip(self.buildings, output, clip_vector)
+        self.assertTrue(prepared.tessellated)
+        self.assertIsNotNone(prepared.interior)
+
+        # same result as clipping all buildings
+        reference = f"{self.prefix}_clipped_all"
+        clip_vector(self.buildings, aoi, reference)
+        self.assertEqual(
+            self.count_centroids(output), self.count_centroids(reference)
+        )
+        self.assertAlmostEqual(
+            self.get_area(output), self.get_area(reference), places=3
+        )
+
+    def test_regions(self):
+        """Tests that the parts of a spread-out AOI get their own regions"""
+        aoi = self.create_aoi(
+            f"{self.prefix}_aoi",
+            [
+                {"n": 100, "s": 0, "w": 0, "e": 100},
+                {"n": 1000, "s": 900, "w": 900, "e": 1000},
+            ],
+        )
+        prepared = PreparedAoi(aoi, f"{self.prefix}_a2", grid_cells=0)
+        self.assertEqual(
+            sorted((r["w"], r["s"], r["e"], r["n"]) for r in prepared.regions),
+            [(0, 0, 100, 100), (900, 900, 1000, 1000)],
+        )
+        # without grid cells all buildings are clipped
+        output = f"{self.prefix}_clipped"
+        prepared.clip(self.buildings, output, clip_vector)
+        self.assertIsNone(prepared.interior)
+        self.assertEqual(self.count_centroids(output), 8)
+
+    def test_group_regions(self):
+        """Tests that the regions are grouped from west to east"""
+        bboxes = [
+            {"n": 10, "s": 0, "w": x * 100, "e": x * 100 + 10}
+            for x in range(4)
+        ]
+        self.assertEqual(
+            group_regions(bboxes, 2),
+            [
+                {"n": 10, "s": 0, "w": 0, "e": 110},
+                {"n": 10, "s": 0, "w": 200, "e": 310},
+            ],
+        )
+        # regions covering most of the bounding box of the AOI
+        bboxes = [
+            {"n": 10, "s": 0, "w": 0, "e": 10},
+            {"n": 10, "s": 0, "w": 10, "e": 20},
+        ]
+        self.assertEqual(
+            group_regions(bboxes), [{"n": 10, "s": 0, "w": 0, "e": 20}]
+        )
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the attribute filter
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the mapping of the where option to the columns of the
+#              federal states and the OGR VRT files filtering the sources
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from xml.sax.saxutils import unescape
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+import attribute_filter  # noqa: E402
+from attribute_filter import (  # noqa: E402
+    create_filtered_source,
+    get_referenced_columns,
+    get_source_where,
+    get_unmapped_columns,
+    map_where,
+)
+from providers import HU_FILTER_SCHEMA, get_provider  # noqa: E402
+from reprojection_cache import create_region_source  # noqa: E402
+
+# columns of the where option mapped for each federal state
+WHERE_COLUMNS = ["AGS", "OI", "GFK", "AKTUALITAE"]
+
+
+class MapWhereTest(unittest.TestCase):
+    """Tests the mapping of the where option to the source columns"""
+
+    schema = {"AGS": "ags", "OI": "oid", "GFK": "gfk"}
+
+    def test_identifiers(self):
+        """Tests that output columns are mapped case-insensitively"""
+        self.assertEqual(
+            map_where("gfk IN ('31001_1000') AND Ags LIKE '05%'", self.schema),
+            "gfk IN ('31001_1000') AND ags LIKE '05%'",
+        )
+
+    def test_string_literals(self):
+        """Tests that column names inside string literals are kept"""
+        self.assertEqual(
+            map_where("GFK = 'GFK' OR OI = 'it''s OI'", self.schema),
+            "gfk = 'GFK' OR oid = 'it''s OI'",
+        )
+        self.assertEqual(
+            get_referenced_columns("GFK = 'OI AGS'", WHERE_COLUMNS), ["GFK"]
+        )
+
+    def test_quoted_identifiers(self):
+        """Tests that quoted identifiers name source columns directly"""
+        self.assertEqual(
+            map_where("\"GFK\" = '31001' AND GFK2 = 1", self.schema),
+            "\"GFK\" = '31001' AND GFK2 = 1",
+        )
+
+
+class SourceWhereTest(unittest.TestCase):
+    """Tests the conditions of the where and min_area options"""
+
+    schema = {"GFK": "funktion"}
+
+    def test_where_and_min_area(self):
+        """Tests the combination of where and min_area"""
+        self.assertEqual(
+            get_source_where("GFK = '1' OR GFK = '2'", self.schema, 25.0),
+            "(funktion = '1' OR funktion = '2') AND OGR_GEOM_AREA >= 25.0",
+        )
+
+    def test_min_area_only(self):
+        """Tests that min_area alone filters by the area"""
+        self.assertEqual(
+            get_source_where("", self.schema, 12.5), "OGR_GEOM_AREA >= 12.5"
+        )
+
+    def test_no_filter(self):
+        """Tests that the source is read completely without options"""
+        self.assertEqual(get_source_where("", self.schema, 0), "")
+
+
+class ProviderWhereTest(unittest.TestCase):
+    """Tests the where option for the sources of the federal states"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get_vrt_sql(self, source, where):
+        """Get the SQL of the OGR VRT filtering source"""
+        with mock.patch.object(
+            attribute_filter,
+            "get_layer_name",
+            return_value=os.path.splitext(os.path.basename(source))[0],
+        ):
+            vrt_file = create_filtered_source(source, where, self.tmp_dir)
+        with open(vrt_file, encoding="utf-8") as file:
+            vrt = file.read()
+        start = vrt.index(">", vrt.index("<SrcSQL")) + 1
+        return unescape(vrt[start : vrt.index("</SrcSQL>")])
+
+    def test_where_hu_source(self):
+        """Tests a where on the columns of a Hausumringe source"""
+        provider = get_provider("NW")
+        where = "GFK IN ('31001_1000') AND AKTUALITAE >= '2023-01-01'"
+        self.assertEqual(provider.filter_schema, HU_FILTER_SCHEMA)
+        self.assertEqual(
+            get_unmapped_columns(where, provider.filter_schema, WHERE_COLUMNS),
+            [],
+        )
+        self.assertEqual(
+            self.get_vrt_sql(
+                os.path.join(self.tmp_dir, "hu_nw.shp"),
+                map_where(where, provider.filter_schema),
+            ),
+            f'SELECT * FROM "hu_nw" WHERE {where}',
+        )
+
+    def test_where_bb_source(self):
+        """Tests a where on the columns of the Brandenburg district data"""
+        provider = get_provider("BB")
+        where = "AKTUALITAE >= '2023-01-01' AND GEBNUTZBEZ = 'Wohnen'"
+        self.assertEqual(
+            get_unmapped_columns(where, provider.filter_schema, WHERE_COLUMNS),
+            [],
+        )
+        self.assertEqual(
+            self.get_vrt_sql(
+                os.path.join(self.tmp_dir, "gebauedeBauwerk.shp"),
+                map_where(where, provider.filter_schema),
+            ),
+            'SELECT * FROM "gebauedeBauwerk" WHERE '
+            "aktualit >= '2023-01-01' AND gebnutzbez = 'Wohnen'",
+        )
+
+    def test_unmapped_bb_columns(self):
+        """Tests that the output columns missing in the Brandenburg data
+        are reported instead of filtering on nonexistent columns
+        """
+        provider = get_provider("BB")
+        for col in ("GFK", "AGS", "OI"):
+            self.assertEqual(
+                get_unmapped_columns(
+                    f"{col} = 'x' AND funktion = 'Wohnhaus'",
+                    provider.filter_schema,
+                    WHERE_COLUMNS,
+                ),
+                [col],
+            )
+        # the column name in a string literal is no column
+        self.assertEqual(
+            get_unmapped_columns(
+                "funktion = 'GFK'", provider.filter_schema, WHERE_COLUMNS
+            ),
+            [],
+        )
+
+    def test_configured_schema(self):
+        """Tests that a configured schema replaces the filter schema"""
+        schema = {"AGS": "ags", "OI": "oid", "GFK": "gfk"}
+        provider = get_provider(
+            "BB", {"providers": {"BB": {"schema": schema}}}
+        )
+        self.assertEqual(provider.filter_schema, schema)
+        self.assertEqual(
+            get_unmapped_columns(
+                "AKTUALITAE > '2023'", provider.filter_schema, WHERE_COLUMNS
+            ),
+            ["AKTUALITAE"],
+        )
+
+    def test_region_source(self):
+        """Tests the VRT selecting the buildings in the import region of a
+        filtered source in another CRS
+        """
+        source = os.path.join(self.tmp_dir, "hu_sn.shp")
+        self.get_vrt_sql(source, "GFK = '31001_1000'")
+        filtered = os.path.join(self.tmp_dir, os.listdir(self.tmp_dir)[0])
+        region_source = create_region_source(
+            filtered, [410000, 5650000, 411000, 5651000], self.tmp_dir
+        )
+        with open(region_source, encoding="utf-8") as file:
+            vrt = file.read()
+        # the layer name is read from the filtered VRT
+        self.assertIn('<OGRVRTLayer name="hu_sn">', vrt)
+        self.assertIn("<SrcLayer>hu_sn</SrcLayer>", vrt)
+        self.assertIn(f">{filtered}</SrcDataSource>", vrt)
+        self.assertIn(
+            "<SrcRegion>POLYGON((410000 5650000,411000 5650000,"
+            "411000 5651000,410000 5651000,410000 5650000))</SrcRegion>",
+            vrt,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
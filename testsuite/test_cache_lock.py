@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the shared download cache
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the locks, the single-flight creation and the atomic
+#              publishing of files in a dldir shared by several jobs
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from cache_lock import (  # noqa: E402
+    fcntl,
+    file_lock,
+    publish_files,
+    single_flight,
+    staging_dir,
+)
+
+NUM_JOBS = 6
+
+
+def create_file(target):
+    """Write target slowly with a temporary name and rename it"""
+    tmp_file = f"{target}.tmp{os.getpid()}"
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        file.write(str(os.getpid()))
+    time.sleep(0.2)
+    os.replace(tmp_file, target)
+
+
+def run_job(target, results):
+    """Job needing target, records whether it created it"""
+    created = single_flight(target, lambda: create_file(target))
+    with open(target, encoding="utf-8") as file:
+        results.put((created, file.read()))
+
+
+@unittest.skipIf(fcntl is None, "no advisory file locks")
+class CacheLockTest(unittest.TestCase):
+    """Tests the single-flight creation of files in a shared directory"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.target = os.path.join(self.tmp_dir, "buildings.zip")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_single_flight_processes(self):
+        """Tests that only one of several jobs creates the file and the
+        others reuse it
+        """
+        results = multiprocessing.Queue()
+        jobs = [
+            multiprocessing.Process(
+                target=run_job, args=(self.target, results)
+            )
+            for _num in range(NUM_JOBS)
+        ]
+        for job in jobs:
+            job.start()
+        for job in jobs:
+            job.join()
+            self.assertEqual(job.exitcode, 0)
+        job_results = [results.get() for _num in range(NUM_JOBS)]
+        self.assertEqual(sum(created for created, _pid in job_results), 1)
+        # all jobs read the file of the job which created it
+        self.assertEqual(len({pid for _created, pid in job_results}), 1)
+
+    def test_on_wait(self):
+        """Tests that a waiting thread is informed and waits for the lock"""
+        events = []
+        locked = threading.Event()
+
+        def hold_lock():
+            with file_lock(self.target):
+                locked.set()
+                time.sleep(0.3)
+                events.append("released")
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        locked.wait()
+        with file_lock(self.target, on_wait=lambda: events.append("wait")):
+            events.append("locked")
+        thread.join()
+        self.assertEqual(events, ["wait", "released", "locked"])
+
+    def test_failed_creation(self):
+        """Tests that a failed creation leaves nothing behind and the next
+        job creates the file
+        """
+
+        def fail():
+            raise RuntimeError("download failed")
+
+        with self.assertRaises(RuntimeError):
+            single_flight(self.target, fail)
+        self.assertFalse(os.path.exists(self.target))
+        self.assertTrue(
+            single_flight(self.target, lambda: create_file(self.target))
+        )
+        self.assertFalse(
+            single_flight(self.target, lambda: create_file(self.target))
+        )
+
+
+class PublishFilesTest(unittest.TestCase):
+    """Tests publishing of files via a staging directory"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_publish_files(self):
+        """Tests that the marker file is moved last and the staging
+        directory is removed
+        """
+        with staging_dir(self.tmp_dir) as stage:
+            for name in ("gebaeude.shp", "gebaeude.dbf", "sub/gebaeude.shx"):
+                os.makedirs(
+                    os.path.dirname(os.path.join(stage, name)), exist_ok=True
+                )
+                with open(os.path.join(stage, name), "w") as file:
+                    file.write(name)
+            paths = publish_files(
+                stage, self.tmp_dir, lambda path: path.endswith(".shp")
+            )
+        self.assertEqual(paths[-1], os.path.join(self.tmp_dir, "gebaeude.shp"))
+        self.assertEqual(
+            sorted(os.listdir(self.tmp_dir)),
+            ["gebaeude.dbf", "gebaeude.shp", "sub"],
+        )
+
+    def test_staging_dir_removed_on_error(self):
+        """Tests that an interrupted extraction leaves no files behind"""
+        with self.assertRaises(RuntimeError):
+            with staging_dir(self.tmp_dir) as stage:
+                with open(os.path.join(stage, "gebaeude.shp"), "w") as file:
+                    file.write("incomplete")
+                raise RuntimeError("extraction failed")
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
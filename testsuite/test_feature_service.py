@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the feature service source
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the paged bbox requests against a local stand-in
+#              WFS / OGC API Features server
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from feature_service import fetch_features, use_feature_service  # noqa: E402
+
+NUM_FEATURES = 2345
+
+
+def create_feature(num):
+    """Create a square building as GeoJSON feature"""
+    x, y = 364000 + num * 20, 5621000
+    return {
+        "type": "Feature",
+        "properties": {"OI": f"DENW{num:012d}", "AGS": "05314000"},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [
+                [[x, y], [x + 10, y], [x + 10, y + 10], [x, y + 10], [x, y]]
+            ],
+        },
+    }
+
+
+class FeatureServiceHandler(BaseHTTPRequestHandler):
+    """Stand-in for a WFS 2.0 and an OGC API Features endpoint"""
+
+    features = [create_feature(num) for num in range(NUM_FEATURES)]
+    report_number = True
+
+    def send(self, content, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: val[0] for key, val in parse_qs(url.query).items()}
+        if url.path.startswith("/wfs"):
+            if query.get("resultType") == "hits":
+                self.send(
+                    (
+                        '<wfs:FeatureCollection numberMatched="'
+                        f'{len(self.features)}" numberReturned="0"/>'
+                    ).encode(),
+                    "text/xml",
+                )
+                return
+            start = int(query["startIndex"])
+            count = int(query["count"])
+        else:
+            start = int(query["offset"])
+            count = int(query["limit"])
+        collection = {
+            "type": "FeatureCollection",
+            "features": self.features[start : start + count],
+        }
+        if self.report_number:
+            collection["numberMatched"] = len(self.features)
+        self.send(json.dumps(collection).encode(), "application/geo+json")
+
+    def log_message(self, *args):
+        pass
+
+
+class FeatureServiceTest(unittest.TestCase):
+    """Tests fetching the features of a bbox page by page"""
+
+    bbox = [364000, 5621000, 420000, 5622000]
+    crs = "EPSG:25832"
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), FeatureServiceHandler
+        )
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        FeatureServiceHandler.report_number = True
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def read_oids(self, pages):
+        """Read OI of the features of all pages"""
+        oids = []
+        for page in pages:
+            with open(page, encoding="utf-8") as file:
+                oids.extend(
+                    feat["properties"]["OI"]
+                    for feat in json.load(file)["features"]
+                )
+        return oids
+
+    def check_pages(self, pages):
+        """Check that every feature was fetched exactly once"""
+        self.assertEqual(len(pages), -(-NUM_FEATURES // 500))
+        oids = self.read_oids(pages)
+        self.assertEqual(len(oids), NUM_FEATURES)
+        self.assertEqual(len(set(oids)), NUM_FEATURES)
+
+    def test_ogcapi(self):
+        """Tests paging of an OGC API Features endpoint"""
+        service = {
+            "type": "ogcapi",
+            "url": f"{self.url}/ogcapi",
+            "collection": "buildings",
+            "page_size": 500,
+        }
+        self.check_pages(
+            fetch_features(service, self.bbox, self.crs, self.tmp_dir)
+        )
+
+    def test_wfs(self):
+        """Tests paging of a WFS with the results streamed into a
+        (stand-in) import function
+        """
+        service = {
+            "type": "wfs",
+            "url": f"{self.url}/wfs",
+            "typename": "buildings",
+            "page_size": 500,
+        }
+        imported = []
+
+        def import_page(page):
+            imported.append(page)
+            return page
+
+        pages = fetch_features(
+            service, self.bbox, self.crs, self.tmp_dir, import_page
+        )
+        self.check_pages(pages)
+        self.assertEqual(sorted(pages), sorted(imported))
+
+    def test_unknown_number(self):
+        """Tests paging of a service not reporting the number of features"""
+        FeatureServiceHandler.report_number = False
+        service = {
+            "type": "ogcapi",
+            "url": f"{self.url}/ogcapi",
+            "collection": "buildings",
+            "page_size": 500,
+        }
+        self.check_pages(
+            fetch_features(service, self.bbox, self.crs, self.tmp_dir)
+        )
+
+    def test_use_feature_service(self):
+        """Tests the choice of the source by the size of the AOI"""
+        service = {"type": "wfs", "max_area_km2": 20}
+        self.assertTrue(use_feature_service(service, 5.0))
+        self.assertFalse(use_feature_service(service, 50.0))
+        self.assertFalse(use_feature_service(service, None))
+        self.assertFalse(use_feature_service(None, 5.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
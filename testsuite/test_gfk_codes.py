@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the GFK decoding
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the columns GFK_NAME and GFK_CATEGORY added for the
+#              building function codes
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import sys
+
+from grass.gunittest.main import test
+import grass.script as grass
+
+from v_alkis_buildings_import_base import VAlkisBuildingsImportTestBase
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from gfk_codes import decode_gfk  # noqa: E402
+
+
+class VAlkisBuildingsImportTestGfk(VAlkisBuildingsImportTestBase):
+    """Decodes the GFK of points with known, unknown and missing codes"""
+
+    buildings = f"test_gfk_buildings_{os.getpid()}"
+    # GFK, expected GFK_NAME and GFK_CATEGORY
+    rows = [
+        ("31001_1000", "Wohngebäude", "Wohnen"),
+        ("2463", "Garage", "Verkehr"),
+        ("31001_2463", "Garage", "Verkehr"),
+        ("31001_9998", "Nach Quellenlage nicht zu spezifizieren", ""),
+        ("31001_9999", "", ""),
+        ("", "", ""),
+    ]
+
+    def setUp(self):
+        grass.write_command(
+            "v.in.ascii",
+            input="-",
+            output=self.buildings,
+            separator="pipe",
+            x=1,
+            y=2,
+            columns="x double precision, y double precision, GFK varchar(20)",
+            stdin="\n".join(
+                f"{364000 + 20 * i}|5621000|{row[0]}"
+                for i, row in enumerate(self.rows)
+            ),
+            quiet=True,
+        )
+
+    def tearDown(self):
+        super().tearDown()
+        self.runModule(
+            "g.remove", type="vector", name=self.buildings, flags="f"
+        )
+
+    def test_decode_gfk(self):
+        """Tests the decoded building function and category"""
+        decode_gfk(self.buildings)
+        columns = grass.vector_columns(self.buildings)
+        self.assertIn("GFK_NAME", [col.upper() for col in columns])
+        self.assertIn("GFK_CATEGORY", [col.upper() for col in columns])
+        values = grass.read_command(
+            "v.db.select",
+            map=self.buildings,
+            columns="GFK_NAME,GFK_CATEGORY",
+            separator="pipe",
+            flags="c",
+        ).splitlines()
+        self.assertEqual(values, [f"{row[1]}|{row[2]}" for row in self.rows])
+        # the lookup table is removed
+        self.assertNotIn(
+            f"{self.buildings}_gfk_{os.getpid()}",
+            grass.read_command("db.tables", flags="p").split(),
+        )
+
+
+if __name__ == "__main__":
+    test()
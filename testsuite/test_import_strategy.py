@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the import strategy
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the choice of the import strategy of the plan report
+#              for small and large AOIs
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from import_strategy import (  # noqa: E402
+    choose_clip_method,
+    choose_strategy,
+)
+
+# buildings of a downloaded federal state
+SOURCE_FEATURES = 3000000
+
+
+def download(features, parallel=1):
+    """Estimate of a downloaded source without spatial index"""
+    return {
+        "source": "download",
+        "features": features,
+        "source_features": SOURCE_FEATURES,
+        "parallel": parallel,
+    }
+
+
+def local(features, parallel=1):
+    """Estimate of local files with spatial index"""
+    return {
+        "source": "local",
+        "features": features,
+        "source_features": 0,
+        "parallel": parallel,
+    }
+
+
+class ImportStrategyTest(unittest.TestCase):
+    """Tests the strategy chosen from the feature estimates"""
+
+    def test_small_aoi(self):
+        """Tests that a small AOI is imported with its region and all
+        buildings are clipped
+        """
+        strategy = choose_strategy([download(1000)], 8, "clip")
+        self.assertEqual(strategy["strategy"], "region")
+        self.assertEqual(strategy["clip_method"], "clip")
+        self.assertIsNone(strategy["costs"]["tiled"])
+        self.assertLess(
+            strategy["costs"]["region"], strategy["costs"]["prefiltered"]
+        )
+
+    def test_large_aoi(self):
+        """Tests that a large AOI is imported in tiles by several workers
+        and from prepared sources by one process
+        """
+        strategy = choose_strategy([download(2000000)], 8, "clip")
+        self.assertEqual(strategy["strategy"], "tiled")
+        self.assertEqual(strategy["tiles"], 8)
+        self.assertEqual(strategy["workers"], 8)
+        self.assertNotIn("clip_method", strategy)
+
+        strategy = choose_strategy([download(2000000)], 1, "clip")
+        self.assertEqual(strategy["strategy"], "prefiltered")
+        self.assertEqual(strategy["clip_method"], "select")
+
+    def test_not_applicable(self):
+        """Tests that strategies are only chosen if they can be executed"""
+        strategy = choose_strategy(
+            [download(2000000)], 8, prefilter=False, tiles=False
+        )
+        self.assertEqual(strategy["strategy"], "region")
+        self.assertEqual(
+            strategy["costs"],
+            {"region": 2600000, "prefiltered": None, "tiled": None},
+        )
+        self.assertNotIn("clip_method", strategy)
+
+    def test_local_files(self):
+        """Tests that local files are not prepared and only tiled if they
+        are not imported in parallel anyway
+        """
+        strategy = choose_strategy([local(2000000, parallel=50)], 8)
+        self.assertEqual(strategy["strategy"], "region")
+        self.assertIsNone(strategy["costs"]["prefiltered"])
+        strategy = choose_strategy([local(2000000)], 8)
+        self.assertEqual(strategy["strategy"], "tiled")
+
+    def test_clip_method(self):
+        """Tests that the interior of the AOI is only selected for many
+        buildings
+        """
+        self.assertEqual(choose_clip_method(0), "clip")
+        self.assertEqual(choose_clip_method(1000), "clip")
+        self.assertEqual(choose_clip_method(100000), "select")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the local data catalog
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the incremental refresh of the extent catalog and the
+#              selection of the files overlapping with the AOI
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+import local_data_catalog  # noqa: E402
+from local_data_catalog import (  # noqa: E402
+    CATALOG_FILENAME,
+    estimate_features,
+    get_intersecting_pairs,
+    select_overlapping_files,
+    update_catalog,
+)
+
+# extents of the test files (west, south, east, north)
+BBOXES = {
+    "a.gpkg": [0, 0, 100, 100],
+    "b.gpkg": [100, 0, 200, 100],
+    "sub/c.shp": [1000, 1000, 1100, 1100],
+}
+
+
+def read_file_info(path):
+    """Stand-in for reading the extent with OGR, which is not needed to
+    test the catalog itself
+    """
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+class LocalDataCatalogTest(unittest.TestCase):
+    """Tests the extent catalog of a local data directory"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        for name, bbox in BBOXES.items():
+            self.write_file(name, bbox)
+        patcher = mock.patch.object(
+            local_data_catalog, "read_file_info", side_effect=read_file_info
+        )
+        self.read_info = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def write_file(self, name, bbox, features=10):
+        """Write a test file containing its catalog entry"""
+        path = os.path.join(self.data_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"bbox": bbox, "crs": None, "features": features}, file)
+        return path
+
+    def get_files(self):
+        return [os.path.join(self.data_dir, name) for name in BBOXES]
+
+    def test_incremental_refresh(self):
+        """Tests that only new and changed files are read again"""
+        catalog, changed = update_catalog(self.data_dir, self.get_files())
+        self.assertTrue(changed)
+        self.assertEqual(sorted(catalog["files"]), sorted(BBOXES))
+        self.assertEqual(self.read_info.call_count, 3)
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.data_dir, CATALOG_FILENAME))
+        )
+
+        # unchanged directory: catalog from the file, nothing is read
+        catalog, changed = update_catalog(self.data_dir, self.get_files())
+        self.assertFalse(changed)
+        self.assertEqual(self.read_info.call_count, 3)
+
+        # changed file (size and modification time) is read again
+        path = self.write_file("a.gpkg", [0, 0, 50, 50], features=1000)
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        catalog, changed = update_catalog(self.data_dir, self.get_files())
+        self.assertTrue(changed)
+        self.assertEqual(self.read_info.call_count, 4)
+        self.assertEqual(catalog["files"]["a.gpkg"]["bbox"], [0, 0, 50, 50])
+
+    def test_removed_file(self):
+        """Tests that entries of deleted files are removed"""
+        update_catalog(self.data_dir, self.get_files())
+        os.remove(os.path.join(self.data_dir, "b.gpkg"))
+        files = [path for path in self.get_files() if os.path.isfile(path)]
+        catalog, changed = update_catalog(self.data_dir, files)
+        self.assertTrue(changed)
+        self.assertNotIn("b.gpkg", catalog["files"])
+        self.assertEqual(self.read_info.call_count, 3)
+
+    def test_invalid_catalog(self):
+        """Tests that a broken or outdated catalog file is rebuilt"""
+        catalog_file = os.path.join(self.data_dir, CATALOG_FILENAME)
+        with open(catalog_file, "w", encoding="utf-8") as file:
+            file.write("{broken")
+        catalog, changed = update_catalog(self.data_dir, self.get_files())
+        self.assertTrue(changed)
+        self.assertEqual(len(catalog["files"]), 3)
+        with open(catalog_file, "w", encoding="utf-8") as file:
+            json.dump({"version": 0, "files": catalog["files"]}, file)
+        _catalog, changed = update_catalog(self.data_dir, self.get_files())
+        self.assertTrue(changed)
+        self.assertEqual(self.read_info.call_count, 6)
+
+    def test_select_overlapping_files(self):
+        """Tests the selection and the feature estimate for an AOI"""
+        catalog, _changed = update_catalog(self.data_dir, self.get_files())
+        files = select_overlapping_files(
+            self.data_dir, catalog, [50, 50, 150, 80], None
+        )
+        self.assertEqual(
+            files,
+            [
+                os.path.join(self.data_dir, "a.gpkg"),
+                os.path.join(self.data_dir, "b.gpkg"),
+            ],
+        )
+        features = estimate_features(
+            self.data_dir, catalog, files, [50, 50, 150, 80], None
+        )
+        # 15 % of each file is covered by the AOI
+        self.assertAlmostEqual(features, 3.0)
+
+
+class IntersectingPairsTest(unittest.TestCase):
+    """Tests the sweep finding the maps compared by the deduplication"""
+
+    def test_tiles(self):
+        """Tests that a row of tiles only pairs neighbours"""
+        bboxes = [[x * 100, 0, x * 100 + 100, 100] for x in range(50)]
+        # order of the maps is not the order of the sweep
+        bboxes.reverse()
+        pairs = get_intersecting_pairs(bboxes)
+        self.assertEqual(pairs, [(i, i + 1) for i in range(49)])
+
+    def test_pairs(self):
+        """Tests the pairs of overlapping and separate boxes"""
+        bboxes = [
+            [0, 0, 100, 100],
+            [1000, 1000, 1100, 1100],
+            [50, 50, 150, 150],
+            # overlaps in x, but not in y
+            [60, 500, 160, 600],
+            # contains all others
+            [-10, -10, 2000, 2000],
+        ]
+        self.assertEqual(
+            get_intersecting_pairs(bboxes),
+            [(0, 2), (0, 4), (1, 4), (2, 4), (3, 4)],
+        )
+        self.assertEqual(get_intersecting_pairs([]), [])
+        self.assertEqual(get_intersecting_pairs([[0, 0, 1, 1]]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
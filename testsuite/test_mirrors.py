@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the mirror downloads
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the ranking of mirrors and the failover of downloads
+#              against local stand-in HTTP mirrors
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from mirrors import (  # noqa: E402
+    download_with_failover,
+    get_candidate_urls,
+    get_download_filename,
+    rank_mirrors,
+)
+
+DATA = bytes(range(256)) * 4096
+# bytes sent by the flaky mirror before the connection breaks
+BREAK_AFTER = 400000
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    """Stand-in for HTTP mirrors of a file
+
+    /fast/, /slow/ and /norange/ serve the file (/norange/ ignores range
+    requests), /flaky/ breaks the connection during full downloads and
+    /down/ is not available.
+    """
+
+    ranges = []
+
+    def do_GET(self):
+        mirror = self.path.split("/")[1]
+        if mirror == "down":
+            self.send_error(404)
+            return
+        if mirror == "slow":
+            time.sleep(0.3)
+        start, end = 0, len(DATA) - 1
+        byte_range = self.headers.get("Range")
+        if byte_range and mirror != "norange":
+            self.ranges.append((mirror, byte_range))
+            first, last = byte_range.split("=")[1].split("-")
+            start = int(first)
+            end = int(last) if last else end
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{end}/{len(DATA)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if mirror == "flaky" and end == len(DATA) - 1:
+            self.wfile.write(DATA[start:BREAK_AFTER])
+            return
+        self.wfile.write(DATA[start : end + 1])
+
+    def log_message(self, *args):
+        pass
+
+
+class MirrorsTest(unittest.TestCase):
+    """Tests downloads from several mirrors"""
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MirrorHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "buildings.zip")
+        MirrorHandler.ranges = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get_url(self, mirror):
+        return f"{self.url}/{mirror}/buildings.zip"
+
+    def read_download(self):
+        with open(self.filename, "rb") as file:
+            return file.read()
+
+    def test_candidate_urls(self):
+        """Tests the mirror URLs of a download"""
+        url = "https://portal.example/download?path=%2F&files=hu_sn.zip"
+        self.assertEqual(get_download_filename(url), "hu_sn.zip")
+        config = {
+            "mirrors": {"SN": ["/data/mirror/SN", "http://mirror/alkis/SN/"]}
+        }
+        self.assertEqual(
+            get_candidate_urls(config, "SN", url),
+            [
+                "/data/mirror/SN/hu_sn.zip",
+                "http://mirror/alkis/SN/hu_sn.zip",
+                url,
+            ],
+        )
+        self.assertEqual(get_candidate_urls(config, "NW", url), [url])
+
+    def test_rank_mirrors(self):
+        """Tests that unhealthy mirrors are dropped and local mirrors and
+        fast mirrors come first
+        """
+        local_file = os.path.join(self.tmp_dir, "local.zip")
+        with open(local_file, "wb") as file:
+            file.write(DATA)
+        urls = [
+            self.get_url("slow"),
+            self.get_url("down"),
+            os.path.join(self.tmp_dir, "missing.zip"),
+            self.get_url("fast"),
+            local_file,
+        ]
+        self.assertEqual(
+            rank_mirrors(urls),
+            [local_file, self.get_url("fast"), self.get_url("slow")],
+        )
+
+    def test_failover_resume(self):
+        """Tests that a broken download is resumed with the next mirror
+        at the bytes already downloaded
+        """
+        url = download_with_failover(
+            [self.get_url("slow"), self.get_url("flaky")], self.filename
+        )
+        self.assertEqual(url, self.get_url("slow"))
+        self.assertEqual(self.read_download(), DATA)
+        # resumed at the last complete chunk received from the flaky mirror
+        resumed = [
+            int(byte_range[6:-1])
+            for mirror, byte_range in MirrorHandler.ranges
+            if mirror == "slow" and byte_range.endswith("-")
+        ]
+        self.assertEqual(len(resumed), 1)
+        self.assertGreater(resumed[0], 0)
+        self.assertLessEqual(resumed[0], BREAK_AFTER)
+        self.assertFalse(os.path.exists(f"{self.filename}.part"))
+
+    def test_failover_without_range(self):
+        """Tests that the download starts again if the next mirror does not
+        support range requests
+        """
+        url = download_with_failover(
+            [self.get_url("flaky"), self.get_url("norange")], self.filename
+        )
+        self.assertEqual(url, self.get_url("norange"))
+        self.assertEqual(self.read_download(), DATA)
+
+    def test_stale_part_file(self):
+        """Tests that a partial file of an earlier job is not reused"""
+        with open(f"{self.filename}.part", "wb") as file:
+            file.write(b"stale")
+        download_with_failover([self.get_url("fast")], self.filename)
+        self.assertEqual(self.read_download(), DATA)
+
+    def test_all_mirrors_fail(self):
+        """Tests the error if no mirror can deliver the file"""
+        with self.assertRaisesRegex(RuntimeError, "buildings.zip failed"):
+            download_with_failover(
+                [self.get_url("down"), self.get_url("flaky")], self.filename
+            )
+        self.assertFalse(os.path.exists(self.filename))
+
+
+if __name__ == "__main__":
+    unittest.main()
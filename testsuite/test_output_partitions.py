@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the output partitions
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the split of the output into one vector map per AGS
+#              prefix or grid tile and the index table of the partitions
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import sys
+from unittest import mock
+
+from grass.exceptions import CalledModuleError
+from grass.gunittest.main import test
+import grass.script as grass
+
+from v_alkis_buildings_import_base import VAlkisBuildingsImportTestBase
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from output_partitions import (  # noqa: E402
+    partition_output,
+    write_partition_index,
+)
+
+
+class VAlkisBuildingsImportTestPartitions(VAlkisBuildingsImportTestBase):
+    """Splits a grid of 2 x 4 buildings of 50 m x 50 m"""
+
+    buildings = f"test_partition_buildings_{os.getpid()}"
+
+    def setUp(self):
+        self.runModule("g.region", n=100, s=0, w=0, e=200, res=50)
+        self.runModule("v.mkgrid", map=self.buildings, grid=[2, 4])
+        self.runModule(
+            "v.db.addcolumn", map=self.buildings, columns="AGS TEXT"
+        )
+        self.runModule(
+            "v.db.update",
+            map=self.buildings,
+            column="AGS",
+            value="05314000",
+            where="cat <= 3",
+        )
+        self.runModule(
+            "v.db.update",
+            map=self.buildings,
+            column="AGS",
+            value="05315000",
+            where="cat > 3 AND cat <= 6",
+        )
+
+    def tearDown(self):
+        super().tearDown()
+        self.runModule(
+            "g.remove",
+            type="vector",
+            pattern=f"{self.buildings}*",
+            flags="f",
+        )
+        grass.run_command(
+            "db.droptable",
+            table=f"{self.buildings}_partitions",
+            flags="f",
+            errors="ignore",
+        )
+
+    def check_partitions(self, rows, expected):
+        """Check the partition maps and the index table"""
+        self.assertEqual(
+            [(key, count) for key, _name, count in rows], expected
+        )
+        for key, name, count in rows:
+            self.assertEqual(name, f"{self.buildings}_{key}")
+            self.assertEqual(
+                int(grass.vector_info_topo(name)["centroids"]), count
+            )
+        index = grass.read_command(
+            "db.select",
+            sql=f"SELECT partition, map, buildings FROM "
+            f"{self.buildings}_partitions ORDER BY partition",
+            separator="pipe",
+            flags="c",
+        ).splitlines()
+        self.assertEqual(
+            index, [f"{key}|{name}|{count}" for key, name, count in rows]
+        )
+
+    def test_ags(self):
+        """Tests the partitions by AGS prefix with the attributes"""
+        rows = partition_output(self.buildings, "ags", 5, 2)
+        self.check_partitions(
+            rows, [("05314", 3), ("05315", 3), ("unknown", 2)]
+        )
+        values = grass.read_command(
+            "v.db.select",
+            map=f"{self.buildings}_05315",
+            columns='cat,"AGS"',
+            separator="pipe",
+            flags="c",
+        ).splitlines()
+        self.assertEqual(values, ["4|05315000", "5|05315000", "6|05315000"])
+
+    def test_tile(self):
+        """Tests the partitions by tiles containing the centroids"""
+        rows = partition_output(self.buildings, "tile", 100)
+        self.check_partitions(rows, [("0_0", 4), ("100_0", 4)])
+
+    def test_overwrite(self):
+        """Tests that an existing index table is only replaced with
+        overwrite
+        """
+        index_table = f"{self.buildings}_partitions"
+        with mock.patch.dict(os.environ, {"GRASS_OVERWRITE": "0"}):
+            write_partition_index(index_table, [("a", "map_a", 1)])
+            with self.assertRaises(CalledModuleError):
+                write_partition_index(index_table, [("b", "map_b", 2)])
+        with mock.patch.dict(os.environ, {"GRASS_OVERWRITE": "1"}):
+            write_partition_index(index_table, [("b", "map_b", 2)])
+        index = grass.read_command(
+            "db.select",
+            sql=f"SELECT partition, map, buildings FROM {index_table}",
+            separator="pipe",
+            flags="c",
+        ).splitlines()
+        self.assertEqual(index, ["b|map_b|2"])
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the PostgreSQL attributes
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the harmonization of attribute tables stored with the
+#              PostgreSQL driver. Needs a throwaway database given by the
+#              environment variable ALKIS_TEST_PG_DATABASE, e.g.
+#              ALKIS_TEST_PG_DATABASE="dbname=alkis_test host=localhost"
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import sys
+import unittest
+
+from grass.gunittest.main import test
+import grass.script as grass
+
+from v_alkis_buildings_import_base import VAlkisBuildingsImportTestBase
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from pg_attributes import (  # noqa: E402
+    alter_text_columns,
+    get_pg_dblink,
+    harmonize_table,
+)
+
+PG_DATABASE = os.environ.get("ALKIS_TEST_PG_DATABASE")
+
+
+@unittest.skipUnless(PG_DATABASE, "ALKIS_TEST_PG_DATABASE not set")
+class VAlkisBuildingsImportTestPg(VAlkisBuildingsImportTestBase):
+    """Tests the attribute harmonization with the PostgreSQL driver"""
+
+    buildings = f"test_pg_buildings_{os.getpid()}"
+    rows = [
+        ("364000", "5621000", "05314000", "DENW000000000001", "31001"),
+        ("364020", "5621000", "05314000", "DENW000000000002", "31001_1000"),
+        ("364040", "5621000", "05314000", "DENW000000000003", ""),
+    ]
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def setUpClass(cls):
+        super().setUpClass()
+        grass.run_command("db.connect", driver="pg", database=PG_DATABASE)
+
+    def setUp(self):
+        grass.write_command(
+            "v.in.ascii",
+            input="-",
+            output=self.buildings,
+            separator="pipe",
+            x=1,
+            y=2,
+            columns=(
+                "x double precision, y double precision, "
+                "gemeinde varchar(8), oid varchar(16), funktion varchar(10)"
+            ),
+            stdin="\n".join("|".join(row) for row in self.rows),
+            quiet=True,
+        )
+
+    def tearDown(self):
+        self.runModule(
+            "g.remove", type="vector", name=self.buildings, flags="f"
+        )
+
+    def test_alter_text_columns(self):
+        """Tests the change of the CHARACTER columns to TEXT"""
+        dblink = get_pg_dblink(self.buildings)
+        self.assertIsNotNone(dblink)
+        alter_text_columns(self.buildings, dblink)
+        columns = grass.vector_columns(self.buildings)
+        for col in ("gemeinde", "oid", "funktion"):
+            self.assertEqual(columns[col]["type"].upper(), "TEXT")
+
+    def test_harmonize_table(self):
+        """Tests the rebuild of the table with the output columns"""
+        dblink = get_pg_dblink(self.buildings)
+        harmonize_table(
+            self.buildings,
+            dblink,
+            {"AGS": "gemeinde", "OI": "oid", "GFK": "funktion"},
+            ["AGS", "OI", "GFK"],
+        )
+        columns = grass.vector_columns(self.buildings)
+        self.assertEqual(list(columns), ["cat", "AGS", "OI", "GFK"])
+        values = grass.read_command(
+            "v.db.select",
+            map=self.buildings,
+            columns='"OI","GFK"',
+            flags="c",
+            separator="pipe",
+        ).splitlines()
+        self.assertEqual(values, [f"{row[3]}|{row[4]}" for row in self.rows])
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the download/import pipeline
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the stages, bounded queues and error handling of the
+#              pipeline with stand-in stage functions
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from pipeline import run_pipeline  # noqa: E402
+
+
+class ConcurrencyCounter:
+    """Stage function recording the maximal number of parallel calls"""
+
+    def __init__(self, func, delay=0.01):
+        self.func = func
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        return self.func(item)
+
+
+class PipelineTest(unittest.TestCase):
+    """Tests running items through the stages of the pipeline"""
+
+    def test_stages(self):
+        """Tests that every item passes all stages with the given number
+        of threads per stage
+        """
+        download = ConcurrencyCounter(lambda item: item * 10)
+        extract = ConcurrencyCounter(lambda item: item + 1)
+        import_stage = ConcurrencyCounter(lambda item: f"map_{item}")
+        results = run_pipeline(
+            range(20), [(download, 3), (extract, 2), (import_stage, 1)]
+        )
+        self.assertEqual(
+            sorted(results), sorted(f"map_{num * 10 + 1}" for num in range(20))
+        )
+        self.assertLessEqual(download.max_running, 3)
+        self.assertLessEqual(extract.max_running, 2)
+        self.assertEqual(import_stage.max_running, 1)
+
+    def test_none_results(self):
+        """Tests that items for which a stage returns None are dropped"""
+        results = run_pipeline(
+            range(10),
+            [
+                (lambda item: item if item % 2 else None, 2),
+                (lambda item: item, 1),
+            ],
+        )
+        self.assertEqual(sorted(results), [1, 3, 5, 7, 9])
+
+    def test_empty(self):
+        """Tests a pipeline without items"""
+        self.assertEqual(run_pipeline([], [(str, 2), (str, 1)]), [])
+
+    def test_error(self):
+        """Tests that the first error of a stage is raised after all
+        threads ended, also with more items than fit into the queues
+        """
+
+        def fail(item):
+            if item == 3:
+                raise RuntimeError("import failed")
+            return item
+
+        with self.assertRaisesRegex(RuntimeError, "import failed"):
+            run_pipeline(range(50), [(str, 2), (int, 1), (fail, 1)], 2)
+        self.assertEqual(threading.active_count(), 1)
+
+    def test_exit(self):
+        """Tests that SystemExit (raised by grass.fatal) in a thread is
+        passed on instead of ending the thread silently
+        """
+
+        def fatal(item):
+            sys.exit(f"fatal error in {item}")
+
+        with self.assertRaises(SystemExit):
+            run_pipeline(range(5), [(fatal, 2), (str, 1)])
+        self.assertEqual(threading.active_count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the remote zip extraction
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the range reads of remote files and the extraction of
+#              single members of a remote zip file from a local stand-in
+#              HTTP server
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from zipfile import ZIP_DEFLATED, ZipFile
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+import remote_zip  # noqa: E402
+from remote_zip import HttpRangeFile, fetch_zip_members  # noqa: E402
+
+DATA = bytes(range(256)) * 40
+
+
+class RangeResponse:
+    """Response of the stand-in session"""
+
+    def __init__(self, content):
+        self.status_code = 206
+        self.content = content
+
+
+class RangeSession:
+    """Stand-in for a requests session answering range requests"""
+
+    def __init__(self, data):
+        self.data = data
+        self.ranges = []
+
+    def get(self, url, headers, timeout):
+        first, last = headers["Range"].split("=")[1].split("-")
+        self.ranges.append((int(first), int(last)))
+        return RangeResponse(self.data[int(first) : int(last) + 1])
+
+
+def create_zip():
+    """Create a zip file with shapefiles of two layers"""
+    rand = random.Random(42)
+    members = {
+        f"{layer}.{ext}": bytes(rand.getrandbits(8) for _ in range(20000))
+        for layer in ("gebaeude", "flurstueck")
+        for ext in ("shp", "dbf", "shx")
+    }
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w", ZIP_DEFLATED) as zip_file:
+        for name, content in members.items():
+            zip_file.writestr(f"data/{name}", content)
+    return buffer.getvalue(), members
+
+
+class ZipHandler(BaseHTTPRequestHandler):
+    """Serves the zip file, with range requests only below /ranges/"""
+
+    data = b""
+
+    def do_GET(self):
+        byte_range = self.headers.get("Range")
+        start, end = 0, len(self.data) - 1
+        if byte_range and self.path.startswith("/ranges/"):
+            first, last = byte_range.split("=")[1].split("-")
+            start = int(first)
+            end = min(int(last), end) if last else end
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{end}/{len(self.data)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        self.wfile.write(self.data[start : end + 1])
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpRangeFileTest(unittest.TestCase):
+    """Tests reading a remote file with range requests"""
+
+    def setUp(self):
+        patcher = mock.patch.object(remote_zip, "READ_AHEAD", 1000)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session = RangeSession(DATA)
+        self.file = HttpRangeFile("http://stand-in", len(DATA), self.session)
+
+    def test_read_ahead(self):
+        """Tests that small reads are served from the read-ahead buffer"""
+        self.assertEqual(self.file.read(10), DATA[:10])
+        self.assertEqual(self.file.read(10), DATA[10:20])
+        self.assertEqual(self.session.ranges, [(0, 999)])
+
+    def test_read_across_boundary(self):
+        """Tests a read crossing the end of the read-ahead buffer"""
+        self.assertEqual(self.file.read(990), DATA[:990])
+        self.assertEqual(self.file.read(5), DATA[990:995])
+        self.assertEqual(self.file.read(20), DATA[995:1015])
+        self.assertEqual(self.file.tell(), 1015)
+        self.assertEqual(self.session.ranges, [(0, 999), (995, 1994)])
+        # reads larger than the read-ahead are fetched at once
+        self.assertEqual(self.file.read(3000), DATA[1015:4015])
+        self.assertEqual(self.session.ranges[-1], (1015, 4014))
+
+    def test_seek(self):
+        """Tests seeking before the buffer and relative to the end"""
+        self.file.seek(5000)
+        self.file.read(10)
+        self.file.seek(100)
+        self.assertEqual(self.file.read(10), DATA[100:110])
+        self.assertEqual(self.file.seek(-10, io.SEEK_END), len(DATA) - 10)
+        self.assertEqual(self.file.read(), DATA[-10:])
+        self.assertEqual(self.file.read(10), b"")
+        self.assertEqual(
+            self.session.ranges[-1], (len(DATA) - 10, len(DATA) - 1)
+        )
+
+    def test_readinto(self):
+        """Tests reading into a buffer at the end of the file"""
+        self.file.seek(len(DATA) - 4)
+        buffer = bytearray(8)
+        self.assertEqual(self.file.readinto(buffer), 4)
+        self.assertEqual(bytes(buffer[:4]), DATA[-4:])
+
+
+class FetchZipMembersTest(unittest.TestCase):
+    """Tests extracting members of a remote zip file"""
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def setUpClass(cls):
+        ZipHandler.data, cls.members = create_zip()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ZipHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        patcher = mock.patch.object(remote_zip, "READ_AHEAD", 4096)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check_members(self, paths):
+        """Check that exactly the building files were extracted"""
+        self.assertEqual(
+            sorted(os.path.basename(path) for path in paths),
+            ["gebaeude.dbf", "gebaeude.shp", "gebaeude.shx"],
+        )
+        for path in paths:
+            with open(path, "rb") as file:
+                self.assertEqual(
+                    file.read(), self.members[os.path.basename(path)]
+                )
+
+    def test_remote_members(self):
+        """Tests that only the matching members are fetched"""
+        paths, bytes_fetched = fetch_zip_members(
+            f"{self.url}/ranges/alkis.zip",
+            self.tmp_dir,
+            lambda name: "gebaeude" in name,
+        )
+        self.check_members(paths)
+        self.assertGreater(bytes_fetched, 0)
+        self.assertLess(bytes_fetched, len(ZipHandler.data))
+
+    def test_no_ranges(self):
+        """Tests that a server without range requests is reported"""
+        self.assertEqual(
+            fetch_zip_members(
+                f"{self.url}/alkis.zip", self.tmp_dir, lambda name: True
+            ),
+            (None, 0),
+        )
+
+    def test_local_zip(self):
+        """Tests extracting members of a local zip file"""
+        zip_path = os.path.join(self.tmp_dir, "alkis.zip")
+        with open(zip_path, "wb") as file:
+            file.write(ZipHandler.data)
+        paths, bytes_fetched = fetch_zip_members(
+            zip_path,
+            os.path.join(self.tmp_dir, "out"),
+            lambda name: "gebaeude" in name,
+        )
+        self.check_members(paths)
+        self.assertEqual(bytes_fetched, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the result cache
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the cache keys, the copy of cached results, the
+#              eviction of the least recently used entries and the
+#              locking of the index shared by concurrent jobs
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import itertools
+import os
+import shutil
+import sys
+from multiprocessing.pool import ThreadPool
+from unittest import mock
+
+from grass.gunittest.main import test
+import grass.script as grass
+
+from v_alkis_buildings_import_base import VAlkisBuildingsImportTestBase
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+import result_cache  # noqa: E402
+from result_cache import ResultCache, get_cache_key  # noqa: E402
+
+NUM_JOBS = 6
+
+
+class VAlkisBuildingsImportTestResultCache(VAlkisBuildingsImportTestBase):
+    """Caches a grid of 2 x 2 buildings in a temporary cache mapset"""
+
+    buildings = f"test_cache_buildings_{os.getpid()}"
+    mapset = f"test_result_cache_{os.getpid()}"
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def setUpClass(cls):
+        super().setUpClass()
+        grass.run_command("g.region", n=100, s=0, w=0, e=100, res=50)
+        grass.run_command(
+            "v.mkgrid", map=cls.buildings, grid=[2, 2], quiet=True
+        )
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def tearDownClass(cls):
+        grass.run_command(
+            "g.remove", type="vector", name=cls.buildings, flags="f"
+        )
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = ResultCache(self.mapset, max_entries=3)
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.cache.mapset_dir)
+        for lock_file in (
+            f"{self.cache.mapset_dir}.lock",
+            f"{self.cache.index_file}.lock",
+        ):
+            if os.path.isfile(lock_file):
+                os.remove(lock_file)
+
+    def cached_maps(self):
+        """Get the vector maps in the cache mapset"""
+        return sorted(
+            grass.list_strings("vector", mapsets=self.mapset, pattern="*")
+        )
+
+    def test_cache_key(self):
+        """Tests that the key does not depend on the order of the parts
+        and changes with the source version
+        """
+        key_parts = {
+            "aoi": "abc",
+            "federal_states": ["Hessen"],
+            "sources": {"HE": {"etag": "1", "size": 100}},
+        }
+        key = get_cache_key(key_parts)
+        self.assertEqual(len(key), 16)
+        self.assertEqual(
+            key, get_cache_key(dict(reversed(list(key_parts.items()))))
+        )
+        key_parts["sources"]["HE"]["etag"] = "2"
+        self.assertNotEqual(key, get_cache_key(key_parts))
+
+    def test_hit(self):
+        """Tests that a cached result is copied into the current mapset"""
+        self.assertFalse(self.cache.get("key1", self.test_output))
+        self.cache.put("key1", self.buildings)
+        self.assertEqual(
+            self.cached_maps(), [f"alkis_buildings_key1@{self.mapset}"]
+        )
+        self.assertTrue(self.cache.get("key1", self.test_output))
+        self.assertEqual(
+            grass.vector_info_topo(self.test_output)["centroids"], 4
+        )
+        # an entry whose map was removed is a miss
+        grass.run_command(
+            "g.remove",
+            type="vector",
+            name="alkis_buildings_key1",
+            flags="f",
+            env=self.cache.env,
+        )
+        self.assertFalse(self.cache.get("key1", f"{self.test_output}_2"))
+
+    def test_lru(self):
+        """Tests that the least recently used entries are removed"""
+        with mock.patch.object(result_cache, "time") as time_mock:
+            time_mock.time.side_effect = itertools.count(1000).__next__
+            for key in ("key1", "key2", "key3"):
+                self.cache.put(key, self.buildings)
+            # key1 is used again, key2 is the least recently used entry
+            self.assertTrue(self.cache.get("key1", self.test_output))
+            self.cache.put("key4", self.buildings)
+        self.assertEqual(
+            sorted(self.cache.read_index()), ["key1", "key3", "key4"]
+        )
+        self.assertEqual(
+            self.cached_maps(),
+            [
+                f"alkis_buildings_{key}@{self.mapset}"
+                for key in ("key1", "key3", "key4")
+            ],
+        )
+
+    def test_concurrent_jobs(self):
+        """Tests that no entry is lost if jobs write the index at the same
+        time
+        """
+        caches = [
+            ResultCache(self.mapset, max_entries=NUM_JOBS)
+            for _job in range(NUM_JOBS)
+        ]
+        pool = ThreadPool(NUM_JOBS)
+        pool.map(
+            lambda job: caches[job].put(f"job{job}", self.buildings),
+            range(NUM_JOBS),
+        )
+        pool.close()
+        pool.join()
+        self.assertEqual(
+            sorted(self.cache.read_index()),
+            [f"job{job}" for job in range(NUM_JOBS)],
+        )
+        self.assertEqual(len(self.cached_maps()), NUM_JOBS)
+        self.assertFalse(
+            [
+                name
+                for name in os.listdir(self.cache.mapset_dir)
+                if ".tmp" in name
+            ]
+        )
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the sharded execution
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the shards of a job manifest claimed by several local
+#              processes standing in for the workers on different nodes
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from shards import (  # noqa: E402
+    SHARD_MARGIN,
+    claim_heartbeat,
+    claim_next_shard,
+    claim_shard,
+    create_shards,
+    get_marker,
+    get_shard_results,
+    get_tiles,
+    grow_region,
+    is_in_tile,
+    mark_shard,
+    read_manifest,
+    write_manifest,
+)
+
+NUM_WORKERS = 4
+BBOX = {"n": 5625000, "s": 5610000, "e": 370000, "w": 350000}
+
+
+def run_worker(manifest_file):
+    """Claim and process shards until all shards are claimed"""
+    manifest = read_manifest(manifest_file)
+    shard = claim_next_shard(manifest_file, manifest)
+    while shard:
+        mark_shard(
+            manifest_file,
+            shard["id"],
+            "done",
+            {"output": f"{shard['id']}.gpkg", "pid": os.getpid()},
+        )
+        shard = claim_next_shard(manifest_file, manifest)
+
+
+def reclaim(manifest_file, results):
+    """Try to take over the stale claim of the first shard"""
+    results.put(claim_shard(manifest_file, "00000", lease=1))
+
+
+def get_centroid(building):
+    """Get centroid of a rectangular building (w, s, e, n)"""
+    west, south, east, north = building
+    return (west + east) / 2, (south + north) / 2
+
+
+class ShardsTest(unittest.TestCase):
+    """Tests the job manifest and the claiming of the shards"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manifest_file = os.path.join(self.tmp_dir, "job.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_tiles(self):
+        """Tests that the tiles are aligned to the tile size and cover the
+        bounding box
+        """
+        tiles = get_tiles(BBOX, 10000)
+        self.assertEqual(len(tiles), 4)
+        self.assertEqual(
+            tiles[0], {"n": 5620000, "s": 5610000, "e": 360000, "w": 350000}
+        )
+        self.assertEqual(get_tiles(BBOX, 0), [BBOX])
+
+    def test_create_shards(self):
+        """Tests the shards of federal states with and without partitions"""
+        shards = create_shards(
+            [("Brandenburg", ["12073", "12060"]), ("Sachsen", None)],
+            BBOX,
+            10000,
+        )
+        self.assertEqual(len(shards), 6)
+        self.assertEqual(
+            [shard["id"] for shard in shards],
+            [f"{num:05d}" for num in range(6)],
+        )
+        self.assertEqual(shards[0]["partitions"], ["12060"])
+        self.assertEqual(shards[1]["partitions"], ["12073"])
+        self.assertTrue(all(shard["region"] for shard in shards))
+        shards = create_shards([("Sachsen", None)])
+        self.assertEqual(len(shards), 1)
+        self.assertIsNone(shards[0]["region"])
+
+    def test_tiles_limited_to_bbox(self):
+        """Tests that the tiles of the shards do not exceed the AOI/region"""
+        shards = create_shards([("Sachsen", None)], BBOX, 10000)
+        self.assertTrue(all(shard["tiled"] for shard in shards))
+        self.assertEqual(
+            max(shard["region"]["n"] for shard in shards), BBOX["n"]
+        )
+        shards = create_shards([("Sachsen", None)], BBOX)
+        self.assertEqual(len(shards), 1)
+        self.assertFalse(shards[0]["tiled"])
+        self.assertEqual(shards[0]["region"], BBOX)
+
+    def test_merge_tile_seam(self):
+        """Tests that the buildings on the seam between two tiles are in
+        exactly one shard and are imported whole by it
+        """
+        shards = create_shards([("Sachsen", None)], BBOX, 10000)
+        seam = 360000
+        buildings = [
+            # inside the first tile
+            (355000, 5612000, 355020, 5612010),
+            # on the seam, centroid in the first tile
+            (359980, 5612000, 360010, 5612010),
+            # on the seam, centroid in the second tile
+            (359995, 5612000, 360030, 5612010),
+            # centroid exactly on the seam
+            (seam - 10, 5612000, seam + 10, 5612010),
+            # on the corner of four tiles
+            (seam - 10, 5619990, seam + 10, 5620010),
+        ]
+        merged = []
+        for shard in shards:
+            import_region = grow_region(shard["region"], SHARD_MARGIN)
+            for building in buildings:
+                west, south, east, north = building
+                imported = (
+                    west < import_region["e"]
+                    and east > import_region["w"]
+                    and south < import_region["n"]
+                    and north > import_region["s"]
+                )
+                if imported and is_in_tile(
+                    shard["region"], *get_centroid(building)
+                ):
+                    # the whole building is in the import region
+                    self.assertTrue(
+                        import_region["w"] <= west
+                        and east <= import_region["e"]
+                        and import_region["s"] <= south
+                        and north <= import_region["n"]
+                    )
+                    merged.append((shard["id"], building))
+        self.assertEqual(
+            sorted(building for _id, building in merged), sorted(buildings)
+        )
+        owners = dict((building, shard_id) for shard_id, building in merged)
+        self.assertEqual(owners[buildings[1]], "00000")
+        self.assertEqual(owners[buildings[2]], "00001")
+        self.assertEqual(owners[buildings[3]], "00001")
+        self.assertEqual(owners[buildings[4]], "00003")
+
+    def test_stale_claim(self):
+        """Tests that the claim of a stopped worker is taken over by
+        exactly one other worker after the lease
+        """
+        shards = create_shards([("Sachsen", None)], BBOX, 10000)
+        write_manifest(self.manifest_file, {}, shards)
+        self.assertTrue(claim_shard(self.manifest_file, "00000", lease=1))
+        self.assertFalse(claim_shard(self.manifest_file, "00000", lease=1))
+        claim = get_marker(self.manifest_file, "00000", "claim")
+        old_time = time.time() - 10
+        os.utime(claim, (old_time, old_time))
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=reclaim, args=(self.manifest_file, results)
+            )
+            for _num in range(NUM_WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        claimed = [results.get() for _num in range(NUM_WORKERS)]
+        self.assertEqual(claimed.count(True), 1)
+        # the new claim is fresh
+        self.assertFalse(claim_shard(self.manifest_file, "00000", lease=1))
+        # done shards are not claimed again
+        mark_shard(self.manifest_file, "00000", "done", {"output": None})
+        os.utime(claim, (old_time, old_time))
+        self.assertFalse(claim_shard(self.manifest_file, "00000", lease=1))
+
+    def test_claim_heartbeat(self):
+        """Tests that the claim is renewed while the shard is processed"""
+        shards = create_shards([("Sachsen", None)], BBOX, 10000)
+        write_manifest(self.manifest_file, {}, shards)
+        self.assertTrue(claim_shard(self.manifest_file, "00000", lease=0.4))
+        with claim_heartbeat(self.manifest_file, "00000", lease=0.4):
+            time.sleep(1)
+            self.assertFalse(
+                claim_shard(self.manifest_file, "00000", lease=0.4)
+            )
+        time.sleep(0.6)
+        self.assertTrue(claim_shard(self.manifest_file, "00000", lease=0.4))
+
+    def test_concurrent_workers(self):
+        """Tests that each shard is claimed by exactly one worker and that
+        the results are in the order of the manifest
+        """
+        shards = create_shards([("Sachsen", None)], BBOX, 1000)
+        write_manifest(self.manifest_file, {"output": "buildings"}, shards)
+        workers = [
+            multiprocessing.Process(
+                target=run_worker, args=(self.manifest_file,)
+            )
+            for _num in range(NUM_WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+        manifest = read_manifest(self.manifest_file)
+        results, failed = get_shard_results(self.manifest_file, manifest)
+        self.assertEqual(failed, [])
+        self.assertEqual(len(results), len(shards))
+        self.assertEqual(
+            [result["output"] for result in results],
+            [f"{shard['id']}.gpkg" for shard in shards],
+        )
+        # no shard is claimed again
+        self.assertIsNone(claim_next_shard(self.manifest_file, manifest))
+
+    def test_failed_shard(self):
+        """Tests that failed and missing shards are reported"""
+        shards = create_shards([("Sachsen", None)], BBOX, 10000)
+        write_manifest(self.manifest_file, {}, shards)
+        manifest = read_manifest(self.manifest_file)
+        claim_next_shard(self.manifest_file, manifest)
+        mark_shard(self.manifest_file, "00000", "failed", {"error": "test"})
+        results, failed = get_shard_results(self.manifest_file, manifest)
+        self.assertEqual(failed, ["00000"])
+        self.assertEqual(results, [None] * len(shards))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -43,6 +43,14 @@ class VAlkisBuildingsImportTestBW(VAlkisBuildingsImportTestFsBase):
         """Tests aoi_map as optional input and federal state input file"""
         self.file_input_single()
 
+    def test_aoi_mode(self):
+        """Tests aoi_mode intersect and centroid"""
+        self.aoi_mode()
+
+    def test_generalize(self):
+        """Tests the simplify and min_area options"""
+        self.generalize()
+
 
 if __name__ == "__main__":
     test()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the deduplication
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests that buildings contained in several local files are
+#              imported only once
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import shutil
+import tempfile
+
+from grass.gunittest.gmodules import SimpleModule
+from grass.gunittest.main import test
+import grass.script as grass
+
+from v_alkis_buildings_import_base import VAlkisBuildingsImportTestFsBase
+
+
+class VAlkisBuildingsImportTestDedup(VAlkisBuildingsImportTestFsBase):
+    """Imports local directories containing the BW test file twice"""
+
+    fs = "BW"
+    federal_state = "Baden-Württemberg"
+    alkis_data_dir = os.path.join("data", "ALKIS")
+    source = os.path.join(alkis_data_dir, "BW", "ALKIS_testGebaeude.gpkg")
+    without_oi = f"test_without_oi_{os.getpid()}"
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_dir = tempfile.mkdtemp()
+        # copy of the source without OI, compared geometrically
+        cls.runModule("v.import", input=cls.source, output=cls.without_oi)
+        cls.runModule("v.db.dropcolumn", map=cls.without_oi, columns="OI")
+        cls.without_oi_file = os.path.join(cls.tmp_dir, "without_oi.gpkg")
+        cls.runModule(
+            "v.out.ogr",
+            input=cls.without_oi,
+            output=cls.without_oi_file,
+            format="GPKG",
+        )
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def tearDownClass(cls):
+        cls.runModule(
+            "g.remove", type="vector", name=cls.without_oi, flags="f"
+        )
+        shutil.rmtree(cls.tmp_dir)
+        super().tearDownClass()
+
+    def import_files(self, files):
+        """Import the buildings of the AOI from a local directory with the
+        given files
+
+        Returns:
+            num_buildings (int): number of imported buildings
+        """
+        data_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+        os.makedirs(os.path.join(data_dir, self.fs))
+        for i, path in enumerate(files):
+            shutil.copy(path, os.path.join(data_dir, self.fs, f"{i}.gpkg"))
+        v_check = SimpleModule(
+            "v.alkis.buildings.import",
+            output=self.test_output,
+            federal_state=self.federal_state,
+            aoi_map=self.aoi_map,
+            local_data_dir=data_dir,
+            overwrite=True,
+        )
+        self.assertModule(v_check, "Import of the local files fails")
+        return int(grass.vector_info_topo(self.test_output)["centroids"])
+
+    def test_oi_duplicates(self):
+        """Tests that buildings with the same OI are imported once"""
+        num_buildings = self.import_files([self.source])
+        self.assertGreater(num_buildings, 0, "No buildings imported")
+        self.assertEqual(
+            self.import_files([self.source, self.source]), num_buildings
+        )
+
+    def test_geometric_duplicates(self):
+        """Tests that buildings of a file without OI are matched
+        geometrically
+        """
+        num_buildings = self.import_files([self.source])
+        self.assertEqual(
+            self.import_files([self.source, self.without_oi_file]),
+            num_buildings,
+        )
+        self.assertEqual(
+            self.import_files([self.without_oi_file, self.without_oi_file]),
+            num_buildings,
+        )
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of reprojected sources
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the import of a source in another CRS than the
+#              location restricted to the region of the AOI
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+
+from grass.gunittest.gmodules import SimpleModule
+from grass.gunittest.main import test
+import grass.script as grass
+
+from v_alkis_buildings_import_base import VAlkisBuildingsImportTestFsBase
+
+
+class VAlkisBuildingsImportTestReprojection(VAlkisBuildingsImportTestFsBase):
+    """Imports the local BW data (EPSG:25832) into a location in
+    EPSG:25833, so that v.import reprojects the source
+    """
+
+    fs = "BW"
+    federal_state = "Baden-Württemberg"
+    alkis_data_dir = os.path.join("data", "ALKIS")
+    epsg = 25833
+    reference = f"test_reference_{os.getpid()}"
+
+    def tearDown(self):
+        super().tearDown()
+        for name in (self.reference, f"{self.reference}_all"):
+            if grass.find_file(name=name, element="vector")["file"]:
+                self.runModule("g.remove", type="vector", name=name, flags="f")
+
+    def test_reprojected_source(self):
+        """Tests that the buildings of the AOI are imported from a source
+        in another CRS
+        """
+        num_buildings = self.run_aoi_mode("intersect", self.aoi_map)
+        # reference: complete source reprojected by v.import, buildings
+        # overlapping with the AOI selected afterwards
+        self.runModule(
+            "v.import",
+            input=os.path.join(
+                self.alkis_data_dir, "BW", "ALKIS_testGebaeude.gpkg"
+            ),
+            output=f"{self.reference}_all",
+            extent="input",
+        )
+        self.runModule(
+            "v.select",
+            ainput=f"{self.reference}_all",
+            atype="area",
+            binput=self.aoi_map,
+            btype="area",
+            operator="overlap",
+            output=self.reference,
+        )
+        self.assertGreater(num_buildings, 0, "No buildings imported")
+        self.assertEqual(num_buildings, self.count_centroids(self.reference))
+
+    def test_grass_region(self):
+        """Tests that the region passed with GRASS_REGION is imported from
+        a source in another CRS, not the region of the mapset
+        """
+        env = os.environ.copy()
+        env["GRASS_REGION"] = grass.region_env(vector=self.aoi_map)
+        region = grass.region(env=env)
+        # mapset region far away from the buildings
+        self.runModule("g.region", n="n+100000", s="s+100000")
+        try:
+            v_check = SimpleModule(
+                "v.alkis.buildings.import",
+                output=self.test_output,
+                federal_state=self.federal_state,
+                local_data_dir=self.alkis_data_dir,
+                flags="r",
+                overwrite=True,
+                env_=env,
+            )
+            self.assertModule(v_check, "Import with GRASS_REGION fails")
+        finally:
+            self.runModule("g.region", n="n-100000", s="s-100000")
+        self.assertGreater(self.count_centroids(self.test_output), 0)
+        out_region = grass.parse_command(
+            "v.info", map=self.test_output, flags="g"
+        )
+        # buildings of the GRASS_REGION, the mapset region is 100 km away
+        self.assertLess(float(out_region["south"]), region["n"])
+        self.assertGreater(float(out_region["north"]), region["s"])
+        self.assertLess(float(out_region["west"]), region["e"])
+        self.assertGreater(float(out_region["east"]), region["w"])
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      v.alkis.buildings.import test of the vector merge
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+# PURPOSE:     Tests the merge of maps with overlapping categories, the
+#              merged attribute rows and the fallback to v.patch -e for
+#              maps with different columns
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import sys
+
+from grass.gunittest.main import test
+import grass.script as grass
+
+from v_alkis_buildings_import_base import VAlkisBuildingsImportTestBase
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# pylint: disable=wrong-import-position
+from vector_merge import (  # noqa: E402
+    MIN_MAPS,
+    get_table_layout,
+    merge_vectors,
+)
+
+# points per map, each map has the categories 1 to NUM_POINTS
+NUM_POINTS = 3
+
+
+class VAlkisBuildingsImportTestVectorMerge(VAlkisBuildingsImportTestBase):
+    """Merges point maps with the same categories"""
+
+    prefix = f"test_merge_{os.getpid()}"
+
+    def tearDown(self):
+        super().tearDown()
+        grass.run_command(
+            "g.remove", type="vector", pattern=f"{self.prefix}*", flags="f"
+        )
+        for table in grass.read_command("db.tables", flags="p").split():
+            if table.startswith(self.prefix):
+                grass.run_command(
+                    "db.droptable", table=table, flags="f", quiet=True
+                )
+
+    def create_maps(self, num_maps, extra_column=False):
+        """Create point maps with the categories 1 to NUM_POINTS and the
+        OI <map>_<point>; the last map gets an additional column if
+        extra_column is set
+        """
+        maps = []
+        for i in range(num_maps):
+            name = f"{self.prefix}_{i}"
+            columns = "x double precision, y double precision, OI varchar(20)"
+            points = [
+                f"{364000 + 20 * j}|{5621000 + 20 * i}|{i}_{j}"
+                for j in range(NUM_POINTS)
+            ]
+            if extra_column and i == num_maps - 1:
+                columns += ", GFK varchar(20)"
+                points = [f"{point}|2463" for point in points]
+            grass.write_command(
+                "v.in.ascii",
+                input="-",
+                output=name,
+                separator="pipe",
+                x=1,
+                y=2,
+                columns=columns,
+                stdin="\n".join(points),
+                quiet=True,
+            )
+            maps.append(name)
+        return maps
+
+    def get_tables(self):
+        """Get the tables of the default database"""
+        return grass.read_command("db.tables", flags="p").split()
+
+    def get_rows(self, vector_map, columns="cat,OI"):
+        """Get the attribute rows of a vector map"""
+        return grass.read_command(
+            "v.db.select",
+            map=vector_map,
+            columns=columns,
+            separator="pipe",
+            flags="c",
+        ).splitlines()
+
+    def test_merge(self):
+        """Tests that the categories are shifted and the attribute rows are
+        merged into the table of the output
+        """
+        maps = self.create_maps(MIN_MAPS)
+        input_tables = [grass.vector_db(name)[1]["table"] for name in maps]
+        merge_vectors(maps, self.test_output, nprocs=2)
+
+        self.assertEqual(
+            grass.vector_info_topo(self.test_output)["points"],
+            MIN_MAPS * NUM_POINTS,
+        )
+        self.assertEqual(
+            self.get_rows(self.test_output),
+            [
+                f"{i * NUM_POINTS + j + 1}|{i}_{j}"
+                for i in range(MIN_MAPS)
+                for j in range(NUM_POINTS)
+            ],
+        )
+        # the categories of the points match the keys of the rows
+        cats = grass.read_command(
+            "v.category",
+            input=self.test_output,
+            option="print",
+            quiet=True,
+        ).split()
+        self.assertEqual(
+            sorted(int(cat) for cat in cats),
+            list(range(1, MIN_MAPS * NUM_POINTS + 1)),
+        )
+        # the input tables are dropped after the merged table is connected
+        self.assertEqual(
+            grass.vector_db(self.test_output)[1]["table"], self.test_output
+        )
+        tables = self.get_tables()
+        self.assertIn(self.test_output, tables)
+        for table in input_tables:
+            self.assertNotIn(table, tables)
+        for name in maps:
+            self.assertFalse(grass.vector_db(name))
+
+    def test_patch_differing_columns(self):
+        """Tests that maps with different columns are patched with
+        v.patch -e and keep their tables
+        """
+        maps = self.create_maps(MIN_MAPS, extra_column=True)
+        self.assertEqual(get_table_layout(maps), (None, None))
+        input_tables = [grass.vector_db(name)[1]["table"] for name in maps]
+        merge_vectors(maps, self.test_output, nprocs=2)
+
+        self.assertEqual(
+            grass.vector_info_topo(self.test_output)["points"],
+            MIN_MAPS * NUM_POINTS,
+        )
+        rows = self.get_rows(self.test_output)
+        self.assertEqual(len(rows), MIN_MAPS * NUM_POINTS)
+        self.assertEqual(
+            sorted(row.split("|")[1] for row in rows),
+            sorted(
+                f"{i}_{j}" for i in range(MIN_MAPS) for j in range(NUM_POINTS)
+            ),
+        )
+        # the categories do not overlap
+        self.assertEqual(
+            len({row.split("|")[0] for row in rows}), MIN_MAPS * NUM_POINTS
+        )
+        tables = self.get_tables()
+        for name, table in zip(maps, input_tables):
+            self.assertIn(table, tables)
+            self.assertEqual(grass.vector_db(name)[1]["table"], table)
+
+    def test_patch_few_maps(self):
+        """Tests that fewer than MIN_MAPS maps are patched with v.patch -e"""
+        maps = self.create_maps(MIN_MAPS - 1)
+        merge_vectors(maps, self.test_output, nprocs=2)
+        rows = self.get_rows(self.test_output)
+        self.assertEqual(len(rows), (MIN_MAPS - 1) * NUM_POINTS)
+        self.assertEqual(
+            len({row.split("|")[0] for row in rows}),
+            (MIN_MAPS - 1) * NUM_POINTS,
+        )
+
+
+if __name__ == "__main__":
+    test()
@@ -42,6 +42,7 @@ class VAlkisBuildingsImportTestBase(TestCase):
     aoi_map = f"aoi_map_{pid}"
     east = ""
     west = ""
+    epsg = 25832
 
     GISDBASE = None
     TGTGISRC = None
@@ -53,7 +54,7 @@ class VAlkisBuildingsImportTestBase(TestCase):
     def setUpClass(cls):
         # switch location
         _, _, cls.GISDBASE, cls.TGTGISRC = get_current_location()
-        cls.TMPLOC, cls.SRCGISRC = create_tmp_location(epsg=25832)
+        cls.TMPLOC, cls.SRCGISRC = create_tmp_location(epsg=cls.epsg)
         # save region
         grass.run_command("g.region", save=cls.orig_region)
 
@@ -210,3 +211,130 @@ class VAlkisBuildingsImportTestFsBase(VAlkisBuildingsImportTestBase):
         print(
             f"Running test for {self.fs} AOI and federal state file input done."
         )
+
+    def count_centroids(self, vector_map):
+        """Get the number of centroids of a vector map"""
+        info = grass.parse_command("v.info", map=vector_map, flags="t")
+        return int(info["centroids"])
+
+    def count_vertices(self, vector_map):
+        """Get the number of vertices of the boundaries of a vector map"""
+        lines = grass.read_command(
+            "v.out.ascii",
+            input=vector_map,
+            type="boundary",
+            format="standard",
+        ).splitlines()
+        return sum(
+            int(line.split()[1]) for line in lines if line.startswith("B")
+        )
+
+    def run_aoi_mode(self, aoi_mode, aoi_map, **kwargs):
+        """Run the module with an aoi_mode and return the buildings"""
+        v_check = SimpleModule(
+            "v.alkis.buildings.import",
+            output=self.test_output,
+            federal_state=self.federal_state,
+            aoi_map=aoi_map,
+            aoi_mode=aoi_mode,
+            local_data_dir=self.alkis_data_dir,
+            overwrite=True,
+            **kwargs,
+        )
+        self.assertModule(v_check, f"Using aoi_mode={aoi_mode} fails")
+        return self.count_centroids(self.test_output)
+
+    def aoi_mode(self):
+        """Tests aoi_mode intersect and centroid"""
+        print(f"Running test for {self.fs} aoi_mode...")
+        num_intersect = self.run_aoi_mode("intersect", self.aoi_map)
+        num_centroid = self.run_aoi_mode("centroid", self.aoi_map)
+        self.assertGreater(num_intersect, 0, "No buildings imported")
+        # intersect keeps all buildings touching the AOI, centroid only the
+        # buildings with their centroid inside the AOI
+        self.assertLessEqual(num_centroid, num_intersect)
+        self.assertGreater(num_centroid, 0)
+        # a small AOI at a corner of a building contains no centroid
+        boundary = grass.read_command(
+            "v.out.ascii",
+            input=self.test_output,
+            type="boundary",
+            format="standard",
+        ).splitlines()
+        first_boundary = next(
+            num for num, line in enumerate(boundary) if line.startswith("B")
+        )
+        east, north = map(float, boundary[first_boundary + 1].split()[:2])
+        corner_aoi = f"{self.aoi_map}_corner"
+        grass.write_command(
+            "v.in.ascii",
+            input="-",
+            output=corner_aoi,
+            format="standard",
+            flags="n",
+            stdin="\n".join(
+                [
+                    "B 5",
+                    f"{east - 0.5} {north - 0.5}",
+                    f"{east + 0.5} {north - 0.5}",
+                    f"{east + 0.5} {north + 0.5}",
+                    f"{east - 0.5} {north + 0.5}",
+                    f"{east - 0.5} {north - 0.5}",
+                    "C 1 1",
+                    f"{east} {north}",
+                    "1 1",
+                ]
+            ),
+            quiet=True,
+        )
+        try:
+            self.assertGreater(self.run_aoi_mode("intersect", corner_aoi), 0)
+            self.assertEqual(self.run_aoi_mode("centroid", corner_aoi), 0)
+            atr = grass.parse_command(
+                "v.info", map=self.test_output, flags="c"
+            )
+            self.assertIn("AGS", list(atr.keys())[1])
+        finally:
+            self.runModule(
+                "g.remove", type="vector", name=corner_aoi, flags="f"
+            )
+        print(f"Running test for {self.fs} aoi_mode done.")
+
+    def generalize(self):
+        """Tests the simplify and min_area options"""
+        print(f"Running test for {self.fs} generalization...")
+        # whole buildings, so that no clipped parts are smaller than min_area
+        num_buildings = self.run_aoi_mode("intersect", self.aoi_map)
+        num_vertices = self.count_vertices(self.test_output)
+        areas = sorted(
+            float(line.split("|")[1])
+            for line in grass.read_command(
+                "v.to.db",
+                map=self.test_output,
+                type="centroid",
+                option="area",
+                flags="p",
+                separator="pipe",
+                quiet=True,
+            ).splitlines()[1:]
+        )
+        # between two areas, so that rounding does not change the result
+        middle = len(areas) // 2
+        min_area = (areas[middle - 1] + areas[middle]) / 2
+
+        # simplification keeps all buildings with less vertices
+        num_simplified = self.run_aoi_mode(
+            "intersect", self.aoi_map, simplify=2
+        )
+        self.assertEqual(num_simplified, num_buildings)
+        self.assertLess(self.count_vertices(self.test_output), num_vertices)
+
+        # buildings below min_area are not imported
+        num_large = self.run_aoi_mode(
+            "intersect", self.aoi_map, min_area=min_area
+        )
+        self.assertLess(num_large, num_buildings)
+        self.assertEqual(
+            num_large, len([area for area in areas if area > min_area])
+        )
+        print(f"Running test for {self.fs} generalization done.")
@@ -31,7 +31,7 @@
 
 # %option G_OPT_V_OUTPUT
 # % key: output
-# % required: yes
+# % required: no
 # %end
 
 # %option G_OPT_V_INPUT
@@ -40,6 +40,108 @@
 # % description: Vector map to restrict ALKIS building import to
 # %end
 
+# %option
+# % key: aoi_mode
+# % type: string
+# % required: no
+# % options: clip,intersect,centroid
+# % answer: clip
+# % label: Restriction of the buildings to aoi_map
+# % descriptions: clip;buildings are cut at the AOI boundary;intersect;whole buildings overlapping the AOI;centroid;whole buildings with their centroid in the AOI
+# %end
+
+# %option
+# % key: aoi_tolerance
+# % type: double
+# % required: no
+# % answer: 0
+# % label: Tolerance for the simplification of aoi_map in map units
+# % description: 0 to use aoi_map without simplification
+# %end
+
+# %option
+# % key: clip_method
+# % type: string
+# % required: no
+# % options: select,clip
+# % label: Clipping of the buildings with aoi_mode=clip (default: chosen by the number of buildings)
+# % descriptions: select;buildings inside the AOI are selected, only the buildings at the AOI boundary are clipped;clip;all buildings are clipped
+# %end
+
+# %option G_OPT_DB_WHERE
+# % label: WHERE conditions of SQL statement without 'where' keyword to import only some buildings
+# % description: Columns AGS, OI, GFK and AKTUALITAE are mapped to the columns of each federal state (Brandenburg: only AKTUALITAE, FUNKTION and GEBNUTZBEZ), e.g. GFK IN ('31001_1000', '31001_1010')
+# %end
+
+# %option
+# % key: simplify
+# % type: double
+# % required: no
+# % answer: 0
+# % label: Tolerance for the simplification of the building footprints in map units
+# % description: Topology-preserving simplification (Douglas-Peucker) during the import, 0 to keep all vertices
+# %end
+
+# %option
+# % key: min_area
+# % type: double
+# % required: no
+# % answer: 0
+# % description: Minimum area of the imported buildings in square meters, evaluated on the source data while reading it
+# %end
+
+# %option
+# % key: partition_by
+# % type: string
+# % required: no
+# % options: ags,tile
+# % label: Additionally write the output partitioned into one vector map per partition
+# % descriptions: ags;partitions by leading digits of AGS (municipality key);tile;partitions by grid tiles containing the building centroids
+# %end
+
+# %option
+# % key: partition_size
+# % type: double
+# % required: no
+# % description: Number of leading AGS digits (default: 8, municipality) or tile size in map units (default: 10000)
+# %end
+
+# %option
+# % key: shard_mode
+# % type: string
+# % required: no
+# % options: plan,run,merge
+# % label: Sharded execution of large jobs on several workers
+# % descriptions: plan;write the shards of the job (federal states x partitions x tiles) to manifest;run;process unclaimed shards of manifest (one call per worker);merge;merge the outputs of all shards of manifest into output
+# %end
+
+# %option G_OPT_F_OUTPUT
+# % key: manifest
+# % required: no
+# % description: JSON file of the job manifest for shard_mode, in a directory shared by the workers
+# %end
+
+# %option
+# % key: shard_size
+# % type: double
+# % required: no
+# % description: Tile size in map units for the shards of federal states without partitions (shard_mode=plan, default: no tiles)
+# %end
+
+# %option
+# % key: shard
+# % type: integer
+# % required: no
+# % description: Process only this shard (shard_mode=run), e.g. to repeat a failed shard
+# %end
+
+# %option G_OPT_M_MAPSET
+# % key: cache_mapset
+# % required: no
+# % label: Mapset caching the imported buildings
+# % description: Results of identical requests (AOI, federal states, options and source versions) are copied from this mapset
+# %end
+
 # %option G_OPT_M_DIR
 # % key: local_data_dir
 # % required: no
@@ -61,6 +163,21 @@
 # % options: Brandenburg,Berlin,Baden-Württemberg,Bayern,Bremen,Hessen,Hamburg,Mecklenburg-Vorpommern,Niedersachsen,Nordrhein-Westfalen,Rheinland-Pfalz,Schleswig-Holstein,Saarland,Sachsen,Sachsen-Anhalt,Thüringen
 # %end
 
+# %option
+# % type: string
+# % key: districts
+# % multiple: yes
+# % required: no
+# % label: Partitions to download with -p flag (default: all)
+# % description: Brandenburg districts (BAR,BRB,CB,EE,FF,HVL,LDS,LOS,MOL,OHV,OPR,OSL,P,PM,PR,SPN,TF,UM) or partitions of sources configured in source_config
+# %end
+
+# %option G_OPT_F_INPUT
+# % key: source_config
+# % required: no
+# % description: JSON file configuring the sources, e.g. mirrors per federal state
+# %end
+
 # %option
 # % key: dldir
 # % label: Path of output folder
@@ -69,6 +186,16 @@
 # % multiple: yes
 # %end
 
+# %option G_OPT_M_NPROCS
+# % answer: 0
+# % description: Number of parallel processes (0: all CPUs available to the container, <0: all but the given number)
+# %end
+
+# %option G_OPT_MEMORYMB
+# % answer: 0
+# % description: Maximum memory to be used in MB (0: 75 % of the memory available to the container)
+# %end
+
 # %flag
 # % key: d
 # % description: keep downloads
@@ -79,8 +206,47 @@
 # % description: Restrict ALKIS building data import to current region
 # %end
 
+# %flag
+# % key: n
+# % description: Print plan report (sources, cache status, size estimates and import settings) as JSON and exit
+# %end
+
+# %flag
+# % key: f
+# % description: Add columns GFK_NAME and GFK_CATEGORY with the decoded building function
+# %end
+
+# %flag
+# % key: p
+# % description: Only download, verify and prepare the data in dldir (warm cache), no import
+# %end
+
+# %rules
+# % required: federal_state, file, manifest
+# %end
+
 # %rules
-# % required: federal_state, file
+# % required: output, -p, manifest
+# %end
+
+# %rules
+# % requires: manifest, shard_mode
+# %end
+
+# %rules
+# % requires: shard_mode, manifest
+# %end
+
+# %rules
+# % requires: -p, dldir
+# %end
+
+# %rules
+# % requires: districts, -p
+# %end
+
+# %rules
+# % exclusive: -p, -n
 # %end
 
 # %rules
@@ -91,21 +257,24 @@
 # % excludes: aoi_map, -r
 # %end
 
-import zipfile
 import os
 import sys
 import atexit
 import glob
-from io import BytesIO
+import json
+import math
+import shutil
+import subprocess
+from datetime import date
 from zipfile import ZipFile
 from time import sleep
 from multiprocessing.pool import ThreadPool
-from datetime import datetime
-from datetime import timedelta
+from functools import partial
 import grass.script as grass
-import py7zr
-import requests
-from grass_gis_helpers.cleanup import general_cleanup
+
+# the heavy third-party dependencies py7zr, requests and grass_gis_helpers
+# are imported in the functions using them, so that the parser
+# (--interface-description, --help, GUI) starts fast
 
 sys.path.insert(
     1,
@@ -114,287 +283,1128 @@ sys.path.insert(
     ),
 )
 # pylint: disable=wrong-import-position
-from download_urls import (
-    URLS,
-    BUILDINGS_FILENAMES,
-    BB_districts,
-    download_dict,
+from federal_state_info import FS_ABBREVIATION, FS_AREA
+from local_data_catalog import (
+    estimate_features,
+    get_field_names,
+    get_intersecting_pairs,
+    read_file_info,
+    select_overlapping_files,
+    update_catalog,
+)
+from reprojection_cache import (
+    create_region_source,
+    create_srs_source,
+    is_same_crs,
+    reproject_source,
+)
+from pipeline import run_pipeline
+from zip_extraction import extract_members
+from remote_zip import fetch_zip_members
+from cache_lock import publish_files, single_flight, staging_dir
+from mirrors import (
+    download_with_failover,
+    get_candidate_urls,
+    get_download_filename,
+    load_source_config,
+)
+from providers import get_provider
+from attribute_filter import (
+    create_filtered_source,
+    get_referenced_columns,
+    get_source_where,
+    get_unmapped_columns,
+    map_where,
+)
+from feature_service import (
+    fetch_features,
+    get_number_matched,
+    use_feature_service,
+)
+from resources import ResourceManager
+from aoi_preparation import PreparedAoi
+from import_strategy import choose_clip_method, choose_strategy
+from result_cache import (
+    MAX_ENTRIES,
+    ResultCache,
+    get_cache_key,
+    get_geometry_hash,
+)
+from pg_attributes import alter_text_columns, get_pg_dblink, harmonize_table
+from vector_merge import merge_vectors
+from gfk_codes import decode_gfk
+from output_partitions import partition_output
+from shards import (
+    SHARD_MARGIN,
+    claim_heartbeat,
+    claim_next_shard,
+    create_shards,
+    get_shard_dir,
+    get_shard_results,
+    grow_region,
+    is_in_tile,
+    mark_shard,
+    read_manifest,
+    write_manifest,
 )
-from federal_state_info import FS_ABBREVIATION
 
-orig_region = None
 OUTPUT_ALKIS_TEMP = None
 dldir = None
 PID = None
-currentpath = os.getcwd()
 rm_vectors = []
+source_config = {}
+# options and flags passed on to the workers of a sharded job
+SHARD_OPTIONS = [
+    "aoi_mode",
+    "aoi_tolerance",
+    "clip_method",
+    "where",
+    "simplify",
+    "min_area",
+    "local_data_dir",
+    "nprocs",
+    "memory",
+]
+SHARD_FLAGS = "f"
+# budget of processes and memory (see resources.py)
+resources = None
+# AOI prepared for import and clipping (see aoi_preparation.py)
+prepared_aoi = None
+# GRASS modules with memory option
+memory_modules = {}
+# share of the area of two buildings of different sources without OI which
+# has to overlap to treat them as the same building
+DUPLICATE_OVERLAP = 0.9
+# points per border of an import region transformed into the CRS of a source
+REGION_BORDER_POINTS = 4
+# columns of the output
+OUTPUT_COLUMNS = ["AGS", "OI", "GFK"]
+# columns kept in prepared sources
+PREPARED_COLUMNS = OUTPUT_COLUMNS + ["AKTUALITAE"]
+# rough size of a building in compressed archives; only used for the
+# feature estimate of downloads in the plan report (-n), which is marked
+# as based on the archive size
+BYTES_PER_FEATURE = 150
+
+
+def get_memory_option(module, workers=1):
+    """Get memory option of a GRASS module within the memory budget
+
+    Args:
+        module (str): name of the GRASS module
+        workers (int): number of modules running in parallel
+
+    Returns:
+        (dict): memory option, empty if the module has no memory option
+    """
+    if module not in memory_modules:
+        memory_modules[module] = (
+            b'name="memory"' in grass.get_interface_description(module)
+        )
+    if not memory_modules[module]:
+        return {}
+    return {"memory": resources.module_memory(workers)}
+
+
+def keep_downloads():
+    """Check if downloads are kept (-d flag or prefetch mode)"""
+    return flags["d"] or flags["p"]
 
 
 def cleanup():
     """removes created objects when finished or failed"""
+    from grass_gis_helpers.cleanup import general_cleanup
+
     rm_dirs = []
-    if not flags["d"]:
+    if prepared_aoi:
+        rm_vectors.extend(prepared_aoi.tmp_maps)
+    # only the temporary download folder of this run is removed, a dldir
+    # given by the user may be a cache shared with other jobs
+    if not options["dldir"] and not keep_downloads():
         rm_dirs.append(dldir)
 
-    general_cleanup(
-        orig_region=orig_region, rm_vectors=rm_vectors, rm_dirs=rm_dirs
+    general_cleanup(rm_vectors=rm_vectors, rm_dirs=rm_dirs)
+
+
+def get_region_env(**kwargs):
+    """Get environment for module calls with a region of their own
+
+    The region is passed with GRASS_REGION instead of being set with
+    g.region, so the region of the mapset is never changed and several
+    imports (and the threads of one import) can run in one mapset.
+
+    Args:
+        kwargs: region parameters of g.region (e.g. vector or n, s, e, w),
+                none for the current region
+
+    Returns:
+        env (dict): copy of the environment with GRASS_REGION
+    """
+    env = os.environ.copy()
+    if kwargs or "GRASS_REGION" not in env:
+        env["GRASS_REGION"] = grass.region_env(**kwargs)
+    # otherwise the current region is the GRASS_REGION this module was
+    # called with (e.g. of a shard), grass.region_env() would read the
+    # region of the mapset instead
+    return env
+
+
+def is_location_crs(source):
+    """Check if a source is in the CRS of the current location (with
+    v.in.ogr -j, like v.import does)
+    """
+    returncode = grass.run_command(
+        "v.in.ogr",
+        input=source,
+        flags="j",
+        quiet=True,
+        errors="status",
+        stderr=subprocess.DEVNULL,
     )
+    return returncode == 0
 
 
-def url_response(url):
-    """downloads requested data and retries download if failed"""
-    filename_start_pos = url.rfind("/") + 1
-    filename = url[filename_start_pos:]
+def get_source_bbox(source, env):
+    """Get the bounding box of the region of env in the CRS of a source
 
-    trydownload = True
-    count = 0
-    while trydownload:
-        try:
-            count += 1
-            response = requests.get(url, stream=True, timeout=800)
-            response.raise_for_status()
-            with open(str(filename), "wb") as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    file.write(chunk)
-            trydownload = False
-        except Exception:
-            grass.message(_("retry download"))
-            if count > 10:
-                trydownload = False
-                grass.fatal(f"download of {url} not working")
-            sleep(10)
-    return url
+    Points along the region borders are transformed with m.proj, so the
+    bounding box contains the whole region also if its borders are curved
+    in the CRS of the source.
+
+    Returns:
+        bbox (list): west, south, east, north in the CRS of the source
+    """
+    region = grass.region(env=env)
+    points = []
+    for i in range(REGION_BORDER_POINTS + 1):
+        x = (
+            region["w"]
+            + (region["e"] - region["w"]) * i / REGION_BORDER_POINTS
+        )
+        y = (
+            region["s"]
+            + (region["n"] - region["s"]) * i / REGION_BORDER_POINTS
+        )
+        points.extend(
+            [
+                (x, region["s"]),
+                (x, region["n"]),
+                (region["w"], y),
+                (region["e"], y),
+            ]
+        )
+    points_file = grass.tempfile()
+    with open(points_file, "w", encoding="utf-8") as file:
+        file.write("".join(f"{x},{y}\n" for x, y in points))
+    coords = [
+        [float(val) for val in line.split(",")[:2]]
+        for line in grass.read_command(
+            "m.proj",
+            input=points_file,
+            proj_in=grass.read_command("g.proj", flags="jf").strip(),
+            proj_out=grass.read_command(
+                "g.proj", flags="jf", georef=source
+            ).strip(),
+            separator="comma",
+            quiet=True,
+        ).splitlines()
+        if line.strip()
+    ]
+    return [
+        min(coord[0] for coord in coords),
+        min(coord[1] for coord in coords),
+        max(coord[0] for coord in coords),
+        max(coord[1] for coord in coords),
+    ]
+
+
+def get_region_import(source, env):
+    """Get the v.import options importing a source in the region of env
+
+    v.import passes GRASS_REGION on to the temporary location in which it
+    reprojects a source, where the region (in the CRS of the location)
+    selects the wrong features. So GRASS_REGION is only passed for sources
+    in the CRS of the location; other sources are read through an OGR VRT
+    file selecting the features in the region transformed into their CRS.
+
+    Args:
+        source (str): path to vector file
+        env (dict): environment with the region, None for the current
+                    region
+
+    Returns:
+        kwargs (dict): input, extent and env options of v.import
+    """
+    if env is None:
+        env = get_region_env()
+    if is_location_crs(source):
+        return {"input": source, "extent": "region", "env": env}
+    return {
+        "input": create_region_source(
+            source,
+            get_source_bbox(source, env),
+            os.path.join(dldir, "regions"),
+        ),
+        "extent": "input",
+        "env": {
+            key: val
+            for key, val in os.environ.items()
+            if key != "GRASS_REGION"
+        },
+    }
 
 
-def administrative_boundaries(aoi_name):
-    """Returns list of districts overlapping with AOI/region"""
-    # url of administrative boundaries
-    url = (
-        "https://daten.gdz.bkg.bund.de/produkte/vg/vg5000_0101/"
-        "aktuell/vg5000_01-01.utm32s.shape.ebenen.zip"
+def wait_message(name):
+    """Get function informing that another job prepares the same data"""
+    return lambda: grass.message(
+        _(f"Waiting for another job downloading {name}...")
     )
-    # file of administrative boundaries in zip
-    filename = os.path.join(
-        "vg5000_01-01.utm32s.shape.ebenen",
-        "vg5000_ebenen_0101",
-        "VG5000_KRS.shp",
+
+
+def url_response(url, source_key=None):
+    """downloads requested data and retries download if failed
+
+    If mirrors are configured for the source in source_config, the data is
+    downloaded from the fastest healthy mirror, failing over to the next
+    one (and finally the original URL) if the download breaks. If another
+    job downloads the same file into dldir, its download is reused.
+    """
+    filename = os.path.join(dldir, get_download_filename(url))
+    candidate_urls = get_candidate_urls(source_config, source_key, url)
+
+    def download():
+        trydownload = True
+        count = 0
+        while trydownload:
+            try:
+                count += 1
+                used_url = download_with_failover(candidate_urls, filename)
+                if used_url != url:
+                    grass.verbose(
+                        _(f"Downloaded {url} from mirror {used_url}")
+                    )
+                trydownload = False
+            except Exception:
+                grass.message(_("retry download"))
+                if count > 10:
+                    trydownload = False
+                    grass.fatal(f"download of {url} not working")
+                sleep(10)
+
+    single_flight(
+        filename,
+        download,
+        os.path.isfile,
+        wait_message(os.path.basename(filename)),
     )
+    return filename
+
+
+def get_partition_index_values(aoi_name, provider):
+    """Returns the partition index values (e.g. district names) overlapping
+    with AOI/region
+    """
+    index = provider.partition_index
+    index_source = index["source"]
 
     # check if URL is reachable
-    response = requests.get(url)
-    if not response.status_code == 200:
-        sys.exit(
-            (
-                "v.alkis.buildings.import was stopped. The data of the"
-                "district boundaries are currently not available."
-            )
-        )
+    if "vsicurl/" in index_source:
+        import requests
 
-    # download and import administrative boundaries
-    grass.run_command(
-        "g.region",
-        vect=aoi_name,
-        quiet=True,
-    )
+        url = index_source.split("vsicurl/", 1)[1]
+        url = url[: url.find(".zip") + 4] if ".zip/" in url else url
+        response = requests.get(url, stream=True)
+        response.close()
+        if not response.status_code == 200:
+            sys.exit(
+                (
+                    "v.alkis.buildings.import was stopped. The data of the"
+                    "partition boundaries are currently not available."
+                )
+            )
 
-    vsi_command = f"/vsizip/vsicurl/{url}/{filename}"
-    districts_vec = f"all_districts_vec_{os.getpid()}"
-    rm_vectors.append(districts_vec)
+    # import partition boundaries
+    index_vec = f"partition_index_vec_{provider.key}_{os.getpid()}"
+    rm_vectors.append(index_vec)
     grass.run_command(
         "v.import",
-        input=vsi_command,
-        output=districts_vec,
-        extent="region",
+        output=index_vec,
         overwrite=True,
+        **get_region_import(index_source, get_region_env(vector=aoi_name)),
+        **get_memory_option("v.import"),
         quiet=True,
     )
 
-    # get district of AOI/region-polygon
-    krs_list = list(
+    # get partitions of AOI/region-polygon
+    values = list(
         grass.parse_command(
             "v.db.select",
-            map=districts_vec,
-            columns="GEN",
+            map=index_vec,
+            columns=index["field"],
             flags="c",
         ).keys()
     )
-    grass.message(krs_list)
-    return krs_list
+    grass.message(values)
+    return values
+
 
+def get_partition_urls(provider, aoi_map, partitions=None):
+    """Get download URLs of the partitions overlapping with AOI
 
-def download_alkis_buildings_bb(aoi_map):
-    """Download and prepare data for Brandenburg"""
-    # TODO check if data area already downloaded
+    Args:
+        provider (Provider): provider of a partitioned source
+        aoi_map (str): name of vector map defining AOI, if empty the current
+                       region is used
+        partitions (list): keys of partitions to use instead of the
+                           partitions overlapping with AOI
 
-    # select Landkreise
+    Returns:
+        urls (list): download URLs of the partitions
+    """
+    if partitions:
+        return [
+            url
+            for key, url in provider.partitions.items()
+            if key in partitions
+        ]
     if not aoi_map:
         aoi_map = f"aoi_region_{grass.tempname(12)}"
         rm_vectors.append(aoi_map)
         grass.run_command("v.in.region", output=aoi_map)
-    krs_list = administrative_boundaries(aoi_map)
-    filtered_urls = []
-    kbs_zips = []
-    all_urls_bl = download_dict["Brandenburg"]
-    for krs in krs_list:
-        for key, val in BB_districts.items():
-            if val == krs:
-                kbs_url = [
-                    url
-                    for url in all_urls_bl
-                    if f"ALKIS_Shape_{key}.zip" in url
-                ][0]
-                kbs_zip = os.path.basename(kbs_url)
-                kbs_zips.append(kbs_zip)
-                if not os.path.isfile(os.path.join(dldir, kbs_zip)):
-                    filtered_urls.append(kbs_url)
+    keys = provider.get_partition_keys(
+        get_partition_index_values(aoi_map, provider)
+    )
+    return [provider.partitions[key] for key in keys]
 
-    grass.message(
-        _(f"Downloading {len(filtered_urls)} files from {len(kbs_zips)}...")
+
+def get_partition_key(provider, url):
+    """Get the key of the partition with download URL url"""
+    for key, partition_url in provider.partitions.items():
+        if partition_url == url:
+            return key
+    return None
+
+
+def fetch_members(url, source_key, target_dir, member_filter):
+    """Fetch only the members of a remote zip file matching member_filter
+    from the original URL or a mirror, using HTTP range requests
+
+    Returns:
+        paths (list): paths of the extracted files, None if no source
+                      supports range requests
+    """
+    for candidate_url in get_candidate_urls(source_config, source_key, url):
+        paths, bytes_fetched = fetch_zip_members(
+            candidate_url, target_dir, member_filter
+        )
+        if paths:
+            grass.verbose(
+                _(
+                    f"Fetched {len(paths)} files from {candidate_url} "
+                    f"({bytes_fetched / 1024**2:.1f} MB transferred)"
+                )
+            )
+            return paths
+    return None
+
+
+def get_partition_dir(partition_file):
+    """Get directory of the extracted files of a partition"""
+    return os.path.join(
+        dldir, os.path.basename(partition_file).rsplit(".", 1)[0]
     )
-    os.chdir(dldir)
-    pool = ThreadPool(3)
-    results = pool.imap_unordered(url_response, filtered_urls)
-    for result in results:
-        print(result)
-    pool.close()
-    pool.join()
-    os.chdir(currentpath)
-
-    # for Brandenburg shape files
-    shp_files = []
-    globstring = "ALKIS_Shape_*.zip"
-    zip_files = glob.glob(os.path.join(dldir, globstring))
-    for zip_file in zip_files:
-        zip_base_name = os.path.basename(zip_file)
-        shp_dir = os.path.join(dldir, zip_base_name.rsplit(".", 1)[0])
-        if not os.path.isdir(shp_dir):
-            os.makedirs(shp_dir)
-        if zip_base_name in kbs_zips:
-            with ZipFile(zip_file, "r") as zip_obj:
-                # Extract only building-file in download directory
-                list_of_file_names = zip_obj.namelist()
-                for file_name in list_of_file_names:
-                    # should be nutzung and nutz-nungFlurstueck
-                    if "gebauedeBauwerk" in file_name:
-                        file_path = os.path.join(shp_dir, file_name)
-                        if not os.path.isfile(file_path):
-                            zip_obj.extract(file_name, shp_dir)
-                        if file_name.endswith(".shp"):
-                            shp_files.append(file_path)
-    grass.message(_("unzip downloaded zip folder"))
-    return shp_files
-
-
-def download_alkis_buildings(fs, url):
-    """download alkis building data"""
-    # create tempdirectory for unzipping files
+
+
+def get_partition_sources(provider, partition_dir):
+    """Get the extracted building sources of a partition"""
+    return sorted(
+        path
+        for path in glob.glob(
+            os.path.join(partition_dir, "**", "*"), recursive=True
+        )
+        if provider.is_building_source(path)
+    )
+
+
+def download_partition(url, provider):
+    """Download the file of a partition if not downloaded yet
+
+    If downloads are not kept, only the building files are fetched from
+    zip files with range requests, the other layers (e.g. about 90 % of a
+    Brandenburg district archive) are not transferred. The full zip file is
+    downloaded if the server does not support range requests.
+    """
+    partition_file = os.path.join(dldir, get_download_filename(url))
+    if not url.endswith(".zip"):
+        url_response(url, provider.key)
+        return partition_file
+    partition_dir = get_partition_dir(partition_file)
+
+    def is_ready(_partition_dir):
+        return os.path.isfile(partition_file) or bool(
+            get_partition_sources(provider, partition_dir)
+        )
+
+    def fetch():
+        with staging_dir(dldir) as tmp_dir:
+            if fetch_members(
+                url, provider.key, tmp_dir, provider.is_building_file
+            ):
+                publish_files(
+                    tmp_dir, partition_dir, provider.is_building_source
+                )
+
+    if not keep_downloads():
+        single_flight(
+            partition_dir,
+            fetch,
+            is_ready,
+            wait_message(os.path.basename(partition_dir)),
+        )
+    if not is_ready(partition_dir):
+        url_response(url, provider.key)
+    return partition_file
+
+
+def extract_partition(partition_file, provider, nprocs=1):
+    """Extract the building files of a partition zip file
+
+    Args:
+        partition_file (str): path of the downloaded partition
+        provider (Provider): provider of a partitioned source
+        nprocs (int): number of members extracted in parallel, the share of
+                      the extract budget of one of the partitions extracted
+                      at the same time
+    """
+    if not partition_file.endswith(".zip"):
+        return [partition_file]
+    partition_dir = get_partition_dir(partition_file)
+    if not os.path.isfile(partition_file):
+        # building files already fetched with range requests
+        return get_partition_sources(provider, partition_dir)
+    with ZipFile(partition_file, "r") as zip_obj:
+        # Extract only building-file in download directory
+        building_files = [
+            file_name
+            for file_name in zip_obj.namelist()
+            if provider.is_building_file(file_name)
+        ]
+
+    def is_extracted(_partition_dir):
+        return all(
+            os.path.isfile(os.path.join(partition_dir, file_name))
+            for file_name in building_files
+        )
+
+    def extract():
+        with staging_dir(dldir) as tmp_dir:
+            extract_members(
+                partition_file,
+                tmp_dir,
+                [
+                    file_name
+                    for file_name in building_files
+                    if not os.path.isfile(
+                        os.path.join(partition_dir, file_name)
+                    )
+                ],
+                nprocs,
+            )
+            publish_files(tmp_dir, partition_dir, provider.is_building_source)
+
+    single_flight(
+        partition_dir,
+        extract,
+        is_extracted,
+        wait_message(os.path.basename(partition_dir)),
+    )
+    return [
+        os.path.join(partition_dir, file_name)
+        for file_name in building_files
+        if provider.is_building_source(file_name)
+    ]
+
+
+def download_partitioned_source(
+    provider, aoi_map, import_func=None, partitions=None
+):
+    """Download and prepare the partitions of a source (e.g. the districts
+    of Brandenburg)
+
+    The partitions are processed in a pipeline: each partition is extracted
+    (and imported, if import_func is given) as soon as its download is
+    finished, while the other partitions are still downloading.
+
+    Args:
+        provider (Provider): provider of a partitioned source
+        aoi_map (str): name of vector map defining AOI
+        import_func (function): optional function importing the building
+                                files of a partition, returning a list of
+                                maps
+        partitions (list): keys of partitions to download instead of the
+                           partitions overlapping with AOI
+
+    Returns:
+        results (list): building files of the partitions or, if import_func
+                        is given, the imported vector maps
+    """
+    urls = get_partition_urls(provider, aoi_map, partitions)
+    num_downloads = len(
+        [
+            url
+            for url in urls
+            if not os.path.isfile(
+                os.path.join(dldir, get_download_filename(url))
+            )
+        ]
+    )
+    grass.message(_(f"Downloading {num_downloads} files from {len(urls)}..."))
+    # the extract budget is divided between the partitions extracted at the
+    # same time and the members extracted in parallel per partition
+    extract_workers = resources.workers("extract", len(urls))
+    member_workers = max(1, resources.workers("extract") // extract_workers)
+    stages = [
+        (
+            partial(download_partition, provider=provider),
+            resources.workers("download", len(urls)),
+        ),
+        (
+            partial(
+                extract_partition, provider=provider, nprocs=member_workers
+            ),
+            extract_workers,
+        ),
+    ]
+    if import_func:
+        stages.append((import_func, 1))
+    with resources.pipeline(len(stages)):
+        results = run_pipeline(urls, stages)
+    return [el for result in results for el in result]
+
+
+def download_alkis_buildings(provider):
+    """download alkis building data
+
+    Only one job downloads and extracts the data of a federal state into
+    dldir at a time; other jobs using the same dldir wait and reuse it. The
+    files are extracted into a staging directory and moved into dldir with
+    the buildings file last, so that it only exists when complete.
+    """
+    fs = provider.key
     # file of interest in zip
-    buildings_filename = BUILDINGS_FILENAMES[fs]
+    buildings_filename = os.path.normpath(provider.buildings_filename)
     alkis_source = os.path.join(dldir, buildings_filename)
-    if not os.path.isfile(alkis_source):
-        grass.message(_(f"Downloading ALKIS building data ({fs})..."))
-        if fs == "HE":
-            # insert current date into download URL
-            # try dates of yesterday and tomorrow if it's not working
-            today = datetime.now().strftime("%Y%m%d")
-            yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
-            tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y%m%d")
-            dates = [today, yesterday, tomorrow]
-            url = url.replace("DATE", today)
-            response = requests.get(url)
-            if not response.status_code == 200:
-                url = url.replace(dates[0], dates[1])
-                response = requests.get(url)
-            if not response.status_code == 200:
-                url = url.replace(dates[1], dates[2])
-                response = requests.get(url)
-        else:
-            response = requests.get(url)
 
-        if not response.status_code == 200:
-            grass.fatal(
-                _(
-                    "v.alkis.buildings.import was stopped."
-                    "The data are currently not available."
+    def is_buildings_file(path):
+        return os.path.normpath(path) == buildings_filename
+
+    def download():
+        grass.message(_(f"Downloading ALKIS building data ({fs})..."))
+        url = provider.resolve_url()
+        filename = os.path.join(dldir, get_download_filename(url))
+        with staging_dir(dldir) as tmp_dir:
+            if filename.endswith(".zip") and not keep_downloads():
+                # fetch only the files of the buildings layer (.shp, .dbf, ..)
+                buildings_stem = os.path.splitext(buildings_filename)[0]
+                if fetch_members(
+                    url,
+                    fs,
+                    tmp_dir,
+                    lambda name: os.path.splitext(os.path.normpath(name))[0]
+                    == buildings_stem,
+                ) and os.path.isfile(
+                    os.path.join(tmp_dir, buildings_filename)
+                ):
+                    publish_files(tmp_dir, dldir, is_buildings_file)
+                    return
+            try:
+                download_with_failover(
+                    get_candidate_urls(source_config, fs, url), filename
                 )
-            )
-        # unzip boundaries
-        if url.endswith(".zip"):
-            zip_file = zipfile.ZipFile(BytesIO(response.content))
-            zip_file.extractall(dldir)
-        elif url.endswith(".7z"):
-            zip_file = py7zr.SevenZipFile(BytesIO(response.content))
-            zip_file.extractall(dldir)
-        else:
-            grass.fatal(_("Zip format not (yet) supported."))
+            except RuntimeError as err:
+                grass.fatal(
+                    _(
+                        "v.alkis.buildings.import was stopped."
+                        f"The data are currently not available. ({err})"
+                    )
+                )
+            # unzip boundaries
+            if filename.endswith(".zip"):
+                extract_members(
+                    filename, tmp_dir, nprocs=resources.workers("extract")
+                )
+            elif filename.endswith(".7z"):
+                # only needed for Berlin
+                import py7zr
+
+                with py7zr.SevenZipFile(filename) as zip_file:
+                    zip_file.extractall(tmp_dir)
+            else:
+                grass.fatal(_("Zip format not (yet) supported."))
+            publish_files(tmp_dir, dldir, is_buildings_file)
+        if not keep_downloads():
+            os.remove(filename)
 
+    single_flight(
+        alkis_source, download, os.path.isfile, wait_message(f"{fs} data")
+    )
     return alkis_source
 
 
-def import_single_alkis_source(
-    alkis_source, aoi_map, load_region, output_alkis, f_state
-):
-    """Importing single ALKIS source"""
-    alkis_source_fixed = alkis_source
-    if f_state == "Hessen":
-        # shapefile with missing .prj file, CRS is EPSG:25832
-        alkis_source_fixed = alkis_source[:-4] + "_proj.gpkg"
-        popen_s = grass.Popen(
-            (
-                "ogr2ogr",
-                "-a_srs",
-                "EPSG:25832",
-                "-f",
-                "GPKG",
-                "-nlt",
-                "PROMOTE_TO_MULTI",
-                alkis_source_fixed,
-                alkis_source,
+def get_reprojected_source(source):
+    """Get source in CRS of the current location
+
+    Sources in another CRS are reprojected once and cached per target CRS and
+    source version in <dldir>/reprojected, so that v.import can read them
+    without reprojection. The cache is only used if the downloads are kept
+    (-d or -p flag), otherwise v.import reprojects only the needed extent.
+
+    Args:
+        source (str): path to vector file
+
+    Returns:
+        source (str): path to the source in the CRS of the current location
+    """
+    if not keep_downloads():
+        return source
+    try:
+        source_crs = read_file_info(source)["crs"]
+        location_crs = grass.read_command("g.proj", flags="wf").strip()
+        if not source_crs or is_same_crs(source_crs, location_crs):
+            return source
+        cache_dir = os.path.join(dldir, "reprojected")
+        cached_source, created = reproject_source(
+            source, location_crs, cache_dir, resources.workers("reproject")
+        )
+    except ImportError:
+        # without GDAL Python bindings v.import reprojects the source
+        return source
+    except RuntimeError as err:
+        grass.warning(_(f"Reprojection of {source} failed: {err}"))
+        return source
+    if created:
+        grass.message(_(f"Reprojected {source} to {cached_source}"))
+    else:
+        grass.verbose(_(f"Using cached reprojection of {source}"))
+    return cached_source
+
+
+def get_where_columns(source, schema):
+    """Get the columns of a source referenced by the where option
+
+    Returns:
+        columns (list): referenced columns, None if the columns of the
+                        source can not be read
+    """
+    if not options["where"]:
+        return []
+    try:
+        fields = get_field_names(source)
+    except (ImportError, RuntimeError):
+        return None
+    return get_referenced_columns(
+        map_where(options["where"], schema or {}), fields
+    )
+
+
+def has_columns(source, columns):
+    """Check if a source contains the columns (None: unknown columns)"""
+    if columns == []:
+        return True
+    if columns is None:
+        return False
+    try:
+        fields = {field.upper() for field in get_field_names(source)}
+    except (ImportError, RuntimeError):
+        return False
+    return all(col.upper() in fields for col in columns)
+
+
+def prepare_alkis_source(provider, alkis_source, prefetch=False):
+    """Get the ALKIS source to import
+
+    In the prefetch mode (-p) the source is converted to a GPKG with spatial
+    index which only contains the columns needed for the output; a missing
+    CRS (e.g. for Hessen) is assigned. Imports use this prepared source if
+    it is newer than the source and contains the columns referenced by
+    where. Otherwise the source is read directly and a missing CRS is
+    assigned with an OGR VRT file, so a one-off import does not write a
+    copy of the source.
+
+    Args:
+        provider (Provider): provider of the source
+        alkis_source (str): path to downloaded ALKIS source
+        prefetch (bool): create the prepared source if needed
+
+    Returns:
+        source (str): path to the source to import
+    """
+    prepared_source = os.path.splitext(alkis_source)[0] + "_prep.gpkg"
+
+    def is_prepared(path):
+        return os.path.isfile(path) and os.path.getmtime(
+            path
+        ) >= os.path.getmtime(alkis_source)
+
+    if prefetch:
+        if not is_prepared(prepared_source):
+            single_flight(
+                prepared_source,
+                partial(create_prepared_source, provider, alkis_source),
+                is_prepared,
+                wait_message(os.path.basename(prepared_source)),
             )
+        return prepared_source
+    if is_prepared(prepared_source) and has_columns(
+        prepared_source,
+        get_where_columns(alkis_source, provider.filter_schema),
+    ):
+        return prepared_source
+    if provider.crs:
+        # e.g. shapefile with missing .prj file
+        return create_srs_source(
+            alkis_source, provider.crs, os.path.dirname(alkis_source)
         )
-        returncode = popen_s.wait()
-        if returncode != 0:
-            grass.fatal(_("Assigning CRS to ALKIS input data failed!"))
-            sys.exit()
+    return alkis_source
 
-    # snap tolerance = 0.1 to remove overlapping areas in some source datasets
-    snap = -1
-    if f_state == "Thüringen":
-        snap = 0.1
 
-    if aoi_map:
-        # set region to aoi_map
-        grass.run_command("g.region", vector=aoi_map, quiet=True)
-        # if grass.find_file(
-        #     name=OUTPUT_ALKIS_TEMP, element="vector"
-        # )["file"] != "":
-        #     import pdb; pdb.set_trace()
-        #     OUTPUT_ALKIS_TEMP += "_2"
-        #     rm_vectors.append(OUTPUT_ALKIS_TEMP)
+def create_prepared_source(provider, alkis_source):
+    """Write the prepared GeoPackage of a source (see prepare_alkis_source)"""
+    prepared_source = os.path.splitext(alkis_source)[0] + "_prep.gpkg"
+    cmd = [
+        "ogr2ogr",
+        "-f",
+        "GPKG",
+        "-nlt",
+        "PROMOTE_TO_MULTI",
+        "-lco",
+        "SPATIAL_INDEX=YES",
+    ]
+    if provider.crs:
+        # e.g. shapefile with missing .prj file
+        cmd.extend(["-a_srs", provider.crs])
+    prepared_columns = PREPARED_COLUMNS + [
+        col.upper()
+        for col in list(provider.schema.values())
+        + list(provider.filter_schema.values())
+    ]
+    try:
+        select_columns = [
+            col
+            for col in get_field_names(alkis_source)
+            if col.upper() in prepared_columns
+        ]
+        if select_columns:
+            cmd.extend(["-select", ",".join(select_columns)])
+    except (ImportError, RuntimeError):
+        pass
+    tmp_source = f"{prepared_source}.tmp{os.getpid()}.gpkg"
+    cmd.extend([tmp_source, alkis_source])
+    popen_s = grass.Popen(cmd)
+    returncode = popen_s.wait()
+    if returncode != 0:
+        grass.fatal(_(f"Preparing ALKIS input data {alkis_source} failed!"))
+    os.replace(tmp_source, prepared_source)
+
+
+def verify_source(source):
+    """Verify that a source can be read and contains buildings"""
+    try:
+        features = read_file_info(source)["features"]
+    except ImportError:
+        return
+    except RuntimeError as err:
+        grass.fatal(_(f"Source {source} can not be read: {err}"))
+    if features == 0:
+        grass.warning(_(f"Source {source} contains no buildings."))
+    else:
+        grass.verbose(_(f"Source {source} contains {features} buildings."))
+
+
+def prepare_partition(source_files):
+    """Verify and prepare the building files of a partition"""
+    for source_file in source_files:
+        verify_source(source_file)
+        get_reprojected_source(source_file)
+    return source_files
+
+
+def prefetch_federal_state(args):
+    """Download, verify and prepare the data of a federal state
+
+    Args:
+        args (tuple): name of federal state and list of partitions (e.g.
+                      Brandenburg districts)
+    """
+    federal_state, districts = args
+    fs = FS_ABBREVIATION[federal_state]
+    provider = get_provider(fs, source_config)
+    if provider is None:
+        grass.warning(_(f"Download for {fs} is not supported."))
+        return None
+    if provider.partitioned:
+        partitions = [
+            key for key in districts or [] if key in provider.partitions
+        ]
+        download_partitioned_source(
+            provider,
+            None,
+            import_func=prepare_partition,
+            partitions=partitions or list(provider.partitions),
+        )
+    else:
+        alkis_source = download_alkis_buildings(provider)
+        verify_source(alkis_source)
+        get_reprojected_source(
+            prepare_alkis_source(provider, alkis_source, prefetch=True)
+        )
+    grass.message(_(f"Data of {federal_state} prepared in {dldir}."))
+    return fs
+
+
+def prefetch(federal_states, districts):
+    """Download, verify and prepare the data of the federal states in
+    parallel without importing them
+    """
+    for federal_state in federal_states:
+        if federal_state not in FS_ABBREVIATION:
+            grass.fatal(_(f"Non valid name of federal state: {federal_state}"))
+    partition_keys = set()
+    for federal_state in federal_states:
+        provider = get_provider(FS_ABBREVIATION[federal_state], source_config)
+        if provider:
+            partition_keys.update(provider.partitions)
+    for district in districts or []:
+        if district not in partition_keys:
+            grass.fatal(_(f"Non valid district or partition: {district}"))
+    pool = ThreadPool(resources.workers("download", len(federal_states)))
+    pool.map(
+        prefetch_federal_state,
+        [(federal_state, districts) for federal_state in federal_states],
+    )
+    pool.close()
+    pool.join()
+
+
+def clip_vector(input_map, clip_map, output):
+    """Clip a vector map with v.clip"""
+    grass.run_command(
+        "v.clip",
+        input=input_map,
+        clip=clip_map,
+        output=output,
+        flags="d",
+        **get_memory_option("v.clip"),
+        quiet=True,
+    )
+
+
+def get_aoi_region_envs(aoi_map):
+    """Get environments with the import regions of the AOI
+
+    With a prepared AOI, the parts of a multipart AOI are imported with
+    their own regions instead of the (possibly huge) bounding box of the
+    complete AOI.
+
+    Returns:
+        envs (list): environments with the region of one import
+    """
+    if not prepared_aoi:
+        return [get_region_env(vector=aoi_map)]
+    return [get_region_env(**region) for region in prepared_aoi.regions]
+
+
+def extract_areas(input_map, cats, output):
+    """Extract the areas with the given categories into a vector map
+
+    Without categories an empty map with the attribute table is created,
+    v.extract file= needs categories.
+    """
+    if not cats:
         grass.run_command(
-            "v.import",
-            input=alkis_source_fixed,
-            output=OUTPUT_ALKIS_TEMP,
-            snap=snap,
-            extent="region",
+            "v.extract",
+            input=input_map,
+            output=output,
+            type="area",
+            where="0 = 1",
             quiet=True,
-            overwrite=True,
         )
+        return
+    cats_file = grass.tempfile()
+    with open(cats_file, "w") as file:
+        file.write("\n".join(cats))
+    grass.run_command(
+        "v.extract",
+        input=input_map,
+        output=output,
+        type="area",
+        file=cats_file,
+        quiet=True,
+    )
+
+
+def get_clip_method(input_map):
+    """Get the clip_method of aoi_mode=clip, by default chosen by the
+    number of imported buildings (see import_strategy.py)
+    """
+    if options["clip_method"]:
+        return options["clip_method"]
+    return choose_clip_method(
+        int(grass.vector_info_topo(input_map)["centroids"])
+    )
+
+
+def restrict_to_aoi(input_map, aoi_map, output, aoi_mode=None):
+    """Restrict the imported buildings to the AOI depending on aoi_mode
+
+    With aoi_mode=clip the buildings are cut at the AOI boundary; with
+    clip_method=select only the buildings which are not inside the interior
+    cells of the prepared AOI are clipped. With intersect and centroid whole buildings are selected with spatial index
+    lookups (v.select) instead of cutting their geometries, which is much
+    faster for large AOIs and keeps the footprints intact.
+
+    Args:
+        input_map (str): name of the imported buildings
+        aoi_map (str): name of vector map defining AOI
+        output (str): name of the output vector map
+        aoi_mode (str): clip, intersect or centroid, by default the aoi_mode
+                        option
+    """
+    aoi_mode = aoi_mode or options["aoi_mode"] or "clip"
+    if (
+        aoi_mode == "clip"
+        and prepared_aoi
+        and get_clip_method(input_map) == "select"
+    ):
+        # only the buildings at the AOI boundary are clipped
+        prepared_aoi.clip(input_map, output, clip_vector)
+    elif aoi_mode == "clip":
+        clip_vector(input_map, aoi_map, output)
+    elif aoi_mode == "intersect":
         grass.run_command(
-            "v.clip",
-            input=OUTPUT_ALKIS_TEMP,
-            clip=aoi_map,
-            output=output_alkis,
-            flags="d",
+            "v.select",
+            ainput=input_map,
+            atype="area",
+            binput=aoi_map,
+            btype="area",
+            operator="overlap",
+            output=output,
+            quiet=True,
+        )
+    else:
+        # select the centroids in the AOI and extract their areas
+        centroids = f"{input_map}_centroids"
+        rm_vectors.append(centroids)
+        grass.run_command(
+            "v.select",
+            ainput=input_map,
+            atype="centroid",
+            binput=aoi_map,
+            btype="area",
+            operator="overlap",
+            output=centroids,
+            flags="t",
             quiet=True,
         )
+        cats = grass.read_command(
+            "v.category",
+            input=centroids,
+            layer=1,
+            type="centroid",
+            option="print",
+            quiet=True,
+        ).split()
+        if not cats:
+            grass.verbose(_("No building centroid lies inside the AOI."))
+        extract_areas(input_map, cats, output)
+
+
+def check_where(provider):
+    """Check that the columns of the where option exist in the source of a
+    provider, e.g. the district data of Brandenburg has no GFK
+    """
+    if not options["where"]:
+        return
+    unmapped = get_unmapped_columns(
+        options["where"], provider.filter_schema, PREPARED_COLUMNS
+    )
+    if unmapped:
+        grass.fatal(
+            _(
+                f"Column {unmapped[0]} of where is not available for "
+                f"{provider.key}. Columns of {provider.key}: "
+                f"{', '.join(provider.filter_schema) or '-'}"
+            )
+        )
+
+
+def get_filtered_source(source, schema=None):
+    """Get source reading only the buildings matching the where and min_area
+    options
+
+    Args:
+        source (str): path to vector file
+        schema (dict): source column per column usable in where, by
+                       default the output columns have the same names
+
+    Returns:
+        source (str): path to the source or to an OGR VRT file filtering it
+    """
+    if schema is None:
+        schema = {col: col for col in OUTPUT_COLUMNS}
+    where = get_source_where(
+        options["where"], schema, float(options["min_area"] or 0)
+    )
+    if not where:
+        return source
+    return create_filtered_source(
+        source, where, os.path.join(dldir, "filtered")
+    )
+
+
+def import_single_alkis_source(
+    alkis_source, aoi_map, load_region, output_alkis, provider
+):
+    """Importing single ALKIS source"""
+    alkis_source_fixed = prepare_alkis_source(provider, alkis_source)
+    alkis_source_fixed = get_filtered_source(
+        get_reprojected_source(alkis_source_fixed), provider.filter_schema
+    )
+
+    # snap tolerance (e.g. 0.1) to remove overlapping areas in some source
+    # datasets
+    snap = provider.snap
+
+    if aoi_map:
+        # import the buildings in the region(s) of aoi_map
+        region_envs = get_aoi_region_envs(aoi_map)
+        region_outputs = []
+        for i, region_env in enumerate(region_envs):
+            region_output = OUTPUT_ALKIS_TEMP
+            if len(region_envs) > 1:
+                region_output = f"{OUTPUT_ALKIS_TEMP}_{i}"
+                rm_vectors.append(region_output)
+            grass.run_command(
+                "v.import",
+                output=region_output,
+                snap=snap,
+                **get_region_import(alkis_source_fixed, region_env),
+                **get_memory_option("v.import"),
+                quiet=True,
+                overwrite=True,
+            )
+            region_outputs.append(region_output)
+        if len(region_outputs) > 1:
+            patch_vector(region_outputs, OUTPUT_ALKIS_TEMP)
+        restrict_to_aoi(OUTPUT_ALKIS_TEMP, aoi_map, output_alkis)
     elif load_region:
+        # the current region may be a GRASS_REGION, e.g. of a shard
         grass.run_command(
             "v.import",
-            input=alkis_source_fixed,
             output=output_alkis,
             snap=snap,
-            extent="region",
+            **get_region_import(alkis_source_fixed, None),
+            **get_memory_option("v.import"),
             quiet=True,
         )
     else:
@@ -403,12 +1413,17 @@ def import_single_alkis_source(
             input=alkis_source_fixed,
             output=output_alkis,
             snap=snap,
+            **get_memory_option("v.import"),
             quiet=True,
         )
 
 
 def change_col_text_type(map):
     """Change column type from CHARACTER to TEXT"""
+    dblink = get_pg_dblink(map)
+    if dblink:
+        alter_text_columns(map, dblink)
+        return
     column_list = {
         col.split("|")[1]: col.split("|")[0]
         for col in grass.parse_command("v.info", map=map, flags="cg")
@@ -437,81 +1452,425 @@ def change_col_text_type(map):
             )
 
 
-def import_shapefiles(shape_files, output_alkis, aoi_map=None):
-    """Import shapefiles (for Brandenburg)"""
-    if aoi_map:
-        grass.run_command("g.region", vector=aoi_map, quiet=True)
-    out_tempall = list()
-    for shape_file in shape_files:
-        grass.message(_(f"Importing {shape_file}"))
-        out_temp = f"""out_temp_{PID}_
-        {os.path.splitext(os.path.basename(shape_file))[0]}"""
-        rm_vectors.append(out_temp)
-        grass.run_command(
-            "v.import",
-            input=shape_file,
-            output=out_temp,
-            extent="region",
-            quiet=True,
-        )
-        out_tempall.append(out_temp)
-        # check columns
-        change_col_text_type(out_temp)
-        column_list = {
-            col.split("|")[1]: col.split("|")[0]
-            for col in grass.parse_command("v.info", map=out_temp, flags="cg")
-        }
-        drop_columns = [
-            el
-            for el in column_list
-            if el
-            not in [
-                "cat",
-                "aktualit",
-                "gebnutzbez",
-                "funktion",
-                "anzahlgs",
-                "lagebeztxt",
-            ]
-        ]
+def import_partition_file(source_file, provider, env=None):
+    """Import a single building file of a partition (e.g. a Brandenburg
+    district) restricted to the region of env (default: current region)
+    """
+    grass.message(_(f"Importing {source_file}"))
+    partition = os.path.basename(os.path.dirname(source_file))
+    source_name = os.path.splitext(os.path.basename(source_file))[0]
+    out_temp = f"out_temp_{PID}_{partition}_{source_name}"
+    rm_vectors.append(out_temp)
+    grass.run_command(
+        "v.import",
+        **get_region_import(
+            get_filtered_source(
+                get_reprojected_source(source_file), provider.filter_schema
+            ),
+            env,
+        ),
+        output=out_temp,
+        snap=provider.snap,
+        **get_memory_option("v.import"),
+        quiet=True,
+    )
+    # check columns
+    change_col_text_type(out_temp)
+    column_list = {
+        col.split("|")[1]: col.split("|")[0]
+        for col in grass.parse_command("v.info", map=out_temp, flags="cg")
+    }
+    keep_columns = ["cat"] + list(provider.schema.values())
+    drop_columns = [el for el in column_list if el not in keep_columns]
+    if drop_columns:
         grass.run_command(
             "v.db.dropcolumn",
             map=out_temp,
             columns=drop_columns,
             quiet=True,
         )
+    return out_temp
+
+
+def import_partition_files(source_files, provider, env=None):
+    """Import the building files of a partition"""
+    return [
+        import_partition_file(source_file, provider, env)
+        for source_file in source_files
+    ]
+
+
+def import_partitioned_source(provider, aoi_map, output_alkis):
+    """Download and import the partitions of a source (e.g. the districts
+    of Brandenburg)
+
+    The partitions are imported while the following ones are still
+    downloading and extracting.
+    """
+    region_env = get_region_env(vector=aoi_map) if aoi_map else None
+    out_tempall = download_partitioned_source(
+        provider,
+        aoi_map,
+        import_func=partial(
+            import_partition_files, provider=provider, env=region_env
+        ),
+    )
+    out = output_alkis
+    if aoi_map:
+        out = f"{OUTPUT_ALKIS_TEMP}_{provider.key}"
+        rm_vectors.append(out)
+    patch_vector(out_tempall, out)
+    if aoi_map:
+        restrict_to_aoi(out, aoi_map, output_alkis)
+
+
+def get_location_crs():
+    """Get CRS of the current location as EPSG:<code>"""
+    srid = grass.parse_command("g.proj", flags="g").get("srid", "")
+    if not srid.upper().startswith("EPSG:"):
+        grass.fatal(_("The CRS of the location has no EPSG code."))
+    return srid.upper()
+
+
+def import_feature_service_source(provider, aoi_map, output_alkis):
+    """Import the buildings of the AOI/region from a WFS or OGC API Features
+    endpoint
+
+    The features in the bounding box are requested page by page in
+    parallel; each page is imported as soon as it is fetched.
+    """
+    region_envs = get_aoi_region_envs(aoi_map) if aoi_map else [None]
+    pages_dir = os.path.join(dldir, f"feature_service_{provider.key}_{PID}")
+    out_tempall = []
+    try:
+        for i, region_env in enumerate(region_envs):
+            region = grass.region(env=region_env)
+            bbox = [region["w"], region["s"], region["e"], region["n"]]
+            # pages are fetched while the previous ones are imported
+            with resources.pipeline(2):
+                out_tempall.extend(
+                    fetch_features(
+                        provider.feature_service,
+                        bbox,
+                        get_location_crs(),
+                        os.path.join(pages_dir, str(i)),
+                        import_func=partial(
+                            import_partition_file,
+                            provider=provider,
+                            env=region_env,
+                        ),
+                        nprocs=resources.workers("download"),
+                    )
+                )
+    except Exception as err:  # pylint: disable=broad-except
+        grass.fatal(
+            _(
+                f"Requesting the feature service of {provider.key} failed: {err}"
+            )
+        )
+    finally:
+        shutil.rmtree(pages_dir, ignore_errors=True)
+    if not out_tempall:
+        grass.fatal(_(f"The feature service of {provider.key} is empty."))
     out = output_alkis
     if aoi_map:
-        out = OUTPUT_ALKIS_TEMP
+        out = f"{OUTPUT_ALKIS_TEMP}_{provider.key}"
+        rm_vectors.append(out)
     patch_vector(out_tempall, out)
     if aoi_map:
+        restrict_to_aoi(out, aoi_map, output_alkis)
+
+
+def read_per_cat_values(vector_map, option):
+    """Read values of v.to.db option (e.g. area, coor) per category"""
+    values = {}
+    lines = grass.read_command(
+        "v.to.db",
+        map=vector_map,
+        type="centroid",
+        option=option,
+        flags="p",
+        separator="pipe",
+        quiet=True,
+    ).splitlines()
+    # first line is the header
+    for line in lines[1:]:
+        vals = line.split("|")
+        if vals[0] in ("", "-1"):
+            continue
+        values[vals[0]] = vals[1:]
+    return values
+
+
+def read_oi_values(vector_map):
+    """Get the OI of each building
+
+    Returns:
+        oi_values (dict): OI per category, empty if the map has no OI
+    """
+    # tables created with unquoted names in PostgreSQL use lower case
+    oi_columns = [
+        col for col in grass.vector_columns(vector_map) if col.upper() == "OI"
+    ]
+    if not oi_columns:
+        return {}
+    lines = grass.read_command(
+        "v.db.select",
+        map=vector_map,
+        columns=f'cat,"{oi_columns[0]}"',
+        separator="pipe",
+        flags="c",
+    ).splitlines()
+    oi_values = {}
+    for line in lines:
+        cat, oi = line.split("|", 1)
+        if oi:
+            oi_values[cat] = oi
+    return oi_values
+
+
+def get_vector_bbox(vector_map):
+    """Get bounding box (west, south, east, north) of a vector map"""
+    info = grass.vector_info(vector_map)
+    return [float(info[key]) for key in ("west", "south", "east", "north")]
+
+
+def get_geometric_duplicates(vector_map, other_map):
+    """Get the buildings of a vector map which are contained in another one
+
+    Only buildings overlapping with the other map (found by v.select with
+    the spatial index) are compared. Two buildings match if their
+    intersection covers DUPLICATE_OVERLAP of both areas, which tolerates
+    the small shifts caused by snapping or reprojection. The caller only
+    compares maps whose bounding boxes intersect.
+
+    Args:
+        vector_map (str): name of the vector map with possible duplicates
+        other_map (str): name of the vector map to compare with
+
+    Returns:
+        duplicates (set): categories of the duplicates in vector_map
+    """
+    candidates = []
+    for ainput, binput in ((vector_map, other_map), (other_map, vector_map)):
+        candidate_map = f"dedup_{grass.tempname(8)}"
+        rm_vectors.append(candidate_map)
         grass.run_command(
-            "v.clip",
-            input=OUTPUT_ALKIS_TEMP,
-            clip=aoi_map,
-            output=output_alkis,
-            flags="d",
+            "v.select",
+            ainput=ainput,
+            binput=binput,
+            output=candidate_map,
+            operator="overlap",
+            flags="t",
             quiet=True,
         )
+        if int(grass.vector_info_topo(candidate_map)["areas"]) == 0:
+            return set()
+        candidates.append(candidate_map)
+    overlay_map = f"dedup_{grass.tempname(8)}"
+    rm_vectors.append(overlay_map)
+    grass.run_command(
+        "v.overlay",
+        ainput=candidates[0],
+        binput=candidates[1],
+        operator="and",
+        output=overlay_map,
+        quiet=True,
+    )
+    areas_a = read_per_cat_values(candidates[0], "area")
+    areas_b = read_per_cat_values(candidates[1], "area")
+    overlay_areas = read_per_cat_values(overlay_map, "area")
+    overlaps = {}
+    for line in grass.read_command(
+        "v.db.select",
+        map=overlay_map,
+        columns="cat,a_cat,b_cat",
+        separator="pipe",
+        flags="c",
+    ).splitlines():
+        cat, a_cat, b_cat = line.split("|")
+        area = float(overlay_areas.get(cat, ["0"])[0])
+        overlaps[(a_cat, b_cat)] = overlaps.get((a_cat, b_cat), 0) + area
+    duplicates = set()
+    for (a_cat, b_cat), overlap in overlaps.items():
+        area = max(float(areas_a[a_cat][0]), float(areas_b[b_cat][0]))
+        if overlap >= DUPLICATE_OVERLAP * area:
+            duplicates.add(a_cat)
+    return duplicates
+
+
+def deduplicate_buildings(vector_list):
+    """Remove buildings contained in one of the previous vector maps
+
+    Buildings with an OI are looked up in a hash index of the OI of the
+    previous maps. Sources without OI (e.g. Brandenburg) are matched
+    geometrically with the previous maps (see get_geometric_duplicates),
+    but only with those whose bounding box intersects, so that e.g. tiles
+    are only compared with their neighbours.
+    Only buildings occurring in more than one map are removed; buildings
+    repeated within one map are part of its source and kept.
 
+    Args:
+        vector_list (list): names of vector maps which will be merged
 
-def patch_vector(vector_list, output):
-    # patch output from several federal states
-    if len(vector_list) > 1:
+    Returns:
+        dedup_list (list): vector maps without duplicates
+    """
+    oi_lists = [read_oi_values(vector_map) for vector_map in vector_list]
+    bboxes = [get_vector_bbox(vector_map) for vector_map in vector_list]
+    previous_maps = {}
+    for previous, idx in get_intersecting_pairs(bboxes):
+        if not (oi_lists[idx] and oi_lists[previous]):
+            previous_maps.setdefault(idx, []).append(vector_list[previous])
+    oi_index = set()
+    dedup_list = []
+    num_duplicates = 0
+    for idx, vector_map in enumerate(vector_list):
+        oi_values = oi_lists[idx]
+        duplicates = {cat for cat, oi in oi_values.items() if oi in oi_index}
+        for previous_map in previous_maps.get(idx, []):
+            duplicates.update(
+                get_geometric_duplicates(vector_map, previous_map)
+            )
+        oi_index.update(oi_values.values())
+        if not duplicates:
+            dedup_list.append(vector_map)
+            continue
+        num_duplicates += len(duplicates)
+        cats_file = grass.tempfile()
+        with open(cats_file, "w") as file:
+            file.write("\n".join(sorted(duplicates, key=int)))
+        dedup_map = f"{vector_map}_dedup"
+        rm_vectors.append(dedup_map)
         grass.run_command(
-            "v.patch",
-            input=vector_list,
-            output=output,
-            flags="e",
+            "v.extract",
+            input=vector_map,
+            output=dedup_map,
+            file=cats_file,
+            flags="r",
             quiet=True,
         )
+        dedup_list.append(dedup_map)
+    if num_duplicates > 0:
+        grass.message(_(f"Removed {num_duplicates} duplicated buildings."))
+    return dedup_list
+
+
+def patch_vector(vector_list, output):
+    """Merge vector maps (e.g. of several federal states, partitions or
+    local files) without duplicated buildings
+
+    The vector maps are temporary maps, their attribute tables are moved
+    into the output.
+    """
+    if len(vector_list) > 1:
+        vector_list = deduplicate_buildings(vector_list)
+        merge_vectors(vector_list, output, resources.workers("import"))
     else:
         grass.run_command("g.rename", vector=f"{vector_list[0]},{output}")
 
 
+def get_aoi_bbox(aoi_map):
+    """Get bounding box of AOI (or current region) and CRS of location
+
+    Args:
+        aoi_map (str): name of vector map defining AOI, if empty the current
+                       region is used
+
+    Returns:
+        aoi_bbox (list): west, south, east, north of the AOI
+        aoi_wkt (str): WKT of the CRS of the current location
+    """
+    if aoi_map:
+        info = grass.parse_command("v.info", map=aoi_map, flags="g")
+        aoi_bbox = [
+            float(info["west"]),
+            float(info["south"]),
+            float(info["east"]),
+            float(info["north"]),
+        ]
+    else:
+        region = grass.region()
+        aoi_bbox = [region["w"], region["s"], region["e"], region["n"]]
+    aoi_wkt = grass.read_command("g.proj", flags="wf").strip()
+    return aoi_bbox, aoi_wkt
+
+
+def get_local_files(fs_data_dir):
+    """Get GPKG and SHP files in local data folder of a federal state"""
+    buildings_files = glob.glob(
+        os.path.join(fs_data_dir, "**", "*.gpkg"),
+        recursive=True,
+    )
+    shp_files = glob.glob(
+        os.path.join(fs_data_dir, "**", "*.shp"), recursive=True
+    )
+    buildings_files.extend(shp_files)
+    return buildings_files
+
+
+def select_local_files(aoi_map, fs_data_dir, buildings_files):
+    """Select local files overlapping with the AOI using the extent catalog
+
+    Args:
+        aoi_map (str): name of vector map defining AOI
+        fs_data_dir (str): path to local data of the federal state
+        buildings_files (list): all GPKG and SHP files in fs_data_dir
+
+    Returns:
+        selected_files (list): files overlapping with AOI/region
+    """
+    try:
+        catalog, changed = update_catalog(fs_data_dir, buildings_files)
+    except ImportError:
+        grass.warning(
+            _(
+                "GDAL Python bindings not available. All local files are "
+                "imported without checking their extent."
+            )
+        )
+        return buildings_files
+    if changed:
+        grass.message(_(f"Updated extent catalog of {fs_data_dir}"))
+    aoi_bbox, aoi_wkt = get_aoi_bbox(aoi_map)
+    selected_files = select_overlapping_files(
+        fs_data_dir, catalog, aoi_bbox, aoi_wkt
+    )
+    grass.message(
+        _(
+            f"{len(selected_files)} of {len(buildings_files)} local files "
+            "overlap with AOI."
+        )
+    )
+    return selected_files
+
+
+def import_local_file(args):
+    """Import a single local file restricted to the region of env
+
+    Args:
+        args (tuple): path of the file, name of the output vector map and
+                      environment with the region (None: current region)
+    """
+    buildings_file, output, env = args
+    grass.run_command(
+        "v.import",
+        **get_region_import(
+            get_filtered_source(get_reprojected_source(buildings_file)), env
+        ),
+        output=output,
+        **get_memory_option("v.import", resources.workers("import")),
+        quiet=True,
+    )
+    return output
+
+
 def import_local_data(aoi_map, local_data_dir, fs, output_alkis_fs):
     """Import of data from local file path
 
+    Only files whose extent (read from a cached extent catalog) overlaps
+    with the AOI/region are imported; they are imported in parallel.
+
     Args:
         aoi_map (str): name of vector map defining AOI
         local_data_dir (str): path to local data
@@ -522,47 +1881,43 @@ def import_local_data(aoi_map, local_data_dir, fs, output_alkis_fs):
         imported_local_data (bool): True if local data imported, otherwise False
     """
     imported_local_data = False
-    # get files (GPKG or SHP)
-    buildings_files = glob.glob(
-        os.path.join(local_data_dir, fs, "**", "*.gpkg"),
-        recursive=True,
-    )
-    shp_files = glob.glob(
-        os.path.join(local_data_dir, fs, "**", "*.shp"), recursive=True
+    fs_data_dir = os.path.join(local_data_dir, fs)
+    buildings_files = select_local_files(
+        aoi_map, fs_data_dir, get_local_files(fs_data_dir)
     )
-    buildings_files.extend(shp_files)
 
     # import data for AOI
-    imported_buildings_list = []
+    region_env = None
+    if aoi_map and buildings_files:
+        region_env = get_region_env(vector=aoi_map)
+    import_list = []
     for i, buildings_file in enumerate(buildings_files):
-        if aoi_map:
-            grass.run_command(
-                "g.region",
-                vector=aoi_map,
-                quiet=True,
-            )
-        grass.run_command(
-            "v.import",
-            input=buildings_file,
-            output=f"{output_alkis_fs}_{i}",
-            extent="region",
-            quiet=True,
+        import_list.append(
+            (buildings_file, f"{output_alkis_fs}_{i}", region_env)
         )
-        imported_buildings_list.append(f"{output_alkis_fs}_{i}")
         rm_vectors.append(f"{output_alkis_fs}_{i}")
-
-    # patch outputs
-    patch_vector(imported_buildings_list, output_alkis_fs)
-
-    # check if result is not empty
-    buildings_info = grass.parse_command(
-        "v.info",
-        map=output_alkis_fs,
-        flags="gt",
-    )
-    if int(buildings_info["centroids"]) == 0 and fs in ["BW"]:
+    imported_buildings_list = []
+    if import_list:
+        pool = ThreadPool(resources.workers("import", len(import_list)))
+        imported_buildings_list = pool.map(import_local_file, import_list)
+        pool.close()
+        pool.join()
+
+        # patch outputs
+        patch_vector(imported_buildings_list, output_alkis_fs)
+
+        # check if result is not empty
+        buildings_info = grass.parse_command(
+            "v.info",
+            map=output_alkis_fs,
+            flags="gt",
+        )
+        num_centroids = int(buildings_info["centroids"])
+    else:
+        num_centroids = 0
+    if num_centroids == 0 and fs in ["BW"]:
         grass.fatal(_("Local data does not overlap with AOI."))
-    elif int(buildings_info["centroids"]) == 0:
+    elif num_centroids == 0:
         grass.message(
             _(
                 "Local data does not overlap with AOI. Data will be downloaded"
@@ -575,15 +1930,32 @@ def import_local_data(aoi_map, local_data_dir, fs, output_alkis_fs):
     return imported_local_data
 
 
-def cleanup_columns(out_alkis):
-    """Remove additional columns"""
+def cleanup_columns(out_alkis, schema=None):
+    """Remove additional columns
+
+    Args:
+        out_alkis (str): name of the imported vector map
+        schema (dict): source column per output column, by default the
+                       columns have the same names
+    """
+    if schema is None:
+        schema = {col: col for col in OUTPUT_COLUMNS}
+    dblink = get_pg_dblink(out_alkis)
+    if dblink:
+        # rebuild the table in one statement instead of column updates
+        harmonize_table(out_alkis, dblink, schema, OUTPUT_COLUMNS)
+        return
     cols = grass.vector_columns(out_alkis)
     rm_cols = []
     for col in cols:
-        if col not in ["cat", "AGS", "OI", "GFK"]:
+        if col not in ["cat"] + OUTPUT_COLUMNS:
             rm_cols.append(col)
-    for needed_col in ["AGS", "OI", "GFK"]:
+    for needed_col in OUTPUT_COLUMNS:
+        source_col = schema.get(needed_col)
         tmp_col = None
+        query_col = None
+        if source_col in cols and source_col not in OUTPUT_COLUMNS:
+            query_col = source_col
         if needed_col in cols:
             tmp_col = f"{needed_col}_tmp"
             rm_cols.append(tmp_col)
@@ -593,18 +1965,20 @@ def cleanup_columns(out_alkis):
                 column=f"{needed_col},{tmp_col}",
                 quiet=True,
             )
+            if source_col == needed_col:
+                query_col = tmp_col
         grass.run_command(
             "v.db.addcolumn",
             map=out_alkis,
             columns=f"{needed_col} TEXT",
             quiet=True,
         )
-        if tmp_col:
+        if query_col:
             grass.run_command(
                 "v.db.update",
                 map=out_alkis,
                 column=needed_col,
-                query_column=tmp_col,
+                query_column=query_col,
                 quiet=True,
             )
     if len(rm_cols) > 0:
@@ -616,9 +1990,809 @@ def cleanup_columns(out_alkis):
         )
 
 
+def probe_url(url):
+    """Get size of download in bytes without downloading it
+
+    Returns:
+        size (int): content length in bytes, None if not available
+    """
+    import requests
+
+    try:
+        response = requests.get(url, stream=True, timeout=60)
+        response.close()
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    size = response.headers.get("Content-Length")
+    return int(size) if size else None
+
+
+def probe_version(url):
+    """Get version of a download without downloading it
+
+    Returns:
+        version (str): ETag, last modification or size of the download, None
+                       if not available
+    """
+    import requests
+
+    try:
+        response = requests.get(url, stream=True, timeout=60)
+        response.close()
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    for header in ("ETag", "Last-Modified", "Content-Length"):
+        if response.headers.get(header):
+            return f"{url} {header}: {response.headers[header]}"
+    return None
+
+
+def get_source_version(federal_state, aoi_map, local_data_dir):
+    """Get version of the sources of a federal state for the result cache
+
+    Returns:
+        version (list): versions of the local files, downloads or (for
+                        feature services) the current date, None if the
+                        version is not known
+    """
+    fs = FS_ABBREVIATION[federal_state]
+    fs_data_dir = os.path.join(local_data_dir, fs) if local_data_dir else ""
+    if fs_data_dir and os.path.isdir(fs_data_dir):
+        local_files = get_local_files(fs_data_dir)
+        if local_files:
+            return [
+                [path, os.path.getsize(path), os.path.getmtime(path)]
+                for path in sorted(local_files)
+            ]
+    provider = get_provider(fs, source_config)
+    if provider is None:
+        return []
+    if use_feature_service(provider.feature_service, get_aoi_area(aoi_map)):
+        # the service may change at any time, results are kept for a day
+        return [provider.feature_service["url"], date.today().isoformat()]
+    if provider.partitioned:
+        urls = get_partition_urls(provider, aoi_map)
+    else:
+        urls = [provider.resolve_url()]
+    versions = [probe_version(url) for url in urls]
+    if None in versions:
+        return None
+    return versions
+
+
+def get_result_key(federal_states, aoi_map, load_region, local_data_dir):
+    """Get key of the requested result in the result cache
+
+    Returns:
+        key (str): cache key, None if a source version is not known
+    """
+    if aoi_map:
+        aoi = get_geometry_hash(aoi_map)
+    elif load_region:
+        region = grass.region()
+        aoi = [region["n"], region["s"], region["e"], region["w"]]
+    else:
+        aoi = None
+    sources = {}
+    for federal_state in federal_states:
+        if federal_state not in FS_ABBREVIATION:
+            grass.fatal(_(f"Non valid name of federal state: {federal_state}"))
+        sources[federal_state] = get_source_version(
+            federal_state, aoi_map, local_data_dir
+        )
+        if sources[federal_state] is None:
+            return None
+    return get_cache_key(
+        {
+            "aoi": aoi,
+            "federal_states": sorted(federal_states),
+            "flags": {"r": load_region, "f": flags["f"]},
+            "options": {
+                key: options[key]
+                for key in (
+                    "aoi_mode",
+                    "aoi_tolerance",
+                    "where",
+                    "simplify",
+                    "min_area",
+                )
+            },
+            "sources": sources,
+            # the configured providers and mirrors and the local data
+            # change the result without changing the source versions
+            "source_config": {
+                key: val
+                for key, val in source_config.items()
+                if key != "result_cache"
+            },
+            "local_data_dir": (
+                os.path.abspath(local_data_dir) if local_data_dir else None
+            ),
+        }
+    )
+
+
+def get_aoi_area(aoi_map):
+    """Get area of AOI (or current region) in km²"""
+    if aoi_map:
+        areas = read_per_cat_values(aoi_map, "area")
+        return sum(float(val[0]) for val in areas.values()) / 1000000.0
+    region = grass.region()
+    return (region["e"] - region["w"]) * (region["n"] - region["s"]) / 1e6
+
+
+def get_plan_command(**changes):
+    """Get command line of the planned job (the current one without -n)
+
+    Args:
+        changes: options to set instead of the current ones
+    """
+    command = ["v.alkis.buildings.import"]
+    for key, val in sorted(dict(options, **changes).items()):
+        if val:
+            command.append(f"{key}={val}")
+    plan_flags = "".join(
+        sorted(flag for flag, val in flags.items() if val and flag != "n")
+    )
+    if plan_flags:
+        command.append(f"-{plan_flags}")
+    return command
+
+
+def get_plan_commands(strategy, aoi_area, districts):
+    """Get the command lines executing the chosen strategy
+
+    Args:
+        strategy (dict): chosen strategy (see import_strategy.py)
+        aoi_area (float): area of the AOI/region in km²
+        districts (list): partitions overlapping with the AOI, prepared
+                          with the prefiltered strategy
+
+    Returns:
+        commands (list): command lines to execute one after another; the
+                         shard_mode=run command of the tiled strategy is
+                         started by "workers" workers
+    """
+    if strategy["strategy"] == "prefiltered":
+        prefetch = ["v.alkis.buildings.import"]
+        prefetch.extend(
+            f"{key}={options[key]}"
+            for key in (
+                "federal_state",
+                "file",
+                "dldir",
+                "source_config",
+                "nprocs",
+                "memory",
+            )
+            if options[key]
+        )
+        if districts:
+            prefetch.append(f"districts={','.join(districts)}")
+        prefetch.append("-p")
+        return [
+            prefetch,
+            get_plan_command(clip_method=strategy.get("clip_method")),
+        ]
+    if strategy["strategy"] == "tiled":
+        manifest = options["manifest"] or os.path.join(
+            options["dldir"], f"{options['output']}_manifest.json"
+        )
+        shard_size = math.ceil(math.sqrt(aoi_area * 1e6 / strategy["tiles"]))
+        merge = [
+            "v.alkis.buildings.import",
+            "shard_mode=merge",
+            f"manifest={manifest}",
+            f"output={options['output']}",
+        ]
+        merge.extend(
+            f"{key}={options[key]}"
+            for key in ("partition_by", "partition_size")
+            if options[key]
+        )
+        return [
+            get_plan_command(
+                shard_mode="plan", manifest=manifest, shard_size=shard_size
+            ),
+            [
+                "v.alkis.buildings.import",
+                "shard_mode=run",
+                f"manifest={manifest}",
+            ],
+            merge,
+        ]
+    return [get_plan_command(clip_method=strategy.get("clip_method"))]
+
+
+def plan_federal_state(
+    federal_state, aoi_map, local_data_dir, aoi_area, service_area=None
+):
+    """Create plan of the sources of a federal state
+
+    Args:
+        federal_state (str): name of the federal state
+        aoi_map (str): name of vector map defining AOI
+        local_data_dir (str): path to local data
+        aoi_area (float): area of the AOI/region in km²
+        service_area (float): area of the AOI/region in km² if the import is
+                              restricted to it (for feature services)
+
+    Returns:
+        fs_plan (dict): sources, cache status, estimated features in the
+                        AOI, buildings read without spatial index
+                        ("source_features") and number of files or
+                        partitions imported in parallel
+    """
+    fs = FS_ABBREVIATION[federal_state]
+    fs_plan = {
+        "federal_state": federal_state,
+        "fs": fs,
+        "source_features": 0,
+        "parallel": 1,
+    }
+    area_fraction = min(1.0, aoi_area / FS_AREA[fs])
+
+    # local data
+    fs_data_dir = os.path.join(local_data_dir, fs) if local_data_dir else ""
+    if fs_data_dir and os.path.isdir(fs_data_dir):
+        local_files = select_local_files(
+            aoi_map, fs_data_dir, get_local_files(fs_data_dir)
+        )
+        if local_files or fs in ["BW"]:
+            fs_plan["source"] = "local"
+            fs_plan["files"] = local_files
+            fs_plan["parallel"] = max(1, len(local_files))
+            fs_plan["method"] = "parallel_local_import"
+            fs_plan["estimate"] = "catalog"
+            try:
+                # catalog is up to date after select_local_files
+                catalog, _changed = update_catalog(
+                    fs_data_dir, get_local_files(fs_data_dir)
+                )
+                fs_plan["estimated_features"] = round(
+                    estimate_features(
+                        fs_data_dir,
+                        catalog,
+                        local_files,
+                        *get_aoi_bbox(aoi_map),
+                    )
+                )
+            except ImportError:
+                fs_plan["estimated_features"] = None
+            return fs_plan
+
+    # download
+    provider = get_provider(fs, source_config)
+    if provider is None:
+        fs_plan["source"] = None
+        fs_plan["estimated_features"] = 0
+        return fs_plan
+    if use_feature_service(provider.feature_service, service_area):
+        import requests
+
+        fs_plan["source"] = "feature_service"
+        fs_plan["service"] = provider.feature_service["url"]
+        fs_plan["method"] = "paged_bbox_requests"
+        fs_plan["estimate"] = "service"
+        region = grass.region(
+            env=get_region_env(vector=aoi_map) if aoi_map else None
+        )
+        with requests.Session() as session:
+            try:
+                fs_plan["estimated_features"] = get_number_matched(
+                    provider.feature_service,
+                    [region["w"], region["s"], region["e"], region["n"]],
+                    get_location_crs(),
+                    session,
+                )
+            except requests.exceptions.RequestException:
+                fs_plan["estimated_features"] = None
+        return fs_plan
+    if provider.partitioned:
+        urls = get_partition_urls(provider, aoi_map)
+        fs_plan["districts"] = [
+            get_partition_key(provider, url) for url in urls
+        ]
+        cached = [
+            os.path.isfile(os.path.join(dldir, get_download_filename(url)))
+            or bool(
+                get_partition_sources(
+                    provider,
+                    get_partition_dir(get_download_filename(url)),
+                )
+            )
+            for url in urls
+        ]
+    else:
+        urls = [provider.resolve_url()]
+        cached = [
+            os.path.isfile(os.path.join(dldir, provider.buildings_filename))
+        ]
+    fs_plan["source"] = "download"
+    fs_plan["method"] = "download"
+    if provider.partitioned:
+        fs_plan["method"] = "partitioned_download"
+    fs_plan["estimate"] = "archive_size"
+    fs_plan["downloads"] = []
+    download_bytes = 0
+    for url, is_cached in zip(urls, cached):
+        size = probe_url(url)
+        fs_plan["downloads"].append(
+            {"url": url, "bytes": size, "cached": is_cached}
+        )
+        if size and not is_cached:
+            download_bytes += size
+    fs_plan["download_bytes"] = download_bytes
+    archive_bytes = sum(dl["bytes"] or 0 for dl in fs_plan["downloads"])
+    # e.g. district archives of Brandenburg contain all ALKIS layers
+    archive_bytes *= provider.buildings_share
+    if provider.partitioned and urls:
+        partitions_area = FS_AREA[fs] * len(urls) / len(provider.partitions)
+        area_fraction = min(1.0, aoi_area / partitions_area)
+        fs_plan["parallel"] = len(urls)
+    # the downloaded sources have no spatial index, they are read
+    # completely also if only the region is imported
+    fs_plan["source_features"] = round(archive_bytes / BYTES_PER_FEATURE)
+    fs_plan["estimated_features"] = round(
+        fs_plan["source_features"] * area_fraction
+    )
+    return fs_plan
+
+
+def fetch_alkis_source(args):
+    """Download ALKIS building data of a federal state (pipeline stage)"""
+    provider, output_alkis_fs, use_service = args
+    alkis_source = None
+    # partitioned sources and feature services download and import in their
+    # own pipeline
+    if not provider.partitioned and not use_service:
+        alkis_source = download_alkis_buildings(provider)
+    return provider, output_alkis_fs, use_service, alkis_source
+
+
+def generalize_buildings(vector_map):
+    """Simplify the footprints depending on the simplify option
+
+    The footprints are simplified with v.generalize after the import, which
+    keeps the topology (e.g. shared walls of neighbouring buildings stay
+    shared). ogr2ogr -simplify would simplify each building on its own and
+    open gaps between neighbouring buildings. Small buildings are already
+    removed while reading the source (see get_filtered_source).
+
+    Args:
+        vector_map (str): name of the imported buildings of a federal state,
+                          replaced by the generalized buildings
+    """
+    tolerance = float(options["simplify"] or 0)
+    if tolerance <= 0:
+        return
+    generalized = f"{vector_map}_generalized"
+    rm_vectors.append(generalized)
+    grass.run_command(
+        "v.generalize",
+        input=vector_map,
+        output=generalized,
+        type="area",
+        method="douglas",
+        threshold=tolerance,
+        quiet=True,
+    )
+    grass.run_command(
+        "g.rename",
+        vector=f"{generalized},{vector_map}",
+        overwrite=True,
+        quiet=True,
+    )
+
+
+def import_alkis_source(args, aoi_map, load_region):
+    """Import ALKIS building data of a federal state (pipeline stage)"""
+    provider, output_alkis_fs, use_service, alkis_source = args
+    grass.message(_(f"Importing ALKIS buildings data  ({provider.key})..."))
+    if use_service:
+        import_feature_service_source(provider, aoi_map, output_alkis_fs)
+    elif provider.partitioned:
+        import_partitioned_source(provider, aoi_map, output_alkis_fs)
+    else:
+        import_single_alkis_source(
+            alkis_source,
+            aoi_map,
+            load_region,
+            output_alkis_fs,
+            provider,
+        )
+    generalize_buildings(output_alkis_fs)
+    return output_alkis_fs
+
+
+def write_output_partitions(output_alkis):
+    """Write the output partitioned by AGS prefix or tile (see
+    output_partitions.py)
+    """
+    size = options["partition_size"]
+    rows = partition_output(
+        output_alkis,
+        options["partition_by"],
+        float(size) if size else None,
+        resources.workers("import"),
+    )
+    grass.message(
+        _(
+            f"Wrote {len(rows)} partitions of <{output_alkis}>, see table "
+            f"<{output_alkis}_partitions>."
+        )
+    )
+
+
+def plan_shards(federal_states, aoi_map, load_region, manifest_file):
+    """Write the manifest of a sharded job
+
+    Federal states with partitions (e.g. Brandenburg) are split into one
+    shard per partition overlapping with the AOI/region, the others into
+    tiles of shard_size. The AOI is exported next to the manifest, so that
+    workers on other nodes can use it.
+
+    Args:
+        federal_states (list): names of the federal states
+        aoi_map (str): name of vector map defining AOI
+        load_region (bool): restrict import to current region
+        manifest_file (str): path of the manifest
+    """
+    if not options["dldir"]:
+        grass.fatal(_("A dldir shared by the workers is needed."))
+    units = []
+    for federal_state in federal_states:
+        if federal_state not in FS_ABBREVIATION:
+            grass.fatal(_(f"Non valid name of federal state: {federal_state}"))
+        fs = FS_ABBREVIATION[federal_state]
+        provider = get_provider(fs, source_config)
+        partitions = None
+        if provider and provider.partitioned:
+            partitions = [
+                get_partition_key(provider, url)
+                for url in get_partition_urls(provider, aoi_map)
+            ]
+        units.append((federal_state, partitions))
+    bbox = None
+    aoi_file = None
+    if aoi_map:
+        aoi_file = os.path.join(get_shard_dir(manifest_file), "aoi.gpkg")
+        os.makedirs(os.path.dirname(aoi_file), exist_ok=True)
+        grass.run_command(
+            "v.out.ogr",
+            input=aoi_map,
+            output=aoi_file,
+            format="GPKG",
+            overwrite=True,
+            quiet=True,
+        )
+    if aoi_map or load_region:
+        region = grass.region(
+            env=get_region_env(vector=aoi_map) if aoi_map else None
+        )
+        bbox = {key: region[key] for key in ("n", "s", "e", "w")}
+    job = {
+        "output": options["output"],
+        "aoi": aoi_file,
+        "load_region": load_region,
+        "dldir": os.path.abspath(dldir),
+        "source_config": source_config,
+        "options": {key: options[key] for key in SHARD_OPTIONS},
+        "flags": "".join(flag for flag in SHARD_FLAGS if flags[flag]),
+    }
+    shards = create_shards(units, bbox, float(options["shard_size"] or 0))
+    write_manifest(manifest_file, job, shards)
+    grass.message(_(f"Wrote {len(shards)} shards to {manifest_file}."))
+
+
+def run_shard(manifest_file, job, shard, aoi_map):
+    """Import the buildings of a shard by calling the module for it and
+    export them next to the manifest
+
+    Returns:
+        output_file (str): GeoPackage with the buildings of the shard, None
+                           if the shard does not overlap with the AOI
+    """
+    shard_dir = get_shard_dir(manifest_file)
+    shard_id = shard["id"]
+    shard_output = f"{job['output']}_shard_{shard_id}_{PID}"
+    rm_vectors.append(shard_output)
+    shard_flags = job["flags"] + "d"
+    shard_options = {key: val for key, val in job["options"].items() if val}
+
+    # source configuration restricted to the partitions of the shard
+    config = json.loads(json.dumps(job["source_config"]))
+    if shard["partitions"]:
+        fs = FS_ABBREVIATION[shard["federal_state"]]
+        provider = get_provider(fs, config)
+        fs_config = config.setdefault("providers", {}).setdefault(fs, {})
+        fs_config["partitions"] = {
+            key: provider.partitions[key] for key in shard["partitions"]
+        }
+    if config:
+        config_file = os.path.join(shard_dir, f"{shard_id}.config.json")
+        with open(config_file, "w", encoding="utf-8") as file:
+            json.dump(config, file)
+        shard_options["source_config"] = config_file
+
+    # region and AOI of the shard
+    region_env = None
+    tiled = shard.get("tiled") and shard["region"]
+    if tiled:
+        # whole buildings around the tile, each building is assigned to the
+        # tile containing its centroid and only cut at the AOI boundary
+        region_env = get_region_env(
+            **grow_region(shard["region"], SHARD_MARGIN)
+        )
+    elif shard["region"]:
+        region_env = get_region_env(**shard["region"])
+    if aoi_map:
+        shard_aoi = f"shard_aoi_{shard_id}_{PID}"
+        rm_vectors.append(shard_aoi)
+        grass.run_command(
+            "v.clip",
+            input=aoi_map,
+            output=shard_aoi,
+            flags="r",
+            overwrite=True,
+            quiet=True,
+            env=region_env,
+        )
+        if int(grass.vector_info_topo(shard_aoi)["areas"]) == 0:
+            return None
+        shard_options["aoi_map"] = shard_aoi
+        if tiled:
+            shard_options["aoi_mode"] = "intersect"
+    elif shard["region"]:
+        shard_flags += "r"
+
+    grass.run_command(
+        "v.alkis.buildings.import",
+        output=shard_output,
+        federal_state=shard["federal_state"],
+        dldir=job["dldir"],
+        flags=shard_flags,
+        overwrite=True,
+        env=region_env,
+        **shard_options,
+    )
+    if tiled:
+        shard_output = assign_to_tile(shard_output, shard["region"])
+        if aoi_map:
+            restricted = f"{shard_output}_aoi"
+            rm_vectors.append(restricted)
+            restrict_to_aoi(
+                shard_output,
+                aoi_map,
+                restricted,
+                job["options"].get("aoi_mode"),
+            )
+            shard_output = restricted
+    output_file = os.path.join(shard_dir, f"{shard_id}.gpkg")
+    tmp_file = f"{output_file}.tmp{PID}.gpkg"
+    grass.run_command(
+        "v.out.ogr",
+        input=shard_output,
+        output=tmp_file,
+        format="GPKG",
+        overwrite=True,
+        quiet=True,
+    )
+    os.replace(tmp_file, output_file)
+    return output_file
+
+
+def assign_to_tile(vector_map, tile):
+    """Keep the buildings with their centroid in the tile of a shard, so
+    that the buildings at the tile borders are in exactly one shard
+
+    Returns:
+        output (str): name of the vector map with the buildings of the tile
+    """
+    output = f"{vector_map}_tile"
+    rm_vectors.append(output)
+    cats = [
+        cat
+        for cat, coords in read_per_cat_values(vector_map, "coor").items()
+        if is_in_tile(tile, float(coords[0]), float(coords[1]))
+    ]
+    extract_areas(vector_map, cats, output)
+    return output
+
+
+def run_shards(manifest_file):
+    """Process shards of a manifest until all shards are claimed (worker)
+
+    Several workers, also on different nodes, can process the shards of a
+    manifest at the same time; each shard is claimed by exactly one worker.
+    Workers can share a mapset, their temporary maps are named with the
+    process ID. The claim is renewed while the shard is processed; the
+    claim of a killed worker becomes stale after CLAIM_LEASE seconds and
+    the shard is then claimed again by another worker.
+    """
+    manifest = read_manifest(manifest_file)
+    job = manifest["job"]
+    aoi_map = None
+    if job["aoi"]:
+        aoi_map = f"shard_aoi_{PID}"
+        rm_vectors.append(aoi_map)
+        grass.run_command(
+            "v.import", input=job["aoi"], output=aoi_map, quiet=True
+        )
+    if options["shard"]:
+        # repeat a single shard, e.g. after a failure
+        shard_id = f"{int(options['shard']):05d}"
+        shards = [
+            shard for shard in manifest["shards"] if shard["id"] == shard_id
+        ]
+        if not shards:
+            grass.fatal(_(f"Shard {shard_id} is not in {manifest_file}."))
+        shard = shards[0]
+    else:
+        shard = claim_next_shard(manifest_file, manifest)
+    while shard:
+        grass.message(
+            _(
+                f"Processing shard {shard['id']} "
+                f"({shard['federal_state']})..."
+            )
+        )
+        try:
+            with claim_heartbeat(manifest_file, shard["id"]):
+                output_file = run_shard(manifest_file, job, shard, aoi_map)
+            mark_shard(
+                manifest_file, shard["id"], "done", {"output": output_file}
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            grass.warning(_(f"Shard {shard['id']} failed: {err}"))
+            mark_shard(
+                manifest_file, shard["id"], "failed", {"error": str(err)}
+            )
+        if options["shard"]:
+            break
+        shard = claim_next_shard(manifest_file, manifest)
+
+
+def merge_shards(manifest_file, output_alkis):
+    """Merge the outputs of all shards of a manifest
+
+    The outputs are patched in the order of the shards, so the merged
+    output does not depend on which worker processed which shard. The
+    outputs do not overlap: the buildings at tile borders are only in the
+    shard of the tile containing their centroid.
+    """
+    manifest = read_manifest(manifest_file)
+    results, failed = get_shard_results(manifest_file, manifest)
+    missing = [
+        shard["id"]
+        for shard, result in zip(manifest["shards"], results)
+        if result is None
+    ]
+    if missing:
+        grass.fatal(
+            _(
+                f"Shards not done: {', '.join(missing)} "
+                f"(failed: {', '.join(failed) or 'none'})"
+            )
+        )
+    shard_maps = []
+    for i, result in enumerate(results):
+        if not result["output"]:
+            continue
+        shard_map = f"{output_alkis}_shard_{i:05d}_{PID}"
+        rm_vectors.append(shard_map)
+        grass.run_command(
+            "v.in.ogr",
+            input=result["output"],
+            output=shard_map,
+            flags="o",
+            quiet=True,
+        )
+        shard_maps.append(shard_map)
+    if not shard_maps:
+        grass.fatal(_("No ALKIS building data imported."))
+    patch_vector(shard_maps, output_alkis)
+    grass.message(_(f"Merged {len(shard_maps)} shards into <{output_alkis}>."))
+
+
+def create_plan(federal_states, aoi_map, load_region, local_data_dir):
+    """Create plan report of the job without downloading or importing
+
+    The report lists the sources of the job and chooses the cheapest
+    import strategy from the feature estimates (see import_strategy.py):
+    the import of the region of the AOI, the import from prepared copies of
+    the sources or a tiled import by several workers, and with
+    aoi_mode=clip whether the buildings inside the AOI are selected or all
+    buildings are clipped. The feature estimates are rough, see the
+    "estimate" of each federal state.
+
+    Args:
+        federal_states (list): names of the federal states
+        aoi_map (str): name of vector map defining AOI
+        load_region (bool): restrict import to current region
+        local_data_dir (str): path to local data
+
+    Returns:
+        plan (dict): machine-readable plan
+    """
+    aoi_area = get_aoi_area(aoi_map)
+    plan = {
+        "output": options["output"],
+        "aoi_area_km2": round(aoi_area, 3),
+        "federal_states": [],
+    }
+    for federal_state in federal_states:
+        if federal_state not in FS_ABBREVIATION:
+            grass.fatal(_(f"Non valid name of federal state: {federal_state}"))
+        plan["federal_states"].append(
+            plan_federal_state(
+                federal_state,
+                aoi_map,
+                local_data_dir,
+                aoi_area,
+                aoi_area if aoi_map or load_region else None,
+            )
+        )
+    plan["estimated_features"] = sum(
+        fs_plan["estimated_features"] or 0
+        for fs_plan in plan["federal_states"]
+    )
+    plan["download_bytes"] = sum(
+        fs_plan.get("download_bytes", 0) for fs_plan in plan["federal_states"]
+    )
+    # import settings resulting from the options
+    settings = {}
+    if aoi_map:
+        settings["extent"] = "aoi"
+        settings["aoi_mode"] = options["aoi_mode"] or "clip"
+    elif load_region:
+        settings["extent"] = "region"
+    else:
+        settings["extent"] = "full"
+    settings["nprocs"] = resources.nprocs
+    settings["memory_mb"] = resources.memory
+    plan["import"] = settings
+    # strategy chosen from the estimates
+    strategy = choose_strategy(
+        [
+            {
+                "source": fs_plan["source"],
+                "features": fs_plan["estimated_features"] or 0,
+                "source_features": fs_plan["source_features"],
+                "parallel": fs_plan["parallel"],
+            }
+            for fs_plan in plan["federal_states"]
+        ],
+        resources.nprocs,
+        settings.get("aoi_mode"),
+        prefilter=bool(options["dldir"]),
+        # shards need a dldir shared by the workers and a bounding box
+        tiles=bool(options["dldir"]) and settings["extent"] != "full",
+    )
+    if "clip_method" in strategy and options["clip_method"]:
+        strategy["clip_method"] = options["clip_method"]
+    plan["strategy"] = strategy
+    plan["commands"] = get_plan_commands(
+        strategy,
+        aoi_area,
+        [
+            district
+            for fs_plan in plan["federal_states"]
+            for district in fs_plan.get("districts", [])
+        ],
+    )
+    return plan
+
+
 def main():
     """main function for processing"""
-    global orig_region, OUTPUT_ALKIS_TEMP, PID, dldir
+    global OUTPUT_ALKIS_TEMP, PID, dldir, source_config
+    global resources, prepared_aoi
+
     PID = os.getpid()
 
     # parser options:
@@ -630,6 +2804,17 @@ def main():
     OUTPUT_ALKIS_TEMP = f"OUTPUT_ALKIS_TEMP_{PID}"
     rm_vectors.append(OUTPUT_ALKIS_TEMP)
     output_alkis = options["output"]
+    source_config = load_source_config(options["source_config"])
+
+    # budget of processes and memory, auto-detected from the cgroup limits
+    resources = ResourceManager(options["nprocs"], options["memory"])
+    os.environ.update(resources.get_gdal_env())
+    grass.verbose(
+        _(
+            f"Using {resources.nprocs} processes and {resources.memory} MB "
+            "memory"
+        )
+    )
 
     # temp download path, if not explicit path given
     if not dldir:
@@ -653,13 +2838,90 @@ def main():
     if local_data_dir and local_data_dir != "":
         local_fs_list = os.listdir(local_data_dir)
 
-    # region
-    orig_region = f"ORIG_REGION{PID}"
-    # save current region for setting back later in cleanup
-    grass.run_command("g.region", save=orig_region, quiet=True)
+    # sharded execution
+    shard_mode = options["shard_mode"]
+    if shard_mode == "run":
+        run_shards(options["manifest"])
+        return
+    if shard_mode == "merge":
+        merge_shards(options["manifest"], output_alkis)
+        if options["partition_by"]:
+            write_output_partitions(output_alkis)
+        return
+    if shard_mode == "plan":
+        if not federal_states:
+            grass.fatal(_("federal_state or file is needed for the plan."))
+        plan_shards(
+            federal_states.split(","),
+            aoi_map,
+            load_region,
+            options["manifest"],
+        )
+        return
+
+    # only download and prepare the data
+    if flags["p"]:
+        districts = options["districts"]
+        prefetch(
+            federal_states.split(","),
+            districts.split(",") if districts else None,
+        )
+        return
+
+    # only print execution plan
+    if flags["n"]:
+        plan = create_plan(
+            federal_states.split(","), aoi_map, load_region, local_data_dir
+        )
+        print(json.dumps(plan, indent=2))
+        return
+
+    # serve the result from the result cache
+    result_cache = None
+    result_key = None
+    if options["cache_mapset"]:
+        result_cache = ResultCache(
+            options["cache_mapset"],
+            source_config.get("result_cache", {}).get(
+                "max_entries", MAX_ENTRIES
+            ),
+        )
+        result_key = get_result_key(
+            federal_states.split(","), aoi_map, load_region, local_data_dir
+        )
+        if result_key is None:
+            grass.warning(
+                _("Source versions not available, result cache not used.")
+            )
+        elif result_cache.get(result_key, output_alkis):
+            grass.message(
+                _(f"ALKIS buildings <{output_alkis}> copied from the cache.")
+            )
+            if options["partition_by"]:
+                write_output_partitions(output_alkis)
+            return
+
+    # prepare the AOI for the import and clipping
+    if aoi_map:
+        prepared_aoi = PreparedAoi(
+            aoi_map, f"aoi_{PID}", float(options["aoi_tolerance"] or 0)
+        )
+        aoi_map = prepared_aoi.aoi_map
+
+    # check the where option before anything is imported
+    for federal_state in federal_states.split(","):
+        fs = FS_ABBREVIATION.get(federal_state)
+        provider = get_provider(fs, source_config)
+        if provider and fs not in local_fs_list:
+            check_where(provider)
 
     # loop over federal state and import data
     output_alkis_list = []
+    download_list = []
+    # source schema of the outputs of downloaded federal states
+    output_schemas = {}
+    # area of the AOI/region, if the import is restricted to it
+    service_area = None
     for federal_state in federal_states.split(","):
         if federal_state not in FS_ABBREVIATION:
             grass.fatal(_(f"Non valid name of federal state: {federal_state}"))
@@ -674,6 +2936,8 @@ def main():
             imported_local_data = import_local_data(
                 aoi_map, local_data_dir, fs, output_alkis_fs
             )
+            if imported_local_data:
+                generalize_buildings(output_alkis_fs)
         elif fs in ["BW"]:
             grass.fatal(
                 _(f"No local data for {fs} available. Is the path correct?")
@@ -681,44 +2945,76 @@ def main():
 
         # check if federal state is supported
         if not imported_local_data:
-            if fs in ["NW", "BE", "HE", "TH", "SN"]:
-                url = URLS[fs]
-            elif fs in ["BB"]:
-                pass
+            provider = get_provider(fs, source_config)
+            if provider:
+                # use a feature service instead of the download for small
+                # AOIs
+                use_service = False
+                if provider.feature_service and (aoi_map or load_region):
+                    if service_area is None:
+                        service_area = get_aoi_area(aoi_map)
+                    use_service = use_feature_service(
+                        provider.feature_service, service_area
+                    )
+                if not use_service and not (
+                    provider.url or provider.partitioned
+                ):
+                    grass.fatal(
+                        _(
+                            f"The AOI is too large for the feature service "
+                            f"of {fs}."
+                        )
+                    )
+                download_list.append((provider, output_alkis_fs, use_service))
+                output_schemas[output_alkis_fs] = provider.schema
             else:
                 grass.warning(_(f"Support for {fs} is not yet implemented."))
-
-            # so far, just Berlin, Brandenburg, Hessen, NRW and Sachsen are implemented;
-            # in case single federal state given, and not NRW:
-            #   skips following part
-            #   + grass.message: see above
-            # in case multiple federal states given, and at least one of them is NRW:
-            #   import data only for NRW area
-            if fs in ["BB"]:
-                alkis_source = download_alkis_buildings_bb(aoi_map)
-            else:
-                alkis_source = download_alkis_buildings(fs, url)
-
-            # import to GRASS DB
-            grass.message(_(f"Importing ALKIS buildings data  ({fs})..."))
-            if isinstance(alkis_source, str):
-                import_single_alkis_source(
-                    alkis_source,
-                    aoi_map,
-                    load_region,
-                    output_alkis_fs,
-                    federal_state,
-                )
-            else:
-                import_shapefiles(alkis_source, output_alkis_fs, aoi_map)
+                output_alkis_list.remove(output_alkis_fs)
+
+    # download and import the federal states in a pipeline: the data of a
+    # federal state is imported while the next one is still downloading
+    if download_list:
+        # with one federal state the download finished before the import
+        pipeline_stages = 2 if len(download_list) > 1 else 1
+        with resources.pipeline(pipeline_stages):
+            run_pipeline(
+                download_list,
+                [
+                    (
+                        fetch_alkis_source,
+                        min(2, resources.workers("download")),
+                    ),
+                    (
+                        partial(
+                            import_alkis_source,
+                            aoi_map=aoi_map,
+                            load_region=load_region,
+                        ),
+                        1,
+                    ),
+                ],
+            )
+    if not output_alkis_list:
+        grass.fatal(_("No ALKIS building data imported."))
 
     # cleanup columns of different federal state data
     for out_alkis in output_alkis_list:
-        cleanup_columns(out_alkis)
+        cleanup_columns(out_alkis, output_schemas.get(out_alkis))
 
     # patch output from several federal states
     patch_vector(output_alkis_list, output_alkis)
 
+    # decode the building function codes
+    if flags["f"]:
+        decode_gfk(output_alkis)
+
+    if result_key:
+        result_cache.put(result_key, output_alkis)
+
+    # partitioned output
+    if options["partition_by"]:
+        write_output_partitions(output_alkis)
+
     grass.message(_(f"Importing ALKIS buildings data <{output_alkis}> done."))
 
 
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      vector_merge
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Merge of many vector maps with collision-free category
+#              ranges and a bulk merge of the attribute tables
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+from multiprocessing.pool import ThreadPool
+
+import grass.script as grass
+
+from db_sql import execute_sql
+
+# minimal number of maps for the bulk merge, fewer are patched with v.patch -e
+MIN_MAPS = 4
+
+
+def get_max_cat(vector_map):
+    """Get the maximal category of layer 1 of a vector map"""
+    report = grass.read_command(
+        "v.category",
+        input=vector_map,
+        layer=1,
+        option="report",
+        flags="g",
+        quiet=True,
+    )
+    max_cat = 0
+    for line in report.splitlines():
+        parts = line.split()
+        if len(parts) == 5 and parts[0] == "1":
+            max_cat = max(max_cat, int(parts[4]))
+    return max_cat
+
+
+def get_column_type(column):
+    """Get SQL type of a column of grass.vector_columns"""
+    col_type = column["type"].upper()
+    # the length of CHARACTER columns is not reported
+    return "VARCHAR" if col_type == "CHARACTER" else col_type
+
+
+def get_table_layout(vector_list):
+    """Get the attribute tables of the vector maps if they can be merged
+    with SQL, i.e. they are in the same database and have the same columns
+
+    Returns:
+        dblinks (list): layer 1 database links of the vector maps, None if
+                        the tables can not be merged with SQL
+        columns (list): names and SQL types of the columns except the key
+                        column
+    """
+    dblinks = []
+    layout = None
+    for vector_map in vector_list:
+        dblink = grass.vector_db(vector_map).get(1)
+        if not dblink or dblink["key"] != "cat":
+            return None, None
+        map_columns = grass.vector_columns(vector_map)
+        map_layout = (
+            dblink["driver"],
+            dblink["database"],
+            sorted(
+                (name.lower(), col["type"].upper())
+                for name, col in map_columns.items()
+            ),
+        )
+        if layout is None:
+            layout = map_layout
+            columns = [
+                (name, get_column_type(map_columns[name]))
+                for name in sorted(
+                    map_columns, key=lambda n: map_columns[n]["index"]
+                )
+                if name.lower() != "cat"
+            ]
+        elif map_layout != layout:
+            return None, None
+        dblinks.append(dblink)
+    return dblinks, columns
+
+
+def shift_categories(args):
+    """Add offset to the categories of layer 1 of a vector map"""
+    vector_map, offset, output = args
+    grass.run_command(
+        "v.category",
+        input=vector_map,
+        output=output,
+        layer=1,
+        option="sum",
+        cat=offset,
+        quiet=True,
+    )
+    return output
+
+
+def connect_table(vector_map, dblink, table=None):
+    """Connect a table of the database of dblink to layer 1"""
+    grass.run_command(
+        "v.db.connect",
+        map=vector_map,
+        table=table or dblink["table"],
+        key="cat",
+        layer=1,
+        driver=dblink["driver"],
+        database=dblink["database"],
+        flags="o",
+        quiet=True,
+    )
+
+
+def merge_tables(dblinks, columns, offsets, output):
+    """Merge attribute tables into the table of the output with
+    INSERT ... SELECT, shifting the keys by the category offsets of the maps
+
+    The table is created with the column types of the input tables and the
+    key as primary key; an existing table is only replaced with overwrite.
+    """
+    # quoted, so that PostgreSQL keeps upper case column names
+    col_names = ", ".join(f'"{name}"' for name, _type in columns)
+    col_defs = ", ".join(f'"{name}" {col_type}' for name, col_type in columns)
+    sql = []
+    if grass.overwrite():
+        sql.append(f"DROP TABLE IF EXISTS {output}")
+    sql.append(f"CREATE TABLE {output} (cat INTEGER PRIMARY KEY, {col_defs})")
+    for dblink, offset in zip(dblinks, offsets):
+        sql.append(
+            f"INSERT INTO {output} (cat, {col_names}) "
+            f"SELECT cat + {offset}, {col_names} FROM {dblink['table']}"
+        )
+    execute_sql(sql, dblinks[0])
+    connect_table(output, dblinks[0], output)
+
+
+def merge_vectors(vector_list, output, nprocs=4):
+    """Merge vector maps into one vector map
+
+    The categories of the maps are shifted in parallel into consecutive,
+    collision-free ranges and the geometries are patched with one v.patch,
+    which copies every feature once. The attribute tables are merged in the
+    database with one INSERT ... SELECT per table instead of copying them
+    row by row.
+
+    The table links of the input maps are removed during the merge, so the
+    category shift does not copy the tables, and restored if the merge
+    fails. The input tables are dropped after the merged table is connected
+    to the output; the input maps are left without tables, they are meant
+    to be temporary maps.
+
+    If the tables can not be merged with SQL (different columns or
+    databases), the maps are patched with v.patch -e.
+
+    Args:
+        vector_list (list): names of vector maps to merge
+        output (str): name of the output vector map
+        nprocs (int): number of parallel category shifts
+    """
+    dblinks, columns = get_table_layout(vector_list)
+    if dblinks is None or not columns or len(vector_list) < MIN_MAPS:
+        grass.run_command(
+            "v.patch",
+            input=vector_list,
+            output=output,
+            flags="e",
+            quiet=True,
+        )
+        return
+
+    prefix = f"{output}_merge_{os.getpid()}"
+    tmp_maps = []
+    pool = ThreadPool(max(1, nprocs))
+    try:
+        # collision-free category ranges
+        offsets = []
+        offset = 0
+        for max_cat in pool.map(get_max_cat, vector_list):
+            offsets.append(offset)
+            offset += max_cat
+        for vector_map in vector_list:
+            grass.run_command(
+                "v.db.connect", map=vector_map, layer=1, flags="d", quiet=True
+            )
+        try:
+            shift_args = []
+            shifted_maps = []
+            for i, (vector_map, offset) in enumerate(
+                zip(vector_list, offsets)
+            ):
+                if offset == 0:
+                    shifted_maps.append(vector_map)
+                    continue
+                shifted = f"{prefix}_shift_{i}"
+                tmp_maps.append(shifted)
+                shift_args.append((vector_map, offset, shifted))
+                shifted_maps.append(shifted)
+            pool.map(shift_categories, shift_args)
+            grass.run_command(
+                "v.patch", input=shifted_maps, output=output, quiet=True
+            )
+            merge_tables(dblinks, columns, offsets, output)
+        except BaseException:
+            # keep the attributes of the input maps
+            for vector_map, dblink in zip(vector_list, dblinks):
+                connect_table(vector_map, dblink)
+            raise
+    finally:
+        pool.close()
+        pool.join()
+        if tmp_maps:
+            grass.run_command(
+                "g.remove",
+                type="vector",
+                name=tmp_maps,
+                flags="f",
+                quiet=True,
+            )
+    execute_sql(
+        [f"DROP TABLE {dblink['table']}" for dblink in dblinks], dblinks[0]
+    )
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      zip_extraction
+# AUTHOR(S):   Anika Weinmann, Julia Haas
+
+# PURPOSE:     Parallel extraction of zip file members
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import os
+import shutil
+from multiprocessing.pool import ThreadPool
+from zipfile import ZipFile
+
+# buffer size per worker, limits the memory used for the extraction
+BUFFER_SIZE = 1024 * 1024
+
+
+def get_target_path(target_dir, member):
+    """Get path of a zip member in target_dir, refusing paths outside of it"""
+    target_dir = os.path.abspath(target_dir)
+    path = os.path.abspath(os.path.join(target_dir, member))
+    if os.path.commonpath([target_dir, path]) != target_dir:
+        raise ValueError(f"Zip member {member} outside of {target_dir}")
+    return path
+
+
+def extract_member(args):
+    """Extract a single member of a zip file
+
+    Every call opens its own handle of the zip file, so that members can be
+    inflated in parallel. The member is streamed with a fixed buffer into a
+    temporary file which is renamed when complete.
+
+    Args:
+        args (tuple): path of the zip file, name of the member and target
+                      directory
+
+    Returns:
+        path (str): path of the extracted file
+    """
+    zip_path, member, target_dir = args
+    path = get_target_path(target_dir, member)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with ZipFile(zip_path, "r") as zip_obj:
+        with zip_obj.open(member) as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, BUFFER_SIZE)
+    os.replace(tmp_path, path)
+    return path
+
+
+def extract_members(zip_path, target_dir, members=None, nprocs=4):
+    """Extract members of a zip file in parallel
+
+    Args:
+        zip_path (str): path of the zip file
+        target_dir (str): directory to extract to
+        members (list): names of the members to extract, all if None
+        nprocs (int): number of parallel workers
+
+    Returns:
+        paths (list): paths of the extracted files
+    """
+    with ZipFile(zip_path, "r") as zip_obj:
+        if members is None:
+            members = zip_obj.namelist()
+        # directories are created with their files
+        members = [
+            member
+            for member in members
+            if not zip_obj.getinfo(member).is_dir()
+        ]
+        # start with the largest members to balance the workers
+        members.sort(key=lambda mem: zip_obj.getinfo(mem).file_size)
+        members.reverse()
+    if not members:
+        return []
+    args = [(zip_path, member, target_dir) for member in members]
+    if nprocs < 2 or len(members) == 1:
+        return [extract_member(arg) for arg in args]
+    pool = ThreadPool(min(nprocs, len(members)))
+    paths = pool.map(extract_member, args)
+    pool.close()
+    pool.join()
+    return paths